@@ -1,7 +1,8 @@
 
+from concurrent.futures import wait
 from datetime import date, timedelta
 from models import Document, Company
-from notifications import send_email, send_whatsapp
+from notifications import dispatch_email, dispatch_whatsapp
 
 def build_message(docs, title):
     lines = [title, "" ]
@@ -10,17 +11,21 @@ def build_message(docs, title):
         lines.append(f"- {emp} | {d.tipo.nome if d.tipo else ''} | {d.descricao or ''} | vence: {d.data_vencimento}")
     return "\n".join(lines)
 
-def send_alerts():
-    hoje = date.today()
+def alert_queries(hoje=None):
+    """Consultas (não executadas) de cada bloco de alerta."""
+    hoje = hoje or date.today()
     em_7 = hoje + timedelta(days=7)
     em_30 = hoje + timedelta(days=30)
-
-    sets = [
-        ("Documentos Vencidos", Document.query.filter(Document.data_vencimento < hoje).all()),
-        ("Documentos a vencer (7 dias)", Document.query.filter(Document.data_vencimento >= hoje, Document.data_vencimento <= em_7).all()),
-        ("Documentos a vencer (30 dias)", Document.query.filter(Document.data_vencimento > em_7, Document.data_vencimento <= em_30).all()),
+    return [
+        ("Documentos Vencidos", Document.query.filter(Document.data_vencimento < hoje)),
+        ("Documentos a vencer (7 dias)", Document.query.filter(Document.data_vencimento >= hoje, Document.data_vencimento <= em_7)),
+        ("Documentos a vencer (30 dias)", Document.query.filter(Document.data_vencimento > em_7, Document.data_vencimento <= em_30)),
     ]
 
+def send_alerts():
+    sets = [(title, query.all()) for title, query in alert_queries()]
+    envios = []
+
     for title, docs in sets:
         if not docs: continue
         by_company = {}
@@ -33,7 +38,9 @@ def send_alerts():
             emails = (comp.alert_email or "").split(";") if comp else []
             whats = (comp.alert_whatsapp or "").split(";") if comp else []
             if emails:
-                send_email(emails, f"[Alertas] {title}", message)
+                envios.append(dispatch_email(emails, f"[Alertas] {title}", message, referencia="alertas"))
             if whats:
                 for w in whats:
-                    send_whatsapp(w.strip(), message)
+                    envios.append(dispatch_whatsapp(w.strip(), message, referencia="alertas"))
+    # Os envios correm em paralelo no pool de notifications; espera todos terminarem
+    wait(envios)
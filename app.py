@@ -1,10 +1,15 @@
 # app.py
 
 import os
+import click
 from flask import Flask
-from extensions import db, login_manager, migrate
+from extensions import db, login_manager
 from models import User, Company, Funcao, DocumentType
 from dotenv import load_dotenv
+import database
+import jobs
+import sql_profiler
+import thumbnails
 
 def normalize_upload_path(path):
     if not path: return ""
@@ -16,15 +21,27 @@ def create_app():
     app = Flask(__name__, template_folder="templates")
     
     app.jinja_env.filters['norm_upload'] = normalize_upload_path
+    app.jinja_env.filters['thumb'] = thumbnails.url
     
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'a-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI', 'sqlite:///app.db')
     app.config['UPLOAD_FOLDER'] = 'uploads'
+    # '' = o Flask envia os arquivos; 'x-accel' (nginx) ou 'x-sendfile' (Apache) = o proxy envia
+    app.config['UPLOADS_SENDFILE'] = os.environ.get('UPLOADS_SENDFILE', '')
+    app.config['UPLOADS_ACCEL_PREFIX'] = os.environ.get('UPLOADS_ACCEL_PREFIX', '/_uploads/')
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 
     db.init_app(app)
+    database.init_app(app, db)
+    sql_profiler.init_app(app)
     login_manager.init_app(app)
-    migrate.init_app(app, db)
+    # Flask-Migrate importa o Alembic (~15% da subida) e só serve aos comandos
+    # `flask ...`: o servidor (wsgi.py) sobe sem ele
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db, include_object=jobs.include_object)
+    jobs.init_app(app)
 
     # Importação dos blueprints
     from blueprints.main.routes import main_bp
@@ -89,5 +106,158 @@ def init_data():
     db.session.commit()
     print("Dados iniciais criados. Login: admin / admin123")
 
+@app.cli.command("fleet-rebuild")
+def fleet_rebuild():
+    """Recalcula a última manutenção / troca de óleo de cada veículo."""
+    from blueprints.fleet.maintenance import rebuild_projection
+    total = rebuild_projection()
+    print(f"Projeção de manutenção recalculada para {total} veículo(s).")
+
+@app.cli.command("pdv-reconcile")
+@click.option("--dias", default=1, show_default=True, help="Quantos dias (até hoje) conferir.")
+@click.option("--fix", is_flag=True, help="Regrava as linhas divergentes do livro-caixa.")
+def pdv_reconcile(dias, fix):
+    """Confere o livro-caixa do PDV contra os movimentos (rodar toda noite)."""
+    from blueprints.pdv.ledger import reconcile
+    divergencias = reconcile(dias=dias, corrigir=fix)
+    for (dia, user_id, pagamento), gravado, certo in divergencias:
+        print(f"{dia} usuário={user_id} {pagamento}: livro={gravado} movimentos={certo}")
+    if not divergencias:
+        print("Livro-caixa confere com os movimentos.")
+    elif fix:
+        print(f"{len(divergencias)} linha(s) corrigida(s).")
+
+@app.cli.command("uploads-dedup")
+@click.option("--dry-run", is_flag=True, help="Só calcula quanto seria economizado.")
+def uploads_dedup(dry_run):
+    """Migra os uploads antigos para o armazenamento por conteúdo (SHA-256), sem duplicatas."""
+    import storage
+    r = storage.migrar(dry_run=dry_run)
+    print(f"{r['arquivos']} arquivo(s), {r['duplicados']} duplicado(s), "
+          f"{r['bytes_economizados'] / 2**20:.1f} MB {'a economizar' if dry_run else 'economizados'}.")
+    if r["ausentes"]:
+        print(f"{r['ausentes']} registro(s) apontam para arquivos que não existem.")
+    if r["refs_corrigidas"]:
+        print(f"{r['refs_corrigidas']} contagem(ns) de referência corrigida(s).")
+
+@app.cli.command("uploads-gc")
+@click.option("--horas", type=float, default=None, help="Idade mínima sem referência (padrão: UPLOADS_GC_HORAS ou 24).")
+def uploads_gc(horas):
+    """Apaga os uploads que nenhum registro usa mais."""
+    import storage
+    storage.recontar()
+    apagados, liberados = storage.coletar(horas)
+    print(f"{apagados} arquivo(s) apagado(s), {liberados / 2**20:.1f} MB liberados.")
+
+@app.cli.command("thumbs-backfill")
+def thumbs_backfill():
+    """Gera as miniaturas dos uploads existentes e apaga as que sobraram."""
+    arquivos, gravadas, apagadas = thumbnails.backfill()
+    print(f"{arquivos} arquivo(s) com prévia: {gravadas} miniatura(s) gerada(s), {apagadas} obsoleta(s) apagada(s).")
+
+@app.cli.command("jobs-run")
+def jobs_run():
+    """Roda o agendador de tarefas neste processo (alternativa a subir junto com o web)."""
+    import time
+    jobs.start(app)
+    print("Agendador iniciado. Ctrl+C para sair.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        jobs.shutdown()
+
+@app.cli.command("db-bench")
+@click.option("--clientes", default=8, show_default=True, help="Caixas gravando ao mesmo tempo.")
+@click.option("--vendas", default=100, show_default=True, help="Vendas por caixa.")
+def db_bench(clientes, vendas):
+    """Compara a vazão de gravação do PDV no SQLite sem e com os pragmas/retry de database.py."""
+    from db_bench import PERFIS, rodar
+    print(f"{clientes} caixa(s) x {vendas} venda(s)")
+    print(f"{'perfil':<11}{'gravadas':>9}{'erros':>7}{'vendas/s':>10}{'p50 ms':>8}{'p95 ms':>8}")
+    for perfil in PERFIS:
+        r = rodar(perfil, clientes, vendas)
+        print(f"{perfil:<11}{r['gravadas']:>9}{r['erros']:>7}{r['por_segundo']:>10.1f}{r['p50_ms']:>8.1f}{r['p95_ms']:>8.1f}")
+
+@app.cli.command("epi-ledger-rebuild")
+def epi_ledger_rebuild():
+    """Recalcula o consolidado diário de EPI a partir das movimentações."""
+    from blueprints.epi.ledger import rebuild
+    print(f"Consolidado de EPI recalculado: {rebuild()} linha(s).")
+
+@app.cli.command("epi-stress")
+@click.option("--balcoes", default=16, show_default=True, help="Threads retirando ao mesmo tempo.")
+@click.option("--retiradas", default=50, show_default=True, help="Operações por thread.")
+@click.option("--estoque", default=100, show_default=True, help="Estoque inicial de cada EPI.")
+def epi_stress(balcoes, retiradas, estoque):
+    """Retiradas simultâneas de EPI num banco temporário; confere que o estoque fecha."""
+    from epi_stress import rodar
+    r = rodar(balcoes, retiradas, estoque)
+    print(f"{balcoes} balcão(ões) x {retiradas} operação(ões) em {r['segundos']:.1f}s: "
+          f"{r['aceitas']} retirada(s) aceita(s), {r['sem_saldo']} sem saldo, "
+          f"{r['entradas']} entrada(s), {r['erros']} erro(s) de banco")
+    print("Saldo final: " + ", ".join(f"{nome} {saldo}" for nome, saldo in r["saldos"].items()))
+    for problema in r["problemas"]:
+        print(f"ERRO: {problema}")
+    if r["problemas"]:
+        raise SystemExit(1)
+    print("Estoque confere com as movimentações.")
+
+@app.cli.command("notify-check")
+def notify_check():
+    """Envia e-mails e WhatsApps para servidores de mentira locais; confere pool, retry e status."""
+    from notify_check import rodar
+    falhas = 0
+    for nome, ok, detalhe in rodar():
+        falhas += not ok
+        print(f"{'ok  ' if ok else 'ERRO'} {nome}: {detalhe}")
+    if falhas:
+        raise SystemExit(1)
+    print("Envio de notificações confere.")
+
+@app.cli.command("startup-profile")
+@click.option("--rodadas", default=3, show_default=True, help="Subidas medidas (vale a mais rápida).")
+@click.option("--top", default=15, show_default=True, help="Quantos pacotes listar.")
+def startup_profile(rodadas, top):
+    """Mede a subida do app (import + create_app) e os pacotes que mais pesam."""
+    from startup_profile import medir
+    total, por_pacote, carregadas = medir(rodadas)
+    print(f"Subida: {total * 1000:.0f} ms (melhor de {rodadas})")
+    print(f"{'pacote':<24}{'ms':>8}")
+    for nome, segundos in sorted(por_pacote.items(), key=lambda i: i[1], reverse=True)[:top]:
+        print(f"{nome:<24}{segundos * 1000:>8.1f}")
+    if carregadas:
+        print("Importadas na subida (deveriam ser só no primeiro uso): " + ", ".join(carregadas))
+    else:
+        print("Nenhuma biblioteca pesada (PDF/HTTP/imagem) importada na subida.")
+
+@app.cli.command("db-explain")
+@click.option("--sql", is_flag=True, help="Mostra também o SQL de cada consulta.")
+def db_explain(sql):
+    """Mostra o plano de execução das consultas do painel, alertas e relatórios."""
+    from db_explain import explain_all, uses_full_scan
+    for nome, stmt, plan in explain_all():
+        flag = "  <-- SCAN sem índice" if uses_full_scan(plan) else ""
+        print(f"== {nome}{flag}")
+        if sql:
+            print(stmt)
+        for line in plan:
+            print(f"   {line}")
+
+@app.cli.command("query-budget")
+@click.option("--retiradas", default=60, show_default=True, help="Retiradas gravadas no banco temporário.")
+def query_budget(retiradas):
+    """Confere que as telas de EPI fazem no máximo um número fixo de consultas ao banco."""
+    from query_budget import rodar
+    estouros = 0
+    print(f"{'página':<28}{'status':>7}{'consultas':>11}{'limite':>8}")
+    for nome, status, consultas, limite in rodar(retiradas):
+        ok = status == 200 and consultas <= limite
+        estouros += not ok
+        print(f"{nome:<28}{status:>7}{consultas:>11}{limite:>8}{'' if ok else '  <-- ERRO'}")
+    if estouros:
+        raise SystemExit(1)
+    print("Todas as páginas dentro do limite de consultas.")
+
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -3,7 +3,10 @@ from flask import Blueprint, render_template, redirect, url_for, flash, current_
 from flask_login import login_required
 from utils import admin_required, save_file
 from alerts import send_alerts
-from models import AuditLog
+from jobs import enqueue
+from models import AuditLog, Notification
+import sql_profiler
+import storage
 import os, shutil
 
 admin_bp = Blueprint("admin", __name__, template_folder='../../templates/admin')
@@ -12,8 +15,10 @@ admin_bp = Blueprint("admin", __name__, template_folder='../../templates/admin')
 @login_required
 @admin_required
 def trigger_alerts():
-    send_alerts()
-    flash("Alertas disparados.", "success")
+    if enqueue(send_alerts):
+        flash("Alertas enfileirados; o envio segue em segundo plano.", "success")
+    else:
+        flash("Alertas disparados.", "success")
     return redirect(url_for("main.index"))
 
 @admin_bp.route("/auditoria")
@@ -23,6 +28,29 @@ def audit():
     logs = AuditLog.query.order_by(AuditLog.created_at.desc()).limit(500).all()
     return render_template("admin/audit.html", logs=logs)
 
+@admin_bp.route("/notificacoes")
+@login_required
+@admin_required
+def notifications():
+    items = Notification.query.order_by(Notification.created_at.desc()).limit(500).all()
+    return render_template("admin/notifications.html", items=items)
+
+@admin_bp.route("/perf")
+@login_required
+@admin_required
+def perf():
+    desde, rotas, sinalizadas = sql_profiler.resumo()
+    return render_template("admin/perf.html", ativo=sql_profiler.ativo(current_app), desde=desde,
+                           rotas=rotas, sinalizadas=sinalizadas)
+
+@admin_bp.route("/perf/limpar")
+@login_required
+@admin_required
+def perf_reset():
+    sql_profiler.limpar()
+    flash("Números de desempenho zerados.", "success")
+    return redirect(url_for("admin.perf"))
+
 @admin_bp.route("/config", methods=["GET","POST"])
 @login_required
 @admin_required
@@ -40,14 +68,16 @@ def settings():
         if form.logo_sidebar.data:
             p = save_file(form.logo_sidebar.data, "branding")
             if p:
-                src = os.path.join(current_app.root_path, p)
+                src = os.path.join(storage.upload_root(), p)
                 dst = os.path.join(current_app.root_path, "static", "img", "logo.png")
                 os.makedirs(os.path.dirname(dst), exist_ok=True)
                 shutil.copyfile(src, dst); msgs.append("Logo da sidebar atualizada.")
+                from pdf_reports import invalidate_assets
+                invalidate_assets(dst)  # logo dos comprovantes/orçamentos em PDF
         if form.logo_login.data:
             p = save_file(form.logo_login.data, "branding")
             if p:
-                src = os.path.join(current_app.root_path, p)
+                src = os.path.join(storage.upload_root(), p)
                 dst = os.path.join(current_app.root_path, "static", "img", "logo-login.png")
                 os.makedirs(os.path.dirname(dst), exist_ok=True)
                 shutil.copyfile(src, dst); msgs.append("Logo da tela de login atualizada.")
@@ -5,6 +5,8 @@ from . import agendamentos_bp
 from models import db, Servico, Agendamento, Customer, Company
 from forms import ServicoForm, AgendamentoForm
 from datetime import datetime
+from sqlalchemy.orm import joinedload
+from pagination import paginate, Key
 
 # ... (código do _get_company_header e das rotas de serviço continua igual) ...
 def _get_company_header():
@@ -60,8 +62,9 @@ def servico_delete(servico_id):
 @agendamentos_bp.route('/lista')
 @login_required
 def agendamento_list():
-    agendamentos = Agendamento.query.order_by(Agendamento.data_hora.desc()).all()
-    return render_template('agendamentos/agendamento_list.html', items=agendamentos)
+    query = Agendamento.query.options(joinedload(Agendamento.customer), joinedload(Agendamento.servico))
+    page = paginate(query, [Key(Agendamento.data_hora, desc=True), Key(Agendamento.id, desc=True)])
+    return render_template('agendamentos/agendamento_list.html', items=page.items, page=page)
 
 # --- FUNÇÃO DE SALVAR CORRIGIDA E MELHORADA ---
 def _save_agendamento(form, agendamento=None):
@@ -6,8 +6,7 @@ from extensions import db
 from models import Company
 from forms import CompanyForm
 from audit import log_action
-from pdf_reports import company_pdf as _company_pdf
-import io, requests
+import io
 
 companies_bp = Blueprint("companies", __name__, template_folder='../../templates/companies')
 
@@ -70,6 +69,7 @@ def delete(company_id):
 def company_pdf(company_id):
     c = Company.query.get_or_404(company_id)
     bio = io.BytesIO()
+    from pdf_reports import company_pdf as _company_pdf
     _company_pdf(bio, current_app, c)
     bio.seek(0)
     return send_file(bio, as_attachment=True, download_name=f"empresa_{c.id}.pdf", mimetype="application/pdf")
@@ -78,6 +78,7 @@ def company_pdf(company_id):
 @login_required
 def api_cnpj(cnpj):
     try:
+        import requests
         r = requests.get(f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}", timeout=10)
         if r.status_code==200:
             d = r.json()
@@ -6,6 +6,8 @@ from extensions import db
 from models import Customer, CashMovement
 from forms import CustomerForm
 from sqlalchemy import or_
+from pagination import paginate
+from blueprints.pdv.ledger import quitar_conta
 
 # A criação do Blueprint
 customers_bp = Blueprint('customers', __name__)
@@ -21,8 +23,8 @@ def list():
             (Customer.nome_razao_social.ilike(like)) |
             (Customer.cpf_cnpj.ilike(like))
         )
-    items = query.order_by(Customer.nome_razao_social).all()
-    return render_template("customers/list.html", items=items, q=q)
+    page = paginate(query, [Customer.nome_razao_social, Customer.id])
+    return render_template("customers/list.html", items=page.items, page=page, q=q)
 
 @customers_bp.route("/novo", methods=["GET", "POST"])
 @login_required
@@ -104,38 +106,11 @@ def pay(customer_id):
         flash("Por favor, selecione a forma de pagamento.", "danger")
         return redirect(url_for('customers.account', customer_id=customer_id))
 
-    # Filtra apenas os movimentos que realmente pertencem ao cliente e estão pendentes
-    movements_to_pay = CashMovement.query.filter(
-        CashMovement.id.in_(movement_ids_to_pay),
-        CashMovement.customer_id == customer_id,
-        CashMovement.status == 'Pendente'
-    ).all()
-
-    if not movements_to_pay:
+    # Um único PAGAMENTO quita as pesagens pendentes do cliente (ver pdv/ledger.py)
+    new_payment = quitar_conta(customer_id, movement_ids_to_pay, payment_method, getattr(current_user, "id", None))
+    if new_payment is None:
         flash("Nenhuma pendência válida encontrada para os itens selecionados.", "error")
         return redirect(url_for('customers.account', customer_id=customer_id))
 
-    total_paid = sum(mov.valor for mov in movements_to_pay)
-
-    # 1. Cria um único registro de PAGAMENTO
-    new_payment = CashMovement(
-        tipo='PAGAMENTO',
-        valor=total_paid,
-        pagamento=payment_method,
-        descricao=f"Pagamento de {len(movements_to_pay)} pesagem(ns)",
-        customer_id=customer_id,
-        user_id=getattr(current_user, "id", None),
-        status='Pago' # Pagamentos já entram como "Pago"
-    )
-    db.session.add(new_payment)
-    db.session.commit() # Salva para obter o ID do pagamento
-
-    # 2. Atualiza o status das pesagens pagas e as vincula ao novo registro de pagamento
-    for mov in movements_to_pay:
-        mov.status = 'Pago'
-        mov.pagamento_id = new_payment.id # Vincula a dívida ao pagamento
-
-    db.session.commit()
-
-    flash(f"Pagamento de R$ {total_paid:.2f} registrado com sucesso!", "success")
+    flash(f"Pagamento de R$ {new_payment.valor:.2f} registrado com sucesso!", "success")
     return redirect(url_for('customers.account', customer_id=customer_id))
\ No newline at end of file
@@ -0,0 +1,170 @@
+# blueprints/dash/queries.py
+"""
+Consultas do painel: as contagens dos cards saem de uma única consulta
+agregada (SUM(CASE ...)) por tabela; as listas dos modais só são buscadas
+quando o modal é aberto (rota JSON dash.dashboard_detalhes).
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload, aliased
+from extensions import db
+from models import Document, Employee, Agendamento, Proposal, Vehicle, MaintenanceLog
+
+DIAS_A_VENCER = 30
+DIAS_AGENDAMENTOS = 7
+
+def _conta_se(*conds):
+    """COUNT condicional portátil (SQLite/PostgreSQL)."""
+    return func.coalesce(func.sum(case((db.and_(*conds), 1), else_=0)), 0)
+
+def _janelas(hoje=None, agora=None):
+    hoje = hoje or date.today()
+    agora = agora or datetime.now()
+    return {
+        "hoje": hoje,
+        "em_30": hoje + timedelta(days=DIAS_A_VENCER),
+        "agora": agora,
+        "em_7_dias": agora + timedelta(days=DIAS_AGENDAMENTOS),
+    }
+
+# --- Filtros de cada card (reaproveitados pela contagem e pelo detalhe) ---
+def _filtros(j):
+    hoje, em_30 = j["hoje"], j["em_30"]
+    agora, em_7 = j["agora"], j["em_7_dias"]
+    ativo = Employee.ativo == True  # noqa: E712
+    return {
+        "docs_venc": (Document, [Document.data_vencimento < hoje], Document.data_vencimento),
+        "docs_avencer": (Document, [Document.data_vencimento >= hoje, Document.data_vencimento <= em_30], Document.data_vencimento),
+        "aso_venc": (Employee, [Employee.aso_validade < hoje, ativo], Employee.aso_validade),
+        "aso_avencer": (Employee, [Employee.aso_validade >= hoje, Employee.aso_validade <= em_30, ativo], Employee.aso_validade),
+        "cnh_venc": (Employee, [Employee.cnh_validade < hoje, ativo], Employee.cnh_validade),
+        "cnh_avencer": (Employee, [Employee.cnh_validade >= hoje, Employee.cnh_validade <= em_30, ativo], Employee.cnh_validade),
+        "tox_venc": (Employee, [Employee.exame_toxico_validade < hoje, ativo], Employee.exame_toxico_validade),
+        "tox_avencer": (Employee, [Employee.exame_toxico_validade >= hoje, Employee.exame_toxico_validade <= em_30, ativo], Employee.exame_toxico_validade),
+        "agendamentos_atrasados": (Agendamento, [Agendamento.data_hora < agora, Agendamento.status == 'Agendado'], Agendamento.data_hora),
+        "agendamentos_proximos": (Agendamento, [Agendamento.data_hora >= agora, Agendamento.data_hora <= em_7, Agendamento.status == 'Agendado'], Agendamento.data_hora),
+        "licenc_venc": (Vehicle, [Vehicle.venc_licenciamento < hoje], Vehicle.venc_licenciamento),
+        "licenc_avencer": (Vehicle, [Vehicle.venc_licenciamento >= hoje, Vehicle.venc_licenciamento <= em_30], Vehicle.venc_licenciamento),
+    }
+
+def count_queries(hoje=None, agora=None):
+    """Consultas (não executadas) das contagens: uma agregada por tabela."""
+    filtros = _filtros(_janelas(hoje, agora))
+    queries = {}
+    for model in (Document, Employee, Agendamento, Vehicle):
+        chaves = [k for k, (m, _, _) in filtros.items() if m is model]
+        colunas = [_conta_se(*filtros[k][1]).label(k) for k in chaves]
+        if model is Employee:
+            colunas += [func.count(Employee.id).label("total_func"),
+                        _conta_se(Employee.ativo == True).label("ativos")]  # noqa: E712
+        queries[model.__tablename__] = db.session.query(*colunas).select_from(model)
+    queries["proposal"] = db.session.query(func.count(Proposal.id).label("pending_proposals")).filter(Proposal.status == 'Pendente')
+    queries["oleo_avencer"] = _oleo_avencer_query()
+    return queries
+
+def dashboard_counts(hoje=None, agora=None):
+    """Todas as contagens dos cards."""
+    queries = count_queries(hoje, agora)
+    counts = {}
+    for nome, query in queries.items():
+        if nome == "oleo_avencer":
+            counts[nome] = query.count()
+            continue
+        row = query.one()
+        counts.update({k: int(v or 0) for k, v in row._mapping.items()})
+    counts["inativos"] = counts["total_func"] - counts["ativos"]
+    return counts
+
+# --- Detalhes dos modais (carregados sob demanda) ---
+def _fmt_data(d, fmt='%d/%m/%Y'):
+    return d.strftime(fmt) if d else ''
+
+def _linhas_documentos(items):
+    return [{
+        "cols": [d.company.razao_social if d.company else 'N/A', d.descricao or '', _fmt_data(d.data_vencimento)],
+        "url": ("documents.edit", {"doc_id": d.id}),
+    } for d in items]
+
+def _linhas_funcionarios(attr):
+    def _linhas(items):
+        return [{
+            "cols": [e.nome, _fmt_data(getattr(e, attr))],
+            "url": ("rh.employees_edit", {"emp_id": e.id}),
+        } for e in items]
+    return _linhas
+
+def _linhas_agendamentos(items):
+    return [{
+        "cols": [_fmt_data(a.data_hora, '%d/%m/%Y %H:%M'),
+                 a.customer.nome_razao_social if a.customer else (a.visitante_nome or '-'),
+                 a.servico.nome if a.servico else '', a.local or ''],
+        "url": ("agendamentos.agendamento_edit", {"agendamento_id": a.id}),
+    } for a in items]
+
+def _linhas_licenciamento(items):
+    return [{
+        "cols": [v.nome, v.placa, _fmt_data(v.venc_licenciamento)],
+        "url": ("fleet.details", {"vehicle_id": v.id}),
+    } for v in items]
+
+_SERIALIZADORES = {
+    "docs_venc": _linhas_documentos,
+    "docs_avencer": _linhas_documentos,
+    "aso_venc": _linhas_funcionarios("aso_validade"),
+    "aso_avencer": _linhas_funcionarios("aso_validade"),
+    "cnh_venc": _linhas_funcionarios("cnh_validade"),
+    "cnh_avencer": _linhas_funcionarios("cnh_validade"),
+    "tox_venc": _linhas_funcionarios("exame_toxico_validade"),
+    "tox_avencer": _linhas_funcionarios("exame_toxico_validade"),
+    "agendamentos_atrasados": _linhas_agendamentos,
+    "agendamentos_proximos": _linhas_agendamentos,
+    "licenc_venc": _linhas_licenciamento,
+    "licenc_avencer": _linhas_licenciamento,
+}
+
+def _eager(model):
+    # Montado na hora: joinedload() no import configuraria todos os mappers
+    # já na subida do app (e em todo comando `flask`)
+    if model is Document:
+        return (joinedload(Document.company),)
+    if model is Agendamento:
+        return (joinedload(Agendamento.customer), joinedload(Agendamento.servico))
+    return ()
+
+# Um valor de "alerta" de KM, ex: 1000km antes do vencimento
+KM_ALERTA_OLEO = 1000
+
+def _oleo_avencer_query():
+    log = aliased(MaintenanceLog)
+    return (db.session.query(Vehicle, log)
+            .join(log, log.id == Vehicle.ultima_manutencao_id)
+            .filter(log.km_atual.isnot(None), log.km_proxima_troca.isnot(None),
+                    log.km_atual != 0, log.km_proxima_troca != 0,
+                    log.km_atual >= log.km_proxima_troca - KM_ALERTA_OLEO))
+
+def veiculos_oleo_avencer():
+    """Pares (veículo, último registro de manutenção) com troca de óleo próxima."""
+    return _oleo_avencer_query().order_by(Vehicle.nome).all()
+
+def _linhas_oleo(items):
+    return [{
+        "cols": [v.nome, v.placa, log.km_atual if log else 'N/A', log.km_proxima_troca if log else 'N/A'],
+        "url": ("fleet.details", {"vehicle_id": v.id}),
+    } for v, log in items]
+
+def detail_query(kind, hoje=None, agora=None):
+    """Query (não executada) da lista de um card; None se o tipo não existir."""
+    filtros = _filtros(_janelas(hoje, agora))
+    if kind not in filtros:
+        return None
+    model, conds, ordem = filtros[kind]
+    return model.query.options(*_eager(model)).filter(*conds).order_by(ordem.asc())
+
+def detail_rows(kind, hoje=None, agora=None):
+    """Linhas prontas (colunas formatadas + endpoint) para o modal do card."""
+    if kind == "oleo_avencer":
+        return _linhas_oleo(veiculos_oleo_avencer())
+    query = detail_query(kind, hoje, agora)
+    if query is None:
+        return None
+    return _SERIALIZADORES[kind](query.all())
@@ -6,49 +6,25 @@ from models import Document, DocumentType, Company
 from forms import DocumentForm, DocTypeForm
 from utils import save_file
 from audit import log_action
-from pdf_reports import documents_pdf as _documents_pdf
+from pagination import paginate, Key
+from sqlalchemy.orm import joinedload
+from filters import DocumentFilters
 import io
-from datetime import date, datetime as _dt, timedelta
+from datetime import date, timedelta
 
 documents_bp = Blueprint("documents", __name__, template_folder='../../templates/documents')
 
 @documents_bp.route("/")
 @login_required
 def list():
-    company_id = request.args.get("company_id", type=int)
-    tipo_id = request.args.get("tipo_id", type=int)
-    status = request.args.get("status", "")
-    q = request.args.get("q","").strip()
-    venc_de = request.args.get("venc_de")
-    venc_ate = request.args.get("venc_ate")
-
-    query = Document.query
-    if company_id: query = query.filter_by(company_id=company_id)
-    if tipo_id: query = query.filter_by(tipo_id=tipo_id)
-    if q:
-        like = f"%{q}%"
-        query = query.filter((Document.descricao.ilike(like)) | (Document.numero.ilike(like)) | (Document.orgao_emissor.ilike(like)) | (Document.responsavel.ilike(like)))
-    docs = query.order_by(Document.data_vencimento.asc()).all()
-
-    if status:
-        tmp=[]
-        for d in docs:
-            st = d.status
-            if status=="vencido" and st=="Vencido": tmp.append(d)
-            elif status=="a_vencer" and st=="A vencer": tmp.append(d)
-            elif status=="vigente" and st=="Vigente": tmp.append(d)
-        docs = tmp
-
-    def parse_date(s):
-        try: return _dt.strptime(s,"%Y-%m-%d").date()
-        except: return None
-    d1, d2 = parse_date(venc_de), parse_date(venc_ate)
-    if d1: docs = [d for d in docs if d.data_vencimento and d.data_vencimento >= d1]
-    if d2: docs = [d for d in docs if d.data_vencimento and d.data_vencimento <= d2]
+    filtros = DocumentFilters.from_args(request.args)
+    query = filtros.apply(Document.query).options(joinedload(Document.company), joinedload(Document.tipo))
+    page = paginate(query, [Key(Document.data_vencimento, nullable=True), Key(Document.id)])
+    docs = page.items
 
     companies = Company.query.order_by(Company.razao_social).all()
     tipos = DocumentType.query.order_by(DocumentType.nome).all()
-    return render_template("documents/list.html", items=docs, companies=companies, tipos=tipos, company_id=company_id, tipo_id=tipo_id, status=status, q=q, venc_de=venc_de, venc_ate=venc_ate)
+    return render_template("documents/list.html", items=docs, page=page, companies=companies, tipos=tipos, **filtros.template_args())
 
 @documents_bp.route("/new", methods=["GET","POST"])
 @login_required
@@ -116,37 +92,15 @@ def tipos_edit(tid):
 @documents_bp.route("/exportar.pdf")
 @login_required
 def export_pdf_filtered():
-    company_id = request.args.get("company_id", type=int)
-    tipo_id = request.args.get("tipo_id", type=int)
-    status = request.args.get("status", "")
-    q = request.args.get("q","").strip()
-    de = request.args.get("venc_de"); ate = request.args.get("venc_ate")
-
-    query = Document.query
-    if company_id: query = query.filter(Document.company_id == int(company_id))
-    if tipo_id: query = query.filter(Document.tipo_id == int(tipo_id))
-    if q:
-        like = f"%{q}%"
-        query = query.filter((Document.descricao.ilike(like)) | (Document.numero.ilike(like)) | (Document.orgao_emissor.ilike(like)) | (Document.responsavel.ilike(like)))
-    docs = query.order_by(Document.data_vencimento.asc()).all()
-
-    from datetime import datetime as _dt
-    if status:
-        tmp = []
-        for d in docs:
-            st = d.status
-            if status == "vencido" and st == "Vencido": tmp.append(d)
-            elif status == "a_vencer" and st == "A vencer": tmp.append(d)
-            elif status == "vigente" and st == "Vigente": tmp.append(d)
-        docs = tmp
-    def parse_date(s):
-        try: return _dt.strptime(s, "%Y-%m-%d").date()
-        except: return None
-    d1, d2 = parse_date(de), parse_date(ate)
-    if d1: docs = [d for d in docs if d.data_vencimento and d.data_vencimento >= d1]
-    if d2: docs = [d for d in docs if d.data_vencimento and d.data_vencimento <= d2]
+    # Mesmos filtros e mesma ordem da lista (documents.list), sem paginação
+    filtros = DocumentFilters.from_args(request.args)
+    docs = (filtros.apply(Document.query)
+            .options(joinedload(Document.company), joinedload(Document.tipo))
+            .order_by(Document.data_vencimento.is_(None), Document.data_vencimento.asc(), Document.id.asc())
+            .all())
 
     bio = io.BytesIO()
+    from pdf_reports import documents_pdf as _documents_pdf
     _documents_pdf(bio, current_app, docs, titulo="Documentos (filtro aplicado)")
     bio.seek(0)
     return send_file(bio, as_attachment=True, download_name="documentos_filtro.pdf", mimetype="application/pdf")
@@ -157,6 +111,7 @@ def export_pdf_vencidos():
     hoje = date.today()
     docs = Document.query.filter(Document.data_vencimento < hoje).order_by(Document.data_vencimento.asc()).all()
     bio = io.BytesIO()
+    from pdf_reports import documents_pdf as _documents_pdf
     _documents_pdf(bio, current_app, docs, titulo="Documentos Vencidos")
     bio.seek(0)
     return send_file(bio, as_attachment=True, download_name="documentos_vencidos.pdf", mimetype="application/pdf")
@@ -167,6 +122,7 @@ def export_pdf_a_vencer():
     hoje = date.today(); em_30 = hoje + timedelta(days=30)
     docs = Document.query.filter(Document.data_vencimento >= hoje, Document.data_vencimento <= em_30).order_by(Document.data_vencimento.asc()).all()
     bio = io.BytesIO()
+    from pdf_reports import documents_pdf as _documents_pdf
     _documents_pdf(bio, current_app, docs, titulo="Documentos a Vencer (30 dias)")
     bio.seek(0)
     return send_file(bio, as_attachment=True, download_name="documentos_a_vencer.pdf", mimetype="application/pdf")
@@ -0,0 +1,129 @@
+# blueprints/epi/ledger.py
+"""
+Consolidado diário do estoque de EPI.
+
+Cada MovimentacaoEPI gravada por stock.retirar / stock.dar_entrada soma sua
+quantidade na linha (dia, EPI, funcionário) de EPILedger, na mesma
+transação. O relatório de EPI e o painel de consumo leem essas linhas em vez
+de percorrer movimentacao_epi:
+
+- estoque de um EPI numa data = EPI.estoque (o contador atual) menos as
+  entradas e mais as saídas dos dias seguintes;
+- consumo do mês = soma das linhas diárias do mês.
+
+`flask epi-ledger-rebuild` recalcula tudo a partir das movimentações.
+"""
+from datetime import date
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
+from models import db, EPI, EPILedger, EPISaida, MovimentacaoEPI
+from database import dia_expr
+
+def _quantidades(tipo, quantidade):
+    """(entradas, saídas) da movimentação."""
+    return (quantidade, 0) if tipo == "ENTRADA" else (0, quantidade)
+
+def registrar_movimento(mov):
+    """Soma `mov` no consolidado. Chamar antes do commit que grava a movimentação."""
+    if mov.data_movimentacao is None:
+        db.session.flush()  # aplica o default de data_movimentacao
+    employee_id = mov.employee_id or (mov.saida.employee_id if mov.saida else None) or 0
+    chave = dict(dia=mov.data_movimentacao.date(), epi_id=mov.epi_id, employee_id=employee_id)
+    entradas, saidas = _quantidades(mov.tipo, mov.quantidade)
+
+    # Soma no próprio banco, como no livro-caixa do PDV
+    upd = (EPILedger.__table__.update()
+           .where(*(getattr(EPILedger, k) == v for k, v in chave.items()))
+           .values(entradas=EPILedger.entradas + entradas, saidas=EPILedger.saidas + saidas, qtd=EPILedger.qtd + 1))
+    if db.session.execute(upd).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(EPILedger(**chave, entradas=entradas, saidas=saidas, qtd=1))
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT
+        db.session.execute(upd)
+
+def rebuild():
+    """Apaga e recalcula o consolidado a partir das movimentações; devolve quantas linhas gravou."""
+    dia = dia_expr(MovimentacaoEPI.data_movimentacao).label("dia")
+    funcionario = func.coalesce(MovimentacaoEPI.employee_id, EPISaida.employee_id, 0)
+    linhas = db.session.query(
+        dia,
+        MovimentacaoEPI.epi_id,
+        funcionario,
+        func.sum(case((MovimentacaoEPI.tipo == "ENTRADA", MovimentacaoEPI.quantidade), else_=0)),
+        func.sum(case((MovimentacaoEPI.tipo == "SAIDA", MovimentacaoEPI.quantidade), else_=0)),
+        func.count(MovimentacaoEPI.id),
+    ).outerjoin(EPISaida, EPISaida.id == MovimentacaoEPI.saida_id
+    ).filter(MovimentacaoEPI.data_movimentacao.isnot(None)
+    ).group_by(dia, MovimentacaoEPI.epi_id, funcionario).all()
+
+    EPILedger.query.delete()
+    db.session.add_all(EPILedger(dia=d, epi_id=e, employee_id=f, entradas=int(ent or 0), saidas=int(sai or 0), qtd=q)
+                       for d, e, f, ent, sai, q in linhas)
+    db.session.commit()
+    return len(linhas)
+
+# -------------------- consultas --------------------
+def saldos_em(dia):
+    """{epi_id: estoque no fim de `dia`} de todos os EPIs."""
+    depois = dict(db.session.query(EPILedger.epi_id, func.sum(EPILedger.entradas - EPILedger.saidas))
+                  .filter(EPILedger.dia > dia).group_by(EPILedger.epi_id).all())
+    return {epi_id: (estoque or 0) - int(depois.get(epi_id) or 0)
+            for epi_id, estoque in db.session.query(EPI.id, EPI.estoque)}
+
+def resumo_periodo(inicio, fim):
+    """
+    Por EPI, ordenado pelo nome: (nome, estoque inicial, entradas, saídas,
+    estoque final) de `inicio` a `fim`.
+    """
+    movimento = dict((epi_id, (int(ent or 0), int(sai or 0))) for epi_id, ent, sai in
+                     db.session.query(EPILedger.epi_id, func.sum(EPILedger.entradas), func.sum(EPILedger.saidas))
+                     .filter(EPILedger.dia >= inicio, EPILedger.dia <= fim).group_by(EPILedger.epi_id))
+    finais = saldos_em(fim)
+    resumo = []
+    for epi_id, nome in db.session.query(EPI.id, EPI.nome).order_by(EPI.nome):
+        entradas, saidas = movimento.get(epi_id, (0, 0))
+        final = finais.get(epi_id, 0)
+        resumo.append((nome, final - entradas + saidas, entradas, saidas, final))
+    return resumo
+
+def _mes(dia):
+    return date(dia.year, dia.month, 1)
+
+def ultimos_meses(n, hoje=None):
+    """Primeiro dia de cada um dos `n` últimos meses (o atual incluído), do mais antigo ao atual."""
+    hoje = hoje or date.today()
+    ano, mes = hoje.year, hoje.month
+    meses = []
+    for _ in range(n):
+        meses.append(date(ano, mes, 1))
+        ano, mes = (ano, mes - 1) if mes > 1 else (ano - 1, 12)
+    return meses[::-1]
+
+def consumo_mensal(inicio, fim):
+    """
+    Saídas por mês de `inicio` a `fim`: ({(mês, epi_id): qtd},
+    {(mês, employee_id): qtd}), com mês = primeiro dia do mês e
+    employee_id 0 para terceiros.
+    """
+    por_epi, por_funcionario = {}, {}
+    linhas = (db.session.query(EPILedger.dia, EPILedger.epi_id, EPILedger.employee_id, EPILedger.saidas)
+              .filter(EPILedger.dia >= inicio, EPILedger.dia <= fim, EPILedger.saidas > 0))
+    for dia, epi_id, employee_id, saidas in linhas:
+        mes = _mes(dia)
+        por_epi[(mes, epi_id)] = por_epi.get((mes, epi_id), 0) + saidas
+        por_funcionario[(mes, employee_id)] = por_funcionario.get((mes, employee_id), 0) + saidas
+    return por_epi, por_funcionario
+
+def tabela_mensal(valores, meses, nome):
+    """
+    Linhas (nome, [qtd de cada mês de `meses`], total) de um dos dicionários
+    de consumo_mensal, do maior total para o menor. `nome(chave)` dá o rótulo.
+    """
+    linhas = {}
+    for (mes, chave), qtd in valores.items():
+        linhas.setdefault(chave, dict.fromkeys(meses, 0))[mes] += qtd
+    return sorted(((nome(chave), [m[c] for c in meses], sum(m.values())) for chave, m in linhas.items()),
+                  key=lambda r: (-r[2], r[0]))
@@ -0,0 +1,165 @@
+# blueprints/epi/receipts.py
+"""
+Comprovantes de retirada de EPI.
+
+O comprovante é gerado uma única vez, em segundo plano (jobs.enqueue) logo
+depois que a retirada é gravada, e guardado como blob (storage.py) em
+EPISaida.receipt_pdf_path. A reimpressão só envia o arquivo; se ele ainda
+não existe, espera a tarefa (e a enfileira de novo se ela se perdeu), sem
+gerar o PDF na requisição. Retirada de funcionário cadastrado: o mesmo
+arquivo entra nos documentos dele ("Comprovante de EPI"), sem cópia.
+
+Só uma geração por retirada: antes de montar o PDF, a tarefa reserva a
+linha com um UPDATE condicional em EPISaida.receipt_reservado_em (vazio ou
+com mais de PRAZO_RESERVA segundos, de uma geração que morreu); quem não
+consegue a reserva desiste. receipt_pdf_path só muda na gravação final,
+então o caminho anterior nunca se perde.
+
+Retiradas de antes dos comprovantes em blob têm o PDF só nos documentos do
+funcionário (func_docs/comprovante_epi_<id>_<data>.pdf): esse documento é
+adotado, e não duplicado.
+"""
+import io
+import os
+import time
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import or_, update
+import jobs
+import storage
+from database import retry_locked
+from models import db, EPISaida, EmployeeDocument, now_sao_paulo
+
+PRAZO_RESERVA = 120  # segundos
+TIPO_DOCUMENTO = "Comprovante de EPI"
+
+def _agora():
+    return now_sao_paulo().replace(tzinfo=None)
+
+def em_andamento(saida):
+    """True se uma geração reservou o comprovante há menos de PRAZO_RESERVA segundos."""
+    reservado = saida.receipt_reservado_em
+    return reservado is not None and reservado > _agora() - timedelta(seconds=PRAZO_RESERVA)
+
+def _existe(path):
+    return bool(path) and os.path.isfile(os.path.join(storage.upload_root(), storage.normalizar(path)))
+
+def arquivo(saida):
+    """Caminho completo do comprovante já gerado, ou None."""
+    if not _existe(saida.receipt_pdf_path):
+        return None
+    return os.path.join(storage.upload_root(), storage.normalizar(saida.receipt_pdf_path))
+
+def agendar(saida_id):
+    """Enfileira a geração. Chamar depois do commit da retirada."""
+    jobs.enqueue(gerar, saida_id)
+
+def esperar(saida_id, segundos):
+    """Espera até `segundos` a tarefa gravar o comprovante; devolve o caminho completo ou None."""
+    limite = time.monotonic() + segundos
+    while True:
+        db.session.rollback()  # lê de novo o banco a cada volta
+        saida = db.session.get(EPISaida, saida_id)
+        pronto = arquivo(saida) if saida else None
+        if pronto or time.monotonic() >= limite:
+            return pronto
+        time.sleep(0.2)
+
+def _legado(saida):
+    """Documento "Comprovante de EPI" gravado antes de receipt_pdf_path existir, ou None."""
+    if not saida.employee_id:
+        return None
+    return EmployeeDocument.query.filter(
+        EmployeeDocument.employee_id == saida.employee_id,
+        EmployeeDocument.tipo == TIPO_DOCUMENTO,
+        EmployeeDocument.arquivo_path.like(f"%comprovante!_epi!_{saida.id}!_%", escape="!"),
+    ).order_by(EmployeeDocument.id).first()
+
+@retry_locked
+def _adotar(saida_id, path):
+    """Aponta a retirada (ainda sem comprovante) para o arquivo do documento antigo."""
+    saida = db.session.get(EPISaida, saida_id, with_for_update=True)
+    if saida.receipt_pdf_path is None:
+        saida.receipt_pdf_path = path
+    db.session.commit()
+    return arquivo(saida)
+
+@retry_locked
+def _reservar(saida_id, visto):
+    """Reserva a geração; devolve a hora da reserva, ou None se outra geração chegou antes."""
+    agora = _agora()
+    mesmo_caminho = EPISaida.receipt_pdf_path.is_(None) if visto is None else EPISaida.receipt_pdf_path == visto
+    res = db.session.execute(
+        update(EPISaida).where(
+            EPISaida.id == saida_id, mesmo_caminho,
+            or_(EPISaida.receipt_reservado_em.is_(None),
+                EPISaida.receipt_reservado_em < agora - timedelta(seconds=PRAZO_RESERVA)),
+        ).values(receipt_reservado_em=agora).execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        db.session.rollback()
+        return None
+    db.session.commit()
+    return agora
+
+def _liberar(saida_id, marca):
+    """Desfaz a reserva (a geração falhou) para a próxima tentativa não esperar o prazo."""
+    db.session.rollback()
+    db.session.execute(
+        update(EPISaida).where(EPISaida.id == saida_id, EPISaida.receipt_reservado_em == marca)
+        .values(receipt_reservado_em=None).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+@retry_locked
+def _gravar(saida_id, marca, buffer, antigo):
+    saida = db.session.get(EPISaida, saida_id, with_for_update=True)
+    if saida.receipt_reservado_em != marca:
+        # A reserva venceu e outra geração assumiu
+        db.session.rollback()
+        return arquivo(saida)
+    buffer.seek(0)
+    saida.receipt_pdf_path = storage.guardar(buffer, f"comprovante_epi_{saida.id}.pdf")
+    saida.receipt_reservado_em = None
+    docs = EmployeeDocument.query.filter_by(arquivo_path=antigo).all() if antigo else []
+    for doc in docs:
+        doc.arquivo_path = saida.receipt_pdf_path
+    if not docs and saida.employee_id and not EmployeeDocument.query.filter_by(
+            employee_id=saida.employee_id, arquivo_path=saida.receipt_pdf_path).first():
+        db.session.add(EmployeeDocument(
+            employee_id=saida.employee_id,
+            tipo=TIPO_DOCUMENTO,
+            descricao=f"Retirada de {len(saida.items)} tipo(s) de EPI.",
+            arquivo_path=saida.receipt_pdf_path,
+        ))
+    db.session.commit()
+    return arquivo(saida)
+
+def gerar(saida_id):
+    """Tarefa: grava o comprovante de `saida_id`, se ainda não existe; devolve o caminho completo ou None."""
+    from pdf_reports import epi_saida_pdf
+    saida = db.session.get(EPISaida, saida_id)
+    if saida is None:
+        return None
+    pronto = arquivo(saida)
+    if pronto or em_andamento(saida):
+        db.session.rollback()
+        return pronto
+    visto = saida.receipt_pdf_path  # None ou arquivo perdido do disco
+    legado = _legado(saida) if visto is None else None
+    antigo = visto or (legado.arquivo_path if legado else None)
+    db.session.rollback()
+    if legado and _existe(antigo):
+        return _adotar(saida_id, antigo)
+    marca = _reservar(saida_id, visto)
+    if marca is None:
+        return None
+
+    try:
+        buffer = io.BytesIO()
+        epi_saida_pdf(buffer, current_app, db.session.get(EPISaida, saida_id))
+        db.session.rollback()  # só leitura; a gravação é outra transação curta
+        return _gravar(saida_id, marca, buffer, antigo)
+    except Exception:
+        _liberar(saida_id, marca)
+        raise
@@ -1,14 +1,14 @@
 # blueprints/epi/routes.py
 import io
-import os
 from flask import render_template, request, redirect, url_for, flash, send_file, current_app
 from flask_login import login_required
 from . import epi_bp
-from models import db, Fornecedor, EPI, MovimentacaoEPI, Employee, EmployeeDocument, EPISaida
+from models import db, Fornecedor, EPI, MovimentacaoEPI, Employee, EPISaida
 from forms import FornecedorForm, EPIForm, EPIEntradaForm, EPISaidaForm
-from pdf_reports import epi_saida_pdf, epi_summary_pdf 
-from datetime import datetime, date
-from werkzeug.utils import secure_filename
+from datetime import datetime, date, timedelta
+from sqlalchemy.orm import joinedload, selectinload
+from pagination import paginate, Key
+from . import ledger, receipts, stock
 
 @epi_bp.route('/')
 @login_required
@@ -95,12 +95,38 @@ def epi_delete(epi_id):
     flash('EPI excluído com sucesso.', 'success')
     return redirect(url_for('epi.epi_list'))
 
+# Janela padrão do histórico; ?periodo=todos mostra tudo
+JANELA_DIAS = 90
+
+def _inicio_janela():
+    """(início, dias) da janela do histórico por ?periodo=<dias>, ou None com ?periodo=todos."""
+    periodo = request.args.get('periodo', '')
+    if periodo == 'todos':
+        return None
+    dias = int(periodo) if periodo.isdigit() and int(periodo) > 0 else JANELA_DIAS
+    return datetime.combine(date.today() - timedelta(days=dias), datetime.min.time()), dias
+
 @epi_bp.route('/movimentacoes')
 @login_required
 def movimentacao_list():
-    movimentacoes = MovimentacaoEPI.query.order_by(MovimentacaoEPI.data_movimentacao.desc()).all()
-    saidas = EPISaida.query.order_by(EPISaida.data_saida.desc()).all()
-    return render_template('epi/movimentacao_list.html', items=movimentacoes, saidas=saidas)
+    # A tela só lista as entradas; as saídas aparecem agrupadas por EPISaida.
+    # O EPI de cada linha vem junto (joinedload / selectinload): a página faz
+    # o mesmo número de consultas com 10 ou 100 linhas (`flask query-budget`).
+    janela = _inicio_janela()
+    entradas = (MovimentacaoEPI.query.options(joinedload(MovimentacaoEPI.epi))
+                .filter(MovimentacaoEPI.tipo == 'ENTRADA'))
+    saidas = EPISaida.query.options(selectinload(EPISaida.items).joinedload(MovimentacaoEPI.epi))
+    if janela:
+        entradas = entradas.filter(MovimentacaoEPI.data_movimentacao >= janela[0])
+        saidas = saidas.filter(EPISaida.data_saida >= janela[0])
+    entradas = paginate(entradas,
+                        [Key(MovimentacaoEPI.data_movimentacao, desc=True, nullable=True), Key(MovimentacaoEPI.id, desc=True)],
+                        prefix="e_")
+    saidas = paginate(saidas,
+                      [Key(EPISaida.data_saida, desc=True, nullable=True), Key(EPISaida.id, desc=True)],
+                      prefix="s_")
+    return render_template('epi/movimentacao_list.html', items=entradas.items, saidas=saidas.items,
+                           entradas_page=entradas, saidas_page=saidas, janela_dias=janela[1] if janela else None)
 
 @epi_bp.route('/entrada', methods=['GET', 'POST'])
 @login_required
@@ -110,10 +136,7 @@ def entrada_new():
     if form.validate_on_submit():
         epi = EPI.query.get_or_404(form.epi_id.data)
         quantidade = form.quantidade.data
-        nova_movimentacao = MovimentacaoEPI(epi_id=epi.id, tipo='ENTRADA', quantidade=quantidade, retirado_por='ENTRADA NO ESTOQUE')
-        db.session.add(nova_movimentacao)
-        epi.estoque += quantidade
-        db.session.commit()
+        stock.dar_entrada(epi.id, quantidade)
         flash(f'{quantidade} unidade(s) de "{epi.nome}" adicionada(s) ao estoque.', 'success')
         return redirect(url_for('epi.movimentacao_list'))
     return render_template('epi/entrada_form.html', form=form, title='Registrar Entrada de EPI')
@@ -139,87 +162,64 @@ def saida_new():
             flash('É necessário selecionar um funcionário ou informar o nome do terceiro.', 'danger')
             return render_template('epi/saida_form.html', form=form, title='Registrar Retirada de EPI', epi_choices_json=epi_choices)
 
-        # Validação de estoque antes de salvar
-        for item_data in form.items.data:
-            epi = EPI.query.get(item_data['epi_id'])
-            if not epi or epi.estoque < item_data['quantidade']:
-                flash(f'Estoque insuficiente para "{epi.nome}". Disponível: {epi.estoque}.', 'danger')
-                return render_template('epi/saida_form.html', form=form, title='Registrar Retirada de EPI', epi_choices_json=epi_choices)
-
         retirado_por_nome = retirado_por_terceiro
         if employee_id:
             employee = Employee.query.get(employee_id)
             retirado_por_nome = employee.nome
 
-        # Cria a 'Saida' principal
-        nova_saida = EPISaida(employee_id=employee_id, retirado_por=retirado_por_nome)
-        db.session.add(nova_saida)
-        
-        # Cria as movimentações individuais para cada item
-        for item_data in form.items.data:
-            epi = EPI.query.get(item_data['epi_id'])
-            quantidade = item_data['quantidade']
-            
-            mov = MovimentacaoEPI(
-                epi_id=epi.id,
-                tipo='SAIDA',
-                quantidade=quantidade,
-                saida=nova_saida # Vincula o item à saida principal
-            )
-            db.session.add(mov)
-            epi.estoque -= quantidade
-        
-        db.session.commit()
-        
-        # Gera o PDF
-        pdf_buffer = io.BytesIO()
-        epi_saida_pdf(pdf_buffer, current_app, nova_saida)
-        pdf_buffer.seek(0)
-        
-        # Salva o PDF nos documentos do funcionário, se aplicável
-        if employee_id:
-            try:
-                subdir = "func_docs"
-                filename = secure_filename(f"comprovante_epi_{nova_saida.id}_{date.today().isoformat()}.pdf")
-                upload_dir = os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'], subdir)
-                os.makedirs(upload_dir, exist_ok=True)
-                
-                filepath = os.path.join(upload_dir, filename)
-                with open(filepath, 'wb') as f:
-                    f.write(pdf_buffer.read())
-                pdf_buffer.seek(0)
-
-                novo_documento = EmployeeDocument(
-                    employee_id=employee_id,
-                    tipo="Comprovante de EPI",
-                    descricao=f"Retirada de {len(form.items.data)} tipo(s) de EPI.",
-                    arquivo_path=os.path.join(subdir, filename).replace("\\", "/")
-                )
-                db.session.add(novo_documento)
-                db.session.commit()
-                flash(f"Comprovante salvo nos documentos de {employee.nome}.", "info")
-            except Exception as e:
-                db.session.rollback()
-                flash(f"Erro ao salvar comprovante: {e}", "danger")
+        # Conferência rápida (uma consulta, sem travar o banco); stock.retirar grava saída,
+        # movimentações e baixas numa transação e confere de novo no UPDATE
+        itens = [(i['epi_id'], i['quantidade']) for i in form.items.data]
+        faltas = stock.conferir(itens)
+        if not faltas:
+            nova_saida, faltas = stock.retirar(itens, employee_id, retirado_por_nome)
+        if faltas:
+            for nome, disponivel, pedido in faltas:
+                flash(f'Estoque insuficiente para "{nome}". Disponível: {disponivel}, pedido: {pedido}.', 'danger')
+            return render_template('epi/saida_form.html', form=form, title='Registrar Retirada de EPI', epi_choices_json=epi_choices)
         
-        return send_file(pdf_buffer, as_attachment=True, download_name=f'comprovante_epi_{nova_saida.id}.pdf', mimetype='application/pdf')
+        # Comprovante em segundo plano; o navegador segue para a reimpressão, que entrega o arquivo
+        receipts.agendar(nova_saida.id)
+        flash('Retirada registrada.', 'success')
+        return redirect(url_for('epi.reimprimir_retirada', saida_id=nova_saida.id))
 
     return render_template('epi/saida_form.html', form=form, title='Registrar Retirada de EPI', epi_choices_json=epi_choices)
 
 
+@epi_bp.route('/consumo')
+@login_required
+def consumo():
+    # Tudo sai do consolidado diário (ledger.py), sem percorrer as movimentações
+    meses = request.args.get('meses', 6, type=int)
+    colunas = ledger.ultimos_meses(meses if meses in (3, 6, 12) else 6)
+    try:
+        estoque_em = datetime.strptime(request.args.get('estoque_em', ''), '%Y-%m-%d').date()
+    except ValueError:
+        estoque_em = date.today()
+
+    por_epi, por_funcionario = ledger.consumo_mensal(colunas[0], date.today())
+    epis = dict(EPI.query.with_entities(EPI.id, EPI.nome).all())
+    funcionarios = dict(Employee.query.with_entities(Employee.id, Employee.nome)
+                        .filter(Employee.id.in_({f for _, f in por_funcionario})).all())
+    saldos = ledger.saldos_em(estoque_em)
+    return render_template(
+        'epi/consumo.html', meses=len(colunas), colunas=colunas, estoque_em=estoque_em,
+        por_epi=ledger.tabela_mensal(por_epi, colunas, lambda i: epis.get(i, f"EPI #{i}")),
+        por_funcionario=ledger.tabela_mensal(por_funcionario, colunas,
+                                             lambda i: funcionarios.get(i, 'Terceiros / não cadastrados'))[:20],
+        estoque=sorted((nome, saldos.get(i, 0)) for i, nome in epis.items()),
+    )
+
 @epi_bp.route('/movimentacoes/relatorio')
 @login_required
 def relatorio_epi():
     start_date_str = request.args.get('data_inicio')
     end_date_str = request.args.get('data_fim')
 
-    if not start_date_str or not end_date_str:
-        flash("Por favor, selecione a data de início e a data de fim para o relatório.", "danger")
-        return redirect(url_for('epi.movimentacao_list'))
-
     try:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        # Sem datas: do início do mês até hoje
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date() if end_date_str else date.today()
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date() if start_date_str else end_date.replace(day=1)
     except ValueError:
         flash("Formato de data inválido.", "danger")
         return redirect(url_for('epi.movimentacao_list'))
@@ -227,7 +227,9 @@ def relatorio_epi():
     start_of_day = datetime.combine(start_date, datetime.min.time())
     end_of_day = datetime.combine(end_date, datetime.max.time())
     
-    movements = MovimentacaoEPI.query.filter(
+    movements = MovimentacaoEPI.query.options(
+        joinedload(MovimentacaoEPI.epi), joinedload(MovimentacaoEPI.saida)
+    ).filter(
         MovimentacaoEPI.data_movimentacao >= start_of_day,
         MovimentacaoEPI.data_movimentacao <= end_of_day
     ).order_by(MovimentacaoEPI.data_movimentacao.asc()).all()
@@ -237,7 +239,8 @@ def relatorio_epi():
         return redirect(url_for('epi.movimentacao_list'))
 
     buffer = io.BytesIO()
-    epi_summary_pdf(buffer, None, movements, start_date, end_date)
+    from pdf_reports import epi_summary_pdf
+    epi_summary_pdf(buffer, None, movements, start_date, end_date, resumo=ledger.resumo_periodo(start_date, end_date))
     buffer.seek(0)
     
     return send_file(
@@ -251,12 +254,18 @@ def relatorio_epi():
 @login_required
 def reimprimir_retirada(saida_id):
     saida = EPISaida.query.get_or_404(saida_id)
-    buffer = io.BytesIO()
-    epi_saida_pdf(buffer, current_app, saida)
-    buffer.seek(0)
+    full = receipts.arquivo(saida)
+    if not full:
+        # A tarefa ainda não terminou: espera um pouco, sem gerar o PDF aqui
+        if not receipts.em_andamento(saida):
+            receipts.agendar(saida.id)  # tarefa perdida ou retirada antiga sem comprovante
+        full = receipts.esperar(saida.id, current_app.config.get('EPI_RECEIPT_WAIT', 5))
+    if not full:
+        return render_template('epi/comprovante_aguarde.html', saida=saida)
     return send_file(
-        buffer,
+        full,
         as_attachment=True,
         download_name=f'comprovante_epi_{saida.id}.pdf',
-        mimetype='application/pdf'
-    )
\ No newline at end of file
+        mimetype='application/pdf',
+        conditional=True,
+    )
@@ -0,0 +1,92 @@
+# blueprints/epi/stock.py
+"""
+Estoque de EPI.
+
+A baixa é um UPDATE condicional no próprio banco
+(estoque = estoque - q WHERE id = ? AND estoque >= q): dois balcões
+entregando o mesmo EPI ao mesmo tempo não passam os dois pela conferência
+nem deixam o estoque negativo, e uma entrada não sobrescreve uma saída
+gravada no meio. A retirada inteira (EPISaida, movimentações e baixas) é
+uma transação só: se um item não tem saldo, nada é gravado. Cada
+movimentação entra também no consolidado diário (ledger.py).
+
+`flask epi-stress` dispara retiradas simultâneas e confere o saldo final.
+"""
+from sqlalchemy import func, update
+from models import db, EPI, EPISaida, MovimentacaoEPI
+from database import retry_locked
+from .ledger import registrar_movimento
+
+def carregar(ids):
+    """{id: EPI} dos `ids`, numa consulta só."""
+    ids = set(ids)
+    if not ids:
+        return {}
+    return {e.id: e for e in EPI.query.filter(EPI.id.in_(ids))}
+
+def agrupar(itens):
+    """Soma as quantidades do mesmo EPI, na ordem de id (mesma ordem de travas em todas as transações)."""
+    total = {}
+    for epi_id, quantidade in itens:
+        total[epi_id] = total.get(epi_id, 0) + quantidade
+    return dict(sorted(total.items()))
+
+def _faltas(pedidos, epis):
+    """[(nome, disponível, pedido)] dos `pedidos` {epi_id: quantidade} sem saldo em `epis`."""
+    faltas = []
+    for epi_id, quantidade in pedidos.items():
+        epi = epis.get(epi_id)
+        disponivel = (epi.estoque or 0) if epi else 0
+        if disponivel < quantidade:
+            faltas.append((epi.nome if epi else f"EPI #{epi_id}", disponivel, quantidade))
+    return faltas
+
+def conferir(itens):
+    """Conferência prévia (só leitura, uma consulta) dos `itens` [(epi_id, quantidade)]."""
+    pedidos = agrupar(itens)
+    return _faltas(pedidos, carregar(pedidos))
+
+def _baixar(epi_id, quantidade):
+    res = db.session.execute(
+        update(EPI)
+        .where(EPI.id == epi_id, EPI.estoque >= quantidade)
+        .values(estoque=EPI.estoque - quantidade)
+        .execution_options(synchronize_session=False)
+    )
+    return res.rowcount == 1
+
+@retry_locked
+def retirar(itens, employee_id, retirado_por):
+    """
+    Registra a retirada de `itens` [(epi_id, quantidade)]. Devolve
+    (saida, []) ou, se faltar saldo, (None, [(nome, disponível, pedido)])
+    sem gravar nada.
+    """
+    pedidos = agrupar(itens)
+    sem_saldo = {epi_id: q for epi_id, q in pedidos.items() if not _baixar(epi_id, q)}
+    if sem_saldo:
+        db.session.rollback()
+        return None, _faltas(sem_saldo, carregar(sem_saldo))
+
+    saida = EPISaida(employee_id=employee_id, retirado_por=retirado_por)
+    db.session.add(saida)
+    movs = [MovimentacaoEPI(epi_id=epi_id, tipo='SAIDA', quantidade=quantidade, saida=saida) for epi_id, quantidade in itens]
+    db.session.add_all(movs)
+    for mov in movs:
+        registrar_movimento(mov)
+    db.session.commit()
+    return saida, []
+
+@retry_locked
+def dar_entrada(epi_id, quantidade):
+    """Soma `quantidade` ao estoque e registra a ENTRADA, na mesma transação."""
+    db.session.execute(
+        update(EPI).where(EPI.id == epi_id)
+        .values(estoque=func.coalesce(EPI.estoque, 0) + quantidade)
+        .execution_options(synchronize_session=False)
+    )
+    mov = MovimentacaoEPI(epi_id=epi_id, tipo='ENTRADA', quantidade=quantidade, retirado_por='ENTRADA NO ESTOQUE')
+    db.session.add(mov)
+    registrar_movimento(mov)
+    db.session.commit()
+    return mov
@@ -0,0 +1,58 @@
+# blueprints/fleet/maintenance.py
+"""
+Projeção "última manutenção / última troca de óleo" por veículo.
+
+Vehicle.ultima_manutencao_id e Vehicle.ultima_troca_oleo_id são atualizados
+quando um MaintenanceLog é gravado (fleet.details), de modo que a lista da
+frota e o card de óleo do painel saem de uma única consulta. A consulta com
+ROW_NUMBER() serve de fallback e para reconstruir a projeção
+(flask fleet-rebuild).
+"""
+from sqlalchemy import func, or_
+from models import db, Vehicle, MaintenanceLog
+
+def is_oil_change(tipo_servico):
+    """Mesmo critério usado nas telas: 'oleo' no tipo, sem acento/caixa."""
+    return 'oleo' in (tipo_servico or '').lower().replace('ó', 'o')
+
+def _oil_filter():
+    # SQLite só ignora caixa em ASCII, por isso as variantes acentuadas
+    tipo = MaintenanceLog.tipo_servico
+    return or_(tipo.ilike('%oleo%'), tipo.like('%óleo%'), tipo.like('%Óleo%'), tipo.like('%ÓLEO%'))
+
+def _mais_recente(a, b):
+    """True se o log `a` é mais recente que `b` (data desc, id desc)."""
+    if b is None:
+        return True
+    return (a.data, a.id or 0) >= (b.data, b.id or 0)
+
+def registrar_manutencao(vehicle, log):
+    """Atualiza a projeção do veículo após inserir `log` (chamar após flush)."""
+    if _mais_recente(log, vehicle.ultima_manutencao):
+        vehicle.ultima_manutencao_id = log.id
+    if is_oil_change(log.tipo_servico) and _mais_recente(log, vehicle.ultima_troca_oleo):
+        vehicle.ultima_troca_oleo_id = log.id
+
+def latest_logs_subquery(somente_oleo=False):
+    """Último MaintenanceLog por veículo via ROW_NUMBER() (fallback da projeção)."""
+    rn = func.row_number().over(
+        partition_by=MaintenanceLog.vehicle_id,
+        order_by=(MaintenanceLog.data.desc(), MaintenanceLog.id.desc()),
+    ).label('rn')
+    q = db.session.query(MaintenanceLog.id.label('log_id'), MaintenanceLog.vehicle_id.label('vehicle_id'), rn)
+    if somente_oleo:
+        q = q.filter(_oil_filter())
+    sub = q.subquery()
+    return db.session.query(sub.c.vehicle_id, sub.c.log_id).filter(sub.c.rn == 1).subquery()
+
+def rebuild_projection():
+    """Recalcula a projeção de toda a frota a partir do histórico. Retorna nº de veículos."""
+    ultimas = dict(db.session.query(latest_logs_subquery()).all())
+    oleos = dict(db.session.query(latest_logs_subquery(somente_oleo=True)).all())
+    total = 0
+    for v in Vehicle.query.all():
+        v.ultima_manutencao_id = ultimas.get(v.id)
+        v.ultima_troca_oleo_id = oleos.get(v.id)
+        total += 1
+    db.session.commit()
+    return total
@@ -2,39 +2,26 @@
 from flask import render_template, request, redirect, url_for, flash
 from flask_login import login_required
 from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
 from . import fleet_bp
+from .maintenance import is_oil_change, registrar_manutencao
 from models import db, Vehicle, MaintenanceLog, VehicleDocument
 from forms import VehicleForm, MaintenanceLogForm, VehicleDocumentForm
 from datetime import date
 from dateutil.relativedelta import relativedelta
 from utils import save_file 
+import storage
+from pagination import paginate
 import os
 from flask import current_app
 
 @fleet_bp.route('/')
 @login_required
 def list():
-    vehicles = Vehicle.query.order_by(Vehicle.nome).all()
-    
-    # Prepara uma lista de dicionários com os dados prontos para a tabela
-    vehicle_list_data = []
-    for v in vehicles:
-        # Busca a última troca de óleo usando lógica Python para garantir
-        last_oil_change = None
-        # Garante que os logs estão ordenados pela data mais recente primeiro
-        all_logs_sorted = v.manutencoes.order_by(MaintenanceLog.data.desc()).all()
-        for log in all_logs_sorted:
-            # Normaliza o texto para minúsculas e sem acento para a comparação
-            if 'oleo' in log.tipo_servico.lower().replace('ó', 'o'):
-                last_oil_change = log
-                break # Encontrou o mais recente, pode parar o loop
-
-        vehicle_list_data.append({
-            'vehicle': v,
-            'last_oil_change': last_oil_change
-        })
-
-    return render_template('fleet/list.html', items=vehicle_list_data)
+    # Última troca de óleo vem da projeção em Vehicle (uma única consulta)
+    page = paginate(Vehicle.query.options(joinedload(Vehicle.ultima_troca_oleo)), [Vehicle.nome, Vehicle.id])
+    vehicle_list_data = [{'vehicle': v, 'last_oil_change': v.ultima_troca_oleo} for v in page.items]
+    return render_template('fleet/list.html', items=vehicle_list_data, page=page)
 
 @fleet_bp.route('/novo', methods=['GET', 'POST'])
 @login_required
@@ -71,13 +58,15 @@ def details(vehicle_id):
         new_log = MaintenanceLog(vehicle_id=vehicle.id)
         form.populate_obj(new_log)
         
-        if 'oleo' in new_log.tipo_servico.lower().replace('ó', 'o'):
+        if is_oil_change(new_log.tipo_servico):
             if new_log.km_atual:
                 new_log.km_proxima_troca = new_log.km_atual + 5000
             if new_log.data:
                 new_log.data_proxima_troca = new_log.data + relativedelta(months=6)
 
         db.session.add(new_log)
+        db.session.flush()
+        registrar_manutencao(vehicle, new_log)
         db.session.commit()
         flash('Novo histórico de manutenção adicionado!', 'success')
         return redirect(url_for('fleet.details', vehicle_id=vehicle.id))
@@ -86,8 +75,7 @@ def details(vehicle_id):
     oil_changes = []
     other_maintenances = []
     for log in all_logs:
-        tipo_servico_normalizado = log.tipo_servico.lower().replace('ó', 'o')
-        if 'oleo' in tipo_servico_normalizado:
+        if is_oil_change(log.tipo_servico):
             oil_changes.append(log)
         else:
             other_maintenances.append(log)
@@ -130,12 +118,10 @@ def delete_doc(doc_id):
     doc = VehicleDocument.query.get_or_404(doc_id)
     vehicle_id = doc.vehicle_id
     try:
-        if doc.arquivo_path:
-            full_path = os.path.join(current_app.root_path, "uploads", doc.arquivo_path.replace('/', os.sep))
-            if os.path.exists(full_path):
-                os.remove(full_path)
+        arquivo_path = doc.arquivo_path
         db.session.delete(doc)
         db.session.commit()
+        storage.descartar(arquivo_path)
         flash("Documento do veículo excluído.", "success")
     except Exception as e:
         db.session.rollback()
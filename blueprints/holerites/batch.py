@@ -0,0 +1,206 @@
+# blueprints/holerites/batch.py
+"""
+Distribuição de holerites em lote, retomável.
+
+Cada PDF da pasta uploads/holerites vira um PayslipItem com estado próprio:
+pendente -> encontrado (funcionário localizado) -> enviando -> enviado
+(e-mail aceito) -> arquivado (cópia em func_docs + EmployeeDocument + movido
+para enviados). Falhas param em `falhou` com o motivo.
+
+`processar_lote` roda como tarefa (jobs.enqueue) e pode ser chamado de novo
+depois de uma queda: cada arquivo continua do estado em que parou. Um item
+preso em `enviando` só é reenviado se a tabela notification não registrar
+a entrega. Os envios correm em paralelo (HOLERITES_WORKERS) sobre o pool
+SMTP de notifications.
+"""
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from flask import current_app
+from sqlalchemy import or_
+from models import db, EmployeeDocument, Notification, PayslipBatch, PayslipItem, now_sao_paulo
+from notifications import send_email
+from employee_index import EmployeeIndex
+
+HOLERITES_PENDENTES_DIR = "holerites"
+HOLERITES_ENVIADOS_DIR = os.path.join("holerites", "enviados")
+DESTINO_DIR = "func_docs"
+FINAIS = ("arquivado", "falhou")
+EM_ANDAMENTO = ("encontrado", "enviando", "enviado")
+LEASE = timedelta(minutes=10)
+
+def get_full_path(subdir):
+    return os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'], subdir)
+
+def arquivos_pendentes():
+    pendentes_path = get_full_path(HOLERITES_PENDENTES_DIR)
+    os.makedirs(pendentes_path, exist_ok=True)
+    return sorted(f for f in os.listdir(pendentes_path) if f.lower().endswith('.pdf'))
+
+def lote_ativo():
+    return PayslipBatch.query.filter_by(status="em_andamento").order_by(PayslipBatch.id.desc()).first()
+
+def criar_ou_retomar_lote(user_id=None):
+    """Lote em andamento (com os arquivos novos da pasta) ou um lote novo; None se não há o que enviar."""
+    arquivos = arquivos_pendentes()
+    lote = lote_ativo()
+    if lote is None:
+        if not arquivos:
+            return None
+        lote = PayslipBatch(user_id=user_id)
+        db.session.add(lote)
+        db.session.flush()
+    existentes = {a for (a,) in db.session.query(PayslipItem.arquivo).filter_by(batch_id=lote.id)}
+    for arquivo in arquivos:
+        if arquivo not in existentes:
+            db.session.add(PayslipItem(batch_id=lote.id, arquivo=arquivo))
+    db.session.commit()
+    return lote
+
+# -------------------- trava do lote --------------------
+def _tomar_lote(batch_id):
+    """Marca o lote como em processamento; False se outro worker já o processa."""
+    agora = now_sao_paulo().replace(tzinfo=None)
+    tomou = PayslipBatch.query.filter(
+        PayslipBatch.id == batch_id, PayslipBatch.status == "em_andamento",
+        or_(PayslipBatch.processando_ate.is_(None), PayslipBatch.processando_ate < agora),
+    ).update({"processando_ate": agora + LEASE}, synchronize_session=False)
+    db.session.commit()
+    return bool(tomou)
+
+def _renovar_lote(batch_id):
+    PayslipBatch.query.filter_by(id=batch_id).update(
+        {"processando_ate": now_sao_paulo().replace(tzinfo=None) + LEASE}, synchronize_session=False)
+    db.session.commit()
+
+# -------------------- etapas de cada arquivo --------------------
+def _nome(item):
+    return os.path.splitext(item.arquivo)[0]
+
+def _referencia(item):
+    return f"holerite:{item.batch_id}:{item.arquivo}"[:100]
+
+def _falhar(item, erro):
+    item.status = "falhou"
+    item.erro = erro[:500]
+
+def _localizar(item, indice):
+    """Nome do arquivo -> funcionário (CPF no nome, nome sem acento/caixa ou aproximado)."""
+    nome = _nome(item)
+    achado = indice.match_arquivo(item.arquivo)
+    if not achado:
+        sugestoes = indice.sugestoes(nome)
+        dica = f" Parecidos: {', '.join(sugestoes)}." if sugestoes else ""
+        return _falhar(item, f"Funcionário '{nome}' não encontrado no sistema.{dica}")
+    funcionario = achado.employee
+    if not funcionario.email:
+        return _falhar(item, f"Funcionário '{nome}' não possui e-mail cadastrado.")
+    item.employee_id = funcionario.id
+    item.status = "encontrado"
+
+def _ja_enviado(item):
+    return db.session.query(Notification.id).filter_by(referencia=_referencia(item), status="enviado").first() is not None
+
+def _enviar(item):
+    if item.status == "enviando" and _ja_enviado(item):
+        item.status = "enviado"
+        return
+    item.status = "enviando"
+    db.session.commit()
+    funcionario = item.employee
+    sucesso, msg_erro = send_email(
+        to_list=[funcionario.email],
+        subject="Seu Holerite está Disponível",
+        body=f"Olá, {funcionario.nome}.\n\nSeu holerite está em anexo.\n\nAtenciosamente,\nEmpresa.",
+        attachment_path=os.path.join(get_full_path(HOLERITES_PENDENTES_DIR), item.arquivo),
+        attachment_filename=item.arquivo,
+        referencia=_referencia(item),
+    )
+    if sucesso:
+        item.status = "enviado"
+    else:
+        _falhar(item, f"Falha ao enviar para '{_nome(item)}': {msg_erro}")
+    db.session.commit()
+
+def _arquivar(item):
+    """Cópia na pasta do funcionário + EmployeeDocument + move para enviados. Idempotente."""
+    origem = os.path.join(get_full_path(HOLERITES_PENDENTES_DIR), item.arquivo)
+    arquivo_path = os.path.join(DESTINO_DIR, item.arquivo).replace("\\", "/")
+    if os.path.exists(origem):
+        destino_path = get_full_path(DESTINO_DIR)
+        os.makedirs(destino_path, exist_ok=True)
+        shutil.copy(origem, os.path.join(destino_path, item.arquivo))
+    if not EmployeeDocument.query.filter_by(employee_id=item.employee_id, arquivo_path=arquivo_path).first():
+        db.session.add(EmployeeDocument(
+            employee_id=item.employee_id,
+            tipo="Holerite",
+            descricao=f"Holerite referente ao arquivo {item.arquivo}",
+            arquivo_path=arquivo_path,
+        ))
+    if os.path.exists(origem):
+        enviados_path = get_full_path(HOLERITES_ENVIADOS_DIR)
+        os.makedirs(enviados_path, exist_ok=True)
+        os.replace(origem, os.path.join(enviados_path, item.arquivo))
+    item.status = "arquivado"
+    db.session.commit()
+
+def _processar_item(app, item_id):
+    with app.app_context():
+        item = db.session.get(PayslipItem, item_id)
+        try:
+            if item.status in ("encontrado", "enviando"):
+                _enviar(item)
+            if item.status == "enviado":
+                _arquivar(item)
+        except Exception as e:
+            db.session.rollback()
+            _falhar(item, f"Falha ao processar o holerite de '{_nome(item)}': {e}")
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+def processar_lote(batch_id):
+    """Tarefa do lote: localiza, envia em paralelo e arquiva; retomável."""
+    if not _tomar_lote(batch_id):
+        return
+    lote = db.session.get(PayslipBatch, batch_id)
+    try:
+        pendentes = lote.itens.filter_by(status="pendente").all()
+        if pendentes:
+            indice = EmployeeIndex.build()
+            for item in pendentes:
+                _localizar(item, indice)
+        db.session.commit()
+
+        ids = [i for (i,) in db.session.query(PayslipItem.id).filter(
+            PayslipItem.batch_id == batch_id, PayslipItem.status.in_(EM_ANDAMENTO))]
+        app = current_app._get_current_object()
+        workers = current_app.config.get("HOLERITES_WORKERS", int(os.environ.get("HOLERITES_WORKERS", "4")))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in as_completed([executor.submit(_processar_item, app, i) for i in ids]):
+                _renovar_lote(batch_id)
+
+        db.session.expire_all()
+        if not lote.itens.filter(PayslipItem.status.notin_(FINAIS)).count():
+            lote.status = "concluido"
+            lote.finished_at = now_sao_paulo()
+    finally:
+        lote.processando_ate = None
+        db.session.commit()
+
+def progresso(lote):
+    """Resumo do lote para a tela (JSON)."""
+    contagem = dict(db.session.query(PayslipItem.status, db.func.count(PayslipItem.id))
+                    .filter_by(batch_id=lote.id).group_by(PayslipItem.status).all())
+    total = sum(contagem.values())
+    concluidos = sum(contagem.get(s, 0) for s in FINAIS)
+    falhas = lote.itens.filter_by(status="falhou").order_by(PayslipItem.arquivo).all()
+    return {
+        "id": lote.id,
+        "status": lote.status,
+        "total": total,
+        "concluidos": concluidos,
+        "por_status": contagem,
+        "falhas": [{"arquivo": f.arquivo, "erro": f.erro} for f in falhas],
+    }
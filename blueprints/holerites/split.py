@@ -0,0 +1,86 @@
+# blueprints/holerites/split.py
+"""
+Divisão do PDF mensal de holerites (holerites.dividir_pdf).
+
+O upload é gravado em disco e a divisão roda como tarefa (jobs.enqueue):
+as páginas saem em paralelo (pdf_split) e cada arquivo já recebe o nome do
+funcionário encontrado no texto da página (CPF ou nome, via EmployeeIndex).
+Páginas sem funcionário identificado ficam como holerite_pagina_N.pdf para
+renomear à mão. O resultado, com a vazão em páginas/s, vai para o log e
+para a auditoria (a tela mostra a última divisão).
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from flask import current_app
+from models import AuditLog
+from audit import log_action
+from employee_index import EmployeeIndex
+from .batch import HOLERITES_PENDENTES_DIR, get_full_path
+
+ENTRADA_DIR = os.path.join("holerites", "_entrada")
+
+log = logging.getLogger(__name__)
+
+def salvar_upload(file):
+    """Grava o upload em disco (FileStorage.save copia em blocos) e devolve o caminho."""
+    entrada = get_full_path(ENTRADA_DIR)
+    os.makedirs(entrada, exist_ok=True)
+    caminho = os.path.join(entrada, f"{uuid.uuid4().hex}.pdf")
+    file.save(caminho)
+    return caminho
+
+def _base_segura(nome):
+    return re.sub(r'[\\/:*?"<>|\x00-\x1f]', "", nome).strip()
+
+def _nome_livre(pasta, base):
+    nome, n = f"{base}.pdf", 2
+    while os.path.exists(os.path.join(pasta, nome)):
+        nome, n = f"{base} ({n}).pdf", n + 1
+    return nome
+
+def dividir_upload(caminho):
+    """Tarefa: divide o PDF em `caminho`, nomeia cada página e remove o original."""
+    from pdf_split import dividir
+    pendentes = get_full_path(HOLERITES_PENDENTES_DIR)
+    os.makedirs(pendentes, exist_ok=True)
+    trabalho = tempfile.mkdtemp(dir=os.path.dirname(caminho))
+    try:
+        paginas, segundos = dividir(caminho, trabalho, workers=current_app.config.get("HOLERITES_SPLIT_WORKERS"))
+        indice = EmployeeIndex.build()
+        identificados = 0
+        for numero, arquivo, texto in paginas:
+            achado = indice.match_texto(texto)
+            base = _base_segura(achado.employee.nome) if achado else ""
+            if base:
+                identificados += 1
+            else:
+                base = os.path.splitext(arquivo)[0]
+            os.replace(os.path.join(trabalho, arquivo), os.path.join(pendentes, _nome_livre(pendentes, base)))
+    finally:
+        shutil.rmtree(trabalho, ignore_errors=True)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+
+    resultado = {
+        "paginas": len(paginas),
+        "identificados": identificados,
+        "segundos": round(segundos, 2),
+        "paginas_por_segundo": round(len(paginas) / segundos, 1) if segundos else None,
+    }
+    log.info("holerites: %(paginas)s página(s) em %(segundos)ss (%(paginas_por_segundo)s pág/s), %(identificados)s identificada(s)", resultado)
+    log_action("dividir", "holerites", None, resultado)
+    return resultado
+
+def ultima_divisao():
+    """Resultado da última divisão registrada na auditoria, ou None."""
+    registro = AuditLog.query.filter_by(action="dividir", entity="holerites").order_by(AuditLog.id.desc()).first()
+    if not registro:
+        return None
+    dados = json.loads(registro.payload or "{}")
+    dados["quando"] = registro.created_at
+    return dados
@@ -10,8 +10,10 @@ from extensions import db
 from models import Employee, Company, Funcao, EmployeeDocument
 from forms import EmployeeForm, FuncaoForm, EmployeeDocForm
 from utils import save_file
-from pdf_reports import employee_pdf
-import requests
+import storage
+from pagination import paginate
+from filters import EmployeeFilters
+from sqlalchemy.orm import joinedload
 
 hr_bp = Blueprint("rh", __name__)
 
@@ -19,22 +21,10 @@ hr_bp = Blueprint("rh", __name__)
 @hr_bp.route("/colaboradores")
 @login_required
 def employees():
-    q = request.args.get("q", "").strip()
-    ativo = request.args.get("ativo", "")
-    mes_aniversario = request.args.get("mes", "")
-    query = Employee.query
-    if q:
-        like = f"%{q}%"
-        query = query.filter(Employee.nome.ilike(like))
-    if ativo in ("1", "0"):
-        query = query.filter_by(ativo=(ativo == "1"))
-    items = query.order_by(Employee.nome).all()
-    if mes_aniversario:
-        try:
-            m = int(mes_aniversario)
-            items = [e for e in items if e.data_nascimento and e.data_nascimento.month == m]
-        except Exception: pass
-    return render_template("hr/employees_list.html", items=items, q=q, ativo=ativo, mes=mes_aniversario)
+    filtros = EmployeeFilters.from_args(request.args)
+    query = filtros.apply(Employee.query).options(joinedload(Employee.company), joinedload(Employee.funcao))
+    page = paginate(query, [Employee.nome, Employee.id])
+    return render_template("hr/employees_list.html", items=page.items, page=page, **filtros.template_args())
 
 def _apply_employee_form(e: Employee, form: EmployeeForm):
     for f in form:
@@ -93,6 +83,7 @@ def employees_delete(emp_id):
 def employees_pdf(emp_id):
     e = Employee.query.get_or_404(emp_id)
     bio = io.BytesIO()
+    from pdf_reports import employee_pdf
     employee_pdf(bio, current_app, e)
     bio.seek(0)
     return send_file(bio, as_attachment=True, download_name=f"colaborador_{e.id}.pdf", mimetype="application/pdf")
@@ -122,15 +113,12 @@ def employee_docs_delete(doc_id):
     employee_id = doc.employee_id # Guarda o ID para redirecionar de volta
     
     try:
-        # Tenta apagar o arquivo físico
-        if doc.arquivo_path:
-            full_path = os.path.join(current_app.root_path, current_app.config['UPLOAD_FOLDER'], doc.arquivo_path)
-            if os.path.exists(full_path):
-                os.remove(full_path)
-        
         # Apaga o registro do banco de dados
+        arquivo_path = doc.arquivo_path
         db.session.delete(doc)
         db.session.commit()
+        # e o arquivo físico (blobs compartilhados ficam para a coleta)
+        storage.descartar(arquivo_path)
         flash("Documento excluído com sucesso.", "success")
     except Exception as e:
         db.session.rollback()
@@ -143,6 +131,7 @@ def employee_docs_delete(doc_id):
 @login_required
 def api_cep(cep):
     try:
+        import requests
         r = requests.get(f"https://viacep.com.br/ws/{cep}/json/", timeout=10)
         return r.json(), r.status_code
     except Exception: return {"erro": True}, 400
@@ -1,19 +1,14 @@
 # blueprints/main/routes.py
 from flask import Blueprint, jsonify
 from flask_login import login_required
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 import os
+import time
+import threading
 
-from models import Employee
-try:
-    from models import Funcao
-except Exception:
-    Funcao = None
-try:
-    from models import Document, DocumentType
-except Exception:
-    Document = None
-    DocumentType = None
+from sqlalchemy import event, func, case
+from extensions import db
+from models import Employee, Funcao
 
 main_bp = Blueprint("main", __name__, template_folder='../../templates')
 
@@ -24,105 +19,55 @@ def index():
     from blueprints.dash.routes import dashboard as dash_dashboard
     return dash_dashboard()
 
-def _get_cnh_expiration(emp):
-    # 1) tenta atributos comuns no modelo Employee
-    for attr in ("cnh_vencimento", "cnh_validade", "cnh_expira_em", "validade_cnh"):
-        if hasattr(emp, attr):
-            val = getattr(emp, attr)
-            if val:
-                return val
+# --- Cache curto das estatísticas de CNH (chave: horizonte em dias + data) ---
+_cnh_cache = {}
+_cnh_cache_lock = threading.Lock()
 
-    # 2) tenta via documentos relacionados (tipo 'CNH')
-    try:
-        docs = getattr(emp, "documents", None) or getattr(emp, "documentos", None)
-        if docs:
-            for d in docs:
-                # Identifica se o doc é CNH
-                name_ok = False
-                try:
-                    t = getattr(d, "tipo", None)
-                    if t is not None:
-                        nome_tipo = getattr(t, "nome", None)
-                        if isinstance(nome_tipo, str) and nome_tipo.strip().upper() == "CNH":
-                            name_ok = True
-                except Exception:
-                    pass
-                if not name_ok:
-                    try:
-                        if getattr(d, "nome", "").strip().upper() == "CNH":
-                            name_ok = True
-                    except Exception:
-                        pass
-                if not name_ok:
-                    continue
+def invalidate_cnh_stats(*_args, **_kwargs):
+    with _cnh_cache_lock:
+        _cnh_cache.clear()
 
-                # pega a validade no doc
-                for a in ("validade", "data_validade", "vencimento", "expira_em"):
-                    if hasattr(d, a):
-                        vv = getattr(d, a)
-                        if vv:
-                            return vv
-    except Exception:
-        pass
+# Qualquer gravação de colaborador/função invalida o cache
+for _model in (Employee, Funcao):
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _evt, invalidate_cnh_stats)
 
-    return None
-
-def _is_driver(emp):
-    # considera Motorista por relação Funcao ou por texto no campo
-    try:
-        func = getattr(emp, "funcao", None)
-        nome = getattr(func, "nome", None)
-        if isinstance(nome, str) and nome.strip().lower() == "motorista":
-            return True
-    except Exception:
-        pass
-    # fallback: campos de texto
-    for a in ("cargo", "funcao_nome", "role_name"):
-        if hasattr(emp, a):
-            val = getattr(emp, a)
-            if isinstance(val, str) and val.strip().lower() == "motorista":
-                return True
-    return False
+def _cnh_counts(today, deadline):
+    """Motoristas (Funcao.nome = 'motorista') com CNH vencida / a vencer, em uma consulta."""
+    validade = Employee.cnh_validade
+    vencidas, a_vencer = (
+        db.session.query(
+            func.coalesce(func.sum(case((validade < today, 1), else_=0)), 0),
+            func.coalesce(func.sum(case(((validade >= today) & (validade <= deadline), 1), else_=0)), 0),
+        )
+        .select_from(Employee)
+        .join(Funcao, Employee.funcao_id == Funcao.id)
+        .filter(func.lower(func.trim(Funcao.nome)) == "motorista", validade.isnot(None))
+        .one()
+    )
+    return int(vencidas), int(a_vencer)
 
 @main_bp.route("/api/cnh-stats", endpoint="cnh_stats")
 @login_required
 def cnh_stats():
     # horizonte configurável (dias) para "a vencer"
     horizon_days = int(os.getenv("CNH_ALERT_DAYS", "30"))
+    ttl = float(os.getenv("CNH_STATS_TTL", "60"))
     today = date.today()
-    deadline = today + timedelta(days=horizon_days)
-
-    # busca todos e filtra em Python para robustez
-    emps = Employee.query.all()
-    drivers = [e for e in emps if _is_driver(e)]
-
-    vencidas = 0
-    a_vencer = 0
-
-    for e in drivers:
-        dt = _get_cnh_expiration(e)
-        if not dt:
-            continue
-        if isinstance(dt, datetime):
-            dt = dt.date()
-        # se vier string "YYYY-MM-DD"
-        if isinstance(dt, str):
-            try:
-                dt = date.fromisoformat(dt[:10])
-            except Exception:
-                continue
+    key = (horizon_days, today)
 
-        try:
-            if dt < today:
-                vencidas += 1
-            elif dt <= deadline:
-                a_vencer += 1
-        except Exception:
-            # em caso de tipos estranhos, ignora
-            continue
+    now = time.monotonic()
+    with _cnh_cache_lock:
+        hit = _cnh_cache.get(key)
+    if hit and hit[0] > now:
+        return jsonify(hit[1])
 
-    return jsonify({
+    vencidas, a_vencer = _cnh_counts(today, today + timedelta(days=horizon_days))
+    payload = {
         "cnh_vencidas": vencidas,
         "cnh_a_vencer": a_vencer,
         "horizon_days": horizon_days
-    })
+    }
+    with _cnh_cache_lock:
+        _cnh_cache[key] = (now + ttl, payload)
+    return jsonify(payload)
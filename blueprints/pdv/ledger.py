@@ -0,0 +1,174 @@
+# blueprints/pdv/ledger.py
+"""
+Livro-caixa incremental do PDV.
+
+Cada CashMovement gravado em pdv.pdv_index ou customers.pay soma seu valor
+na linha (dia, usuário, forma de pagamento) de CashLedger, na mesma
+transação. Os totais do caixa saem dessas poucas linhas em vez de percorrer
+os movimentos. `reconcile` recalcula tudo a partir de CashMovement para
+detectar (e, com --fix, corrigir) divergências: flask pdv-reconcile.
+"""
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, case
+from sqlalchemy.exc import IntegrityError
+from models import db, CashMovement, CashLedger, now_sao_paulo
+from database import dia_expr, retry_locked
+
+TIPOS_ENTRADA = ("VENDA", "PAGAMENTO")
+TIPOS_SAIDA = ("SANGRIA", "RETIRADA")
+FORMAS = ("DINHEIRO", "PIX", "CARTAO")
+ZERO = Decimal("0.00")
+
+log = logging.getLogger(__name__)
+
+def _dec(v):
+    # SUM no SQLite pode voltar float; str() evita carregar o erro binário
+    return Decimal(str(v or 0)).quantize(ZERO)
+
+def _valores(mov):
+    """(entrada, saída) do movimento para o livro-caixa."""
+    valor = Decimal(mov.valor or 0)
+    if mov.tipo in TIPOS_ENTRADA:
+        return valor, ZERO
+    if mov.tipo in TIPOS_SAIDA:
+        return ZERO, valor
+    return ZERO, ZERO
+
+def registrar_movimento(mov):
+    """Soma `mov` no livro-caixa. Chamar antes do commit que grava o movimento."""
+    if mov.created_at is None:
+        db.session.flush()  # aplica o default de created_at
+    chave = dict(dia=mov.created_at.date(), user_id=mov.user_id or 0, pagamento=mov.pagamento)
+    entrada, saida = _valores(mov)
+
+    # UPDATE com a soma no próprio banco: dois caixas lançando ao mesmo tempo não se sobrescrevem
+    upd = (CashLedger.__table__.update()
+           .where(*(getattr(CashLedger, k) == v for k, v in chave.items()))
+           .values(entradas=CashLedger.entradas + entrada, saidas=CashLedger.saidas + saida, qtd=CashLedger.qtd + 1))
+    if db.session.execute(upd).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(CashLedger(**chave, entradas=entrada, saidas=saida, qtd=1))
+    except IntegrityError:
+        # Outra transação criou a linha entre o UPDATE e o INSERT
+        db.session.execute(upd)
+
+@retry_locked
+def lancar_movimento(**campos):
+    """Grava um CashMovement e sua soma no livro-caixa, numa transação curta."""
+    mov = CashMovement(**campos)
+    db.session.add(mov)
+    registrar_movimento(mov)
+    db.session.commit()
+    return mov
+
+@retry_locked
+def quitar_conta(customer_id, movement_ids, pagamento, user_id=None):
+    """
+    Quita as pesagens pendentes `movement_ids` do cliente com um único
+    PAGAMENTO, na mesma transação. Devolve o pagamento, ou None se nenhuma
+    pendência válida foi selecionada.
+    """
+    pendentes = CashMovement.query.filter(
+        CashMovement.id.in_(movement_ids),
+        CashMovement.customer_id == customer_id,
+        CashMovement.status == 'Pendente',
+    ).all()
+    if not pendentes:
+        return None
+    pag = CashMovement(tipo='PAGAMENTO', valor=sum(m.valor for m in pendentes), pagamento=pagamento,
+                       descricao=f"Pagamento de {len(pendentes)} pesagem(ns)", customer_id=customer_id,
+                       user_id=user_id, status='Pago')
+    db.session.add(pag)
+    registrar_movimento(pag)
+    db.session.flush()  # id do pagamento para o vínculo
+    for mov in pendentes:
+        mov.status = 'Pago'
+        mov.pagamento_id = pag.id
+    db.session.commit()
+    return pag
+
+def totais(dia_inicio, dia_fim=None, user_id=None):
+    """Totais no formato da tela de movimentos: DINHEIRO, PIX, CARTAO, SAIDAS."""
+    query = db.session.query(
+        CashLedger.pagamento, func.sum(CashLedger.entradas), func.sum(CashLedger.saidas)
+    ).filter(CashLedger.dia >= dia_inicio, CashLedger.dia <= (dia_fim or dia_inicio))
+    if user_id is not None:
+        query = query.filter(CashLedger.user_id == user_id)
+
+    result = {forma: ZERO for forma in FORMAS}
+    result["SAIDAS"] = ZERO
+    for pagamento, entradas, saidas in query.group_by(CashLedger.pagamento):
+        if pagamento in FORMAS:
+            result[pagamento] += _dec(entradas)
+        result["SAIDAS"] += _dec(saidas)
+    return result
+
+def saldo_dinheiro(totals):
+    return totals["DINHEIRO"] - totals["SAIDAS"]
+
+def _recalcular(dia_inicio, dia_fim):
+    """{(dia, user_id, pagamento): (entradas, saidas, qtd)} a partir de CashMovement."""
+    dia = dia_expr(CashMovement.created_at).label("dia")
+    valor = func.coalesce(CashMovement.valor, 0)
+    rows = db.session.query(
+        dia,
+        func.coalesce(CashMovement.user_id, 0),
+        CashMovement.pagamento,
+        func.sum(case((CashMovement.tipo.in_(TIPOS_ENTRADA), valor), else_=0)),
+        func.sum(case((CashMovement.tipo.in_(TIPOS_SAIDA), valor), else_=0)),
+        func.count(CashMovement.id),
+    ).filter(
+        CashMovement.created_at >= datetime.combine(dia_inicio, datetime.min.time()),
+        CashMovement.created_at < datetime.combine(dia_fim + timedelta(days=1), datetime.min.time()),
+    ).group_by(dia, func.coalesce(CashMovement.user_id, 0), CashMovement.pagamento).all()
+    return {(d, u, p): (_dec(e), _dec(s), q) for d, u, p, e, s, q in rows}
+
+def reconcile(dias=1, hoje=None, corrigir=False):
+    """
+    Compara o livro-caixa dos últimos `dias` dias com os movimentos.
+    Retorna a lista de divergências (chave, gravado, recalculado); com
+    `corrigir`, regrava as linhas divergentes.
+    """
+    hoje = hoje or now_sao_paulo().date()
+    inicio = hoje - timedelta(days=max(dias, 1) - 1)
+    esperado = _recalcular(inicio, hoje)
+
+    gravado = {}
+    linhas = {}
+    for l in CashLedger.query.filter(CashLedger.dia >= inicio, CashLedger.dia <= hoje):
+        chave = (l.dia, l.user_id, l.pagamento)
+        gravado[chave] = (_dec(l.entradas), _dec(l.saidas), l.qtd)
+        linhas[chave] = l
+
+    vazio = (ZERO, ZERO, 0)
+    divergencias = []
+    for chave in sorted(set(esperado) | set(gravado), key=lambda k: (k[0], k[1], k[2] or "")):
+        atual, certo = gravado.get(chave, vazio), esperado.get(chave, vazio)
+        if atual != certo:
+            divergencias.append((chave, atual, certo))
+
+    if corrigir and divergencias:
+        for chave, _, (entradas, saidas, qtd) in divergencias:
+            linha = linhas.get(chave)
+            if not qtd:
+                if linha is not None:
+                    db.session.delete(linha)
+                continue
+            if linha is None:
+                linha = CashLedger(dia=chave[0], user_id=chave[1], pagamento=chave[2])
+                db.session.add(linha)
+            linha.entradas, linha.saidas, linha.qtd = entradas, saidas, qtd
+        db.session.commit()
+    return divergencias
+
+def reconcile_job():
+    """Conferência noturna (jobs.py): só registra as divergências no log."""
+    divergencias = reconcile(dias=2)
+    for chave, gravado, certo in divergencias:
+        log.warning("livro-caixa divergente %s: livro=%s movimentos=%s", chave, gravado, certo)
+    return len(divergencias)
@@ -0,0 +1,44 @@
+# blueprints/pdv/reports.py
+"""
+Consultas do relatório de período do caixa (pdv.relatorio_diario).
+
+Os totais saem de um GROUP BY tipo, pagamento; as linhas de detalhe são lidas
+em blocos (yield_per) com o cliente já carregado, para que um mês de
+movimentos não fique inteiro na memória.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from models import db, CashMovement
+
+CHUNK_SIZE = 500
+
+def _periodo(start_date, end_date):
+    return (CashMovement.created_at >= datetime.combine(start_date, datetime.min.time()),
+            CashMovement.created_at <= datetime.combine(end_date, datetime.max.time()))
+
+def resumo_periodo(start_date, end_date):
+    """(quantidade de movimentos, totais no formato de pdv_summary_pdf)."""
+    rows = db.session.query(
+        CashMovement.tipo, CashMovement.pagamento,
+        func.coalesce(func.sum(CashMovement.valor), 0), func.count(CashMovement.id),
+    ).filter(*_periodo(start_date, end_date)).group_by(CashMovement.tipo, CashMovement.pagamento).all()
+
+    totals = {}
+    quantidade = 0
+    for tipo, pagamento, total, qtd in rows:
+        quantidade += qtd
+        chave = pagamento if tipo in ("VENDA", "PAGAMENTO") else tipo if tipo in ("SANGRIA", "RETIRADA") else None
+        if chave:
+            totals[chave] = totals.get(chave, Decimal(0)) + Decimal(str(total))
+    return quantidade, totals
+
+def movimentos_periodo(start_date, end_date, chunk=CHUNK_SIZE):
+    """Movimentos do período em ordem cronológica, lidos em blocos de `chunk`."""
+    return (CashMovement.query
+            .options(joinedload(CashMovement.customer))
+            .filter(*_periodo(start_date, end_date))
+            .order_by(CashMovement.created_at.asc(), CashMovement.id.asc())
+            .yield_per(chunk))
@@ -8,9 +8,10 @@ from flask_login import login_required, current_user
 from . import pdv_bp
 from datetime import datetime, date
 from sqlalchemy import func
-from models import db, User, CashMovement, Company, Customer
+from models import db, User, CashMovement, Company, Customer, now_sao_paulo
 from forms import MovementForm 
-from pdf_reports import pdv_summary_pdf
+from .ledger import lancar_movimento, totais, saldo_dinheiro
+from .reports import resumo_periodo, movimentos_periodo
 
 def _get_company_header():
     try:
@@ -41,9 +42,7 @@ def pdv_index():
         if pagamento == "CONTA" and not customer_id:
             flash("Para lançar 'Na Conta', você precisa selecionar um cliente.", "danger")
             return render_template("pdv/index.html", form=form)
-        mov = CashMovement(tipo=tipo, valor=Decimal(form.valor.data or 0), pagamento=pagamento, descricao=form.descricao.data, ticket_ref=form.ticket_ref.data, user_id=getattr(current_user, "id", None), customer_id=customer_id, placa=form.placa.data, material=form.material.data, peso=form.peso.data, status="Pendente" if pagamento == "CONTA" else "Pago")
-        db.session.add(mov)
-        db.session.commit()
+        mov = lancar_movimento(tipo=tipo, valor=Decimal(form.valor.data or 0), pagamento=pagamento, descricao=form.descricao.data, ticket_ref=form.ticket_ref.data, user_id=getattr(current_user, "id", None), customer_id=customer_id, placa=form.placa.data, material=form.material.data, peso=form.peso.data, status="Pendente" if pagamento == "CONTA" else "Pago")
         if 'submit' in request.form:
             flash(f"Movimento '{tipo}' lançado! O recibo será impresso.", "success")
             return redirect(url_for('pdv.imprimir_recibo', mov_id=mov.id))
@@ -62,24 +61,11 @@ def pdv_list():
         query = query.filter((CashMovement.descricao.ilike(like)) | (CashMovement.ticket_ref.ilike(like)))
     items = query.limit(200).all()
 
-    # --- LÓGICA DE TOTAIS ATUALIZADA ---
-    totals = {
-        'DINHEIRO': Decimal('0.0'),
-        'PIX': Decimal('0.0'),
-        'CARTAO': Decimal('0.0'),
-        'SAIDAS': Decimal('0.0')
-    }
+    # Totais do dia vêm do livro-caixa (blueprints/pdv/ledger.py), não dos itens exibidos
+    hoje = now_sao_paulo().date()
+    totals = totais(hoje)
 
-    for i in items:
-        valor = i.valor or Decimal('0.0')
-        if (i.tipo == 'VENDA' or i.tipo == 'PAGAMENTO') and i.pagamento in totals:
-            totals[i.pagamento] += valor
-        elif i.tipo in ['SANGRIA', 'RETIRADA']:
-            totals['SAIDAS'] += valor
-    
-    saldo_dinheiro = totals['DINHEIRO'] - totals['SAIDAS']
-
-    return render_template("pdv/mov_list.html", items=items, totals=totals, saldo_dinheiro=saldo_dinheiro, q=q)
+    return render_template("pdv/mov_list.html", items=items, totals=totals, saldo_dinheiro=saldo_dinheiro(totals), q=q, hoje=hoje)
 
 @pdv_bp.route("/recibo/<int:mov_id>")
 @login_required
@@ -109,13 +95,12 @@ def relatorio_diario():
     except ValueError:
         flash("Formato de data inválido.", "danger")
         return redirect(url_for('pdv.pdv_list'))
-    start_of_day = datetime.combine(start_date, datetime.min.time())
-    end_of_day = datetime.combine(end_date, datetime.max.time())
-    movements = CashMovement.query.filter(CashMovement.created_at >= start_of_day, CashMovement.created_at <= end_of_day).order_by(CashMovement.created_at.asc()).all()
-    if not movements:
+    quantidade, totals = resumo_periodo(start_date, end_date)
+    if not quantidade:
         flash(f"Nenhuma movimentação encontrada para o período de {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}.", "info")
         return redirect(url_for('pdv.pdv_list'))
     buffer = io.BytesIO()
-    pdv_summary_pdf(buffer, None, movements, start_date, end_date)
+    from pdf_reports import pdv_summary_pdf
+    pdv_summary_pdf(buffer, None, movimentos_periodo(start_date, end_date), start_date, end_date, totals=totals)
     buffer.seek(0)
     return send_file(buffer, as_attachment=True, download_name=f'relatorio_caixa_{start_date.strftime("%Y-%m-%d")}_a_{end_date.strftime("%Y-%m-%d")}.pdf', mimetype='application/pdf')
\ No newline at end of file
@@ -5,18 +5,18 @@ from flask_login import login_required
 from . import proposals_bp
 from models import db, Proposal, Company, Customer, ProposalItem
 from forms import ProposalForm
-from pdf_reports import proposal_pdf
+from pagination import paginate, Key
 
 @proposals_bp.route('/')
 @login_required
 def list():
     status = request.args.get('status', '').strip()
-    query = Proposal.query.order_by(Proposal.created_at.desc())
+    query = Proposal.query
     if status:
         query = query.filter(Proposal.status == status)
     
-    items = query.all()
-    return render_template('proposals/list.html', items=items, current_status=status)
+    page = paginate(query, [Key(Proposal.created_at, desc=True, nullable=True), Key(Proposal.id, desc=True)])
+    return render_template('proposals/list.html', items=page.items, page=page, current_status=status)
 
 def _process_form_and_save(form, proposal=None):
     """Função central para criar ou editar um orçamento."""
@@ -81,6 +81,7 @@ def edit(proposal_id):
 def pdf(proposal_id):
     proposal = Proposal.query.get_or_404(proposal_id)
     buffer = io.BytesIO()
+    from pdf_reports import proposal_pdf
     proposal_pdf(buffer, current_app, proposal)
     buffer.seek(0)
     return send_file(
@@ -1,17 +1,81 @@
+"""
+/uploads/<path>: arquivos enviados, só para usuários logados.
+
+- Blobs (uploads/blobs/..., ver storage.py) e miniaturas (uploads/thumbs/...,
+  ver thumbnails.py) não mudam de conteúdo: o ETag é o nome do arquivo (o
+  SHA-256 / a chave da miniatura) e o navegador pode guardá-los por um ano
+  sem revalidar.
+  Arquivos antigos usam ETag de mtime/tamanho e são sempre revalidados
+  (304 quando não mudaram).
+- Range é atendido (visualizador de PDF pede pedaços do arquivo).
+- UPLOADS_SENDFILE=x-accel (nginx) ou x-sendfile (Apache/lighttpd): a
+  autorização continua aqui, mas os bytes são enviados pelo proxy. Exemplo
+  para o nginx, com UPLOADS_ACCEL_PREFIX=/_uploads/:
+
+      location /_uploads/ {
+          internal;
+          alias /caminho/do/projeto/uploads/;
+      }
+"""
+import mimetypes
 import os
-from flask import Blueprint, current_app, send_from_directory
+from urllib.parse import quote
+from flask import Blueprint, abort, current_app, request, send_file
 from flask_login import login_required
+from werkzeug.security import safe_join
+import storage
+import thumbnails
 
 uploads_bp = Blueprint("uploads", __name__)
 
+UM_ANO = 365 * 24 * 3600
+
+def _imutavel(rel):
+    return storage.is_blob(rel) or rel.startswith(thumbnails.THUMBS_DIR + "/")
+
+def _etag(rel, st):
+    if _imutavel(rel):
+        return os.path.splitext(os.path.basename(rel))[0]  # o nome já identifica o conteúdo
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+def _cache(rv, rel):
+    rv.cache_control.public = None
+    rv.cache_control.private = True
+    if _imutavel(rel):
+        rv.cache_control.no_cache = None
+        rv.cache_control.max_age = UM_ANO
+        rv.cache_control.immutable = True
+    else:
+        rv.cache_control.max_age = None
+        rv.cache_control.no_cache = True
+        rv.expires = None
+    return rv
+
+def _pelo_proxy(modo, full, rel, st):
+    """Resposta vazia com o cabeçalho que manda o proxy enviar o arquivo (ele atende o Range)."""
+    rv = current_app.response_class(mimetype=mimetypes.guess_type(rel)[0] or "application/octet-stream")
+    rv.set_etag(_etag(rel, st))
+    rv.last_modified = st.st_mtime
+    rv = rv.make_conditional(request)
+    if rv.status_code != 304:
+        if modo == "x-accel":
+            prefixo = current_app.config.get("UPLOADS_ACCEL_PREFIX", "/_uploads/").rstrip("/")
+            rv.headers["X-Accel-Redirect"] = f"{prefixo}/{quote(rel)}"
+        else:
+            rv.headers["X-Sendfile"] = full
+    return rv
+
 @uploads_bp.route("/uploads/<path:filename>")
 @login_required
 def serve_upload(filename):
-    filename = filename.replace("\\", "/").lstrip("/")
-    if filename.startswith("uploads/"):
-        filename = filename[len("uploads/"):]
-    root = os.path.join(
-        current_app.root_path,
-        current_app.config.get("UPLOAD_FOLDER", "uploads"),
-    )
-    return send_from_directory(root, filename, as_attachment=False)
+    rel = storage.normalizar(filename)
+    full = safe_join(storage.upload_root(), rel)
+    if full is None or not os.path.isfile(full):
+        abort(404)
+    st = os.stat(full)
+
+    modo = current_app.config.get("UPLOADS_SENDFILE")
+    if modo in ("x-accel", "x-sendfile"):
+        return _cache(_pelo_proxy(modo, full, rel, st), rel)
+    rv = send_file(full, conditional=True, etag=_etag(rel, st), last_modified=st.st_mtime)
+    return _cache(rv, rel)
@@ -0,0 +1,151 @@
+# database.py
+"""
+Opções do engine do SQLAlchemy por ambiente (APP_ENV).
+
+- development (padrão do `flask run`): pool pequeno.
+- production (padrão do wsgi.py): pool do tamanho do servidor, ou seja,
+  WEB_THREADS threads de requisição mais as tarefas e envios em segundo
+  plano, sem que uma requisição espere conexão.
+
+Bancos em servidor (PostgreSQL/MySQL) ganham pool_pre_ping e pool_recycle,
+para não usar conexões derrubadas pelo servidor.
+
+SQLite (SQLITE_TUNING=1, padrão), em cada conexão nova:
+- journal_mode=WAL: leitores não esperam quem grava;
+- synchronous=NORMAL: em WAL, fsync só no checkpoint (seguro contra queda
+  do processo; numa queda de energia perde no máximo os últimos commits);
+- busy_timeout: quem encontra o banco travado espera até
+  SQLITE_BUSY_TIMEOUT_MS em vez de falhar na hora;
+- mmap_size (SQLITE_MMAP_MB) e cache_size (SQLITE_CACHE_MB): leituras
+  direto do cache do SO e páginas quentes em memória;
+- temp_store=MEMORY: ORDER BY/GROUP BY grandes sem arquivo temporário.
+
+Mesmo com busy_timeout, uma transação que leu antes de gravar pode receber
+"database is locked" na hora (o SQLite não deixa esperar quando o snapshot
+lido ficou velho). `retry_locked` repete essas transações curtas
+(lançamento do PDV, pagamento de conta, auditoria) com backoff.
+
+Tudo pode ser sobrescrito por variáveis: DB_POOL_SIZE, DB_MAX_OVERFLOW,
+DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_LOCK_RETRIES, SQLITE_BUSY_TIMEOUT_MS,
+SQLITE_MMAP_MB, SQLITE_CACHE_MB. `flask db-bench` mede o ganho.
+"""
+import os
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app
+from sqlalchemy import Date, cast, event, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from extensions import db
+
+def _env_int(nome, padrao):
+    return int(os.environ.get(nome, padrao))
+
+def _perfil(env):
+    threads = _env_int("WEB_THREADS", 8)
+    if env == "production":
+        # requisições + agendador (JOBS_WORKERS) + envios (NOTIFY_WORKERS)
+        extra = _env_int("JOBS_WORKERS", 4) + _env_int("NOTIFY_WORKERS", 4)
+        return {"pool_size": threads, "max_overflow": extra, "pool_timeout": 10}
+    return {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30}
+
+def _tuning():
+    return os.environ.get("SQLITE_TUNING", "1") == "1"
+
+def sqlite_em_memoria(url):
+    return url.get_backend_name() == "sqlite" and (url.database or ":memory:") == ":memory:"
+
+def engine_options(uri, env=None):
+    """SQLALCHEMY_ENGINE_OPTIONS para `uri` no ambiente `env`."""
+    url = make_url(uri)
+    if sqlite_em_memoria(url):
+        return {}  # pool próprio do SQLAlchemy para :memory:, sem tamanho
+    perfil = _perfil(env or os.environ.get("APP_ENV", "development"))
+    opcoes = {
+        "pool_size": _env_int("DB_POOL_SIZE", perfil["pool_size"]),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", perfil["max_overflow"]),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", perfil["pool_timeout"]),
+    }
+    if url.get_backend_name() == "sqlite":
+        if _tuning():
+            opcoes["connect_args"] = {"timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 15000) / 1000}
+    else:
+        opcoes["pool_pre_ping"] = True
+        opcoes["pool_recycle"] = _env_int("DB_POOL_RECYCLE", 1800)
+    return opcoes
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    if not isinstance(dbapi_conn, sqlite3.Connection):
+        return
+    cur = dbapi_conn.cursor()
+    cur.execute(f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT_MS', 15000)}")
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA mmap_size={_env_int('SQLITE_MMAP_MB', 256) * 2**20}")
+    cur.execute(f"PRAGMA cache_size=-{_env_int('SQLITE_CACHE_MB', 64) * 1024}")  # negativo = KiB
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.close()
+
+def init_app(app, db):
+    """Aplica os pragmas do SQLite em cada conexão nova do engine do app."""
+    app.config.setdefault("DB_LOCK_RETRIES", _env_int("DB_LOCK_RETRIES", 5 if _tuning() else 0))
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite" and not sqlite_em_memoria(db.engine.url) and _tuning():
+            event.listen(db.engine, "connect", _sqlite_pragmas)
+
+# -------------------- retry em "database is locked" --------------------
+def travado(exc):
+    msg = str(getattr(exc, "orig", exc)).lower()
+    return isinstance(exc, OperationalError) and ("locked" in msg or "busy" in msg)
+
+def retry_locked(func):
+    """
+    Repete `func` (transação curta que termina em commit) quando o banco
+    responde "database is locked". Só repete se a sessão estava sem
+    alterações pendentes ao entrar: o rollback não pode descartar o que
+    quem chamou ainda não gravou.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        tentativas = current_app.config.get("DB_LOCK_RETRIES", 0)
+        limpa = not (db.session.new or db.session.dirty or db.session.deleted)
+        n = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if not (limpa and travado(e)) or n >= tentativas:
+                    raise
+                db.session.rollback()
+                time.sleep(random.uniform(0.01, 0.05) * 2 ** n)
+                n += 1
+    return wrapper
+
+# -------------------- SQL portátil --------------------
+def dia_expr(column):
+    """Data (sem a hora) de uma coluna DateTime, para GROUP BY por dia."""
+    # No SQLite CAST(... AS DATE) não extrai a data; date() sim
+    if db.engine.dialect.name == "sqlite":
+        return func.date(column, type_=Date)
+    return cast(column, Date)
+
+# -------------------- contagem de consultas --------------------
+@contextmanager
+def contar_consultas(engine=None):
+    """
+    Lista dos SQL enviados ao banco dentro do bloco:
+    `with contar_consultas() as sql: ...` e depois len(sql).
+    Conta as consultas de todas as threads que usam o engine.
+    """
+    engine = engine or db.engine
+    sql = []
+    def _antes(_conn, _cursor, statement, _params, _context, _executemany):
+        sql.append(statement)
+    event.listen(engine, "before_cursor_execute", _antes)
+    try:
+        yield sql
+    finally:
+        event.remove(engine, "before_cursor_execute", _antes)
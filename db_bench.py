@@ -0,0 +1,82 @@
+# db_bench.py
+"""
+Vazão de gravação do PDV no SQLite com N caixas simultâneos (comando
+`flask db-bench`), com o perfil antigo (sem pragmas, sem retry) e com o
+perfil de database.py. Cada perfil roda num banco temporário próprio; o
+banco da aplicação não é tocado.
+
+Cada caixa repete o que pdv.pdv_index faz: lê os clientes (a lista do
+formulário) e lança uma venda com ledger.lancar_movimento.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from sqlalchemy.exc import OperationalError
+
+PERFIS = {"antigo": "0", "otimizado": "1"}  # valor de SQLITE_TUNING
+
+def criar_app(perfil, uri):
+    """create_app() sobre `uri` com o perfil de SQLite `perfil`, sem o agendador."""
+    from app import create_app
+    antes = {k: os.environ.get(k) for k in ("SQLITE_TUNING", "SQLALCHEMY_DATABASE_URI", "JOBS_ENABLED")}
+    os.environ.update(SQLITE_TUNING=PERFIS[perfil], SQLALCHEMY_DATABASE_URI=uri, JOBS_ENABLED="0")
+    try:
+        return create_app()
+    finally:
+        for k, v in antes.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+def _caixa(app, n, user_id, tempos, erros):
+    from models import db, Customer
+    from blueprints.pdv.ledger import lancar_movimento
+    with app.app_context():
+        for i in range(n):
+            inicio = time.perf_counter()
+            try:
+                Customer.query.filter_by(ativo=True).count()
+                lancar_movimento(tipo="VENDA", valor=Decimal("10.00"), pagamento=("DINHEIRO", "PIX", "CARTAO")[i % 3],
+                                 descricao="db-bench", user_id=user_id, status="Pago")
+                tempos.append(time.perf_counter() - inicio)
+            except OperationalError:
+                db.session.rollback()
+                erros.append(1)
+        db.session.remove()
+
+def rodar(perfil, clientes, vendas):
+    """Roda um perfil; devolve dict com vendas gravadas, erros, segundos e latências."""
+    from models import db
+    pasta = tempfile.mkdtemp(prefix="db-bench-")
+    try:
+        app = criar_app(perfil, f"sqlite:///{os.path.join(pasta, 'bench.db')}")
+        with app.app_context():
+            db.create_all()
+        tempos, erros = [], []
+        threads = [threading.Thread(target=_caixa, args=(app, vendas, u + 1, tempos, erros)) for u in range(clientes)]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        segundos = time.perf_counter() - inicio
+        with app.app_context():
+            db.engine.dispose()
+        tempos.sort()
+        return {
+            "perfil": perfil,
+            "gravadas": len(tempos),
+            "erros": len(erros),
+            "segundos": segundos,
+            "por_segundo": len(tempos) / segundos if segundos else 0,
+            "p50_ms": statistics.median(tempos) * 1000 if tempos else 0,
+            "p95_ms": tempos[int(len(tempos) * 0.95) - 1] * 1000 if tempos else 0,
+        }
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
@@ -0,0 +1,59 @@
+# db_explain.py
+"""
+Plano de execução das consultas do painel, dos alertas e dos relatórios
+(comando `flask db-explain`), para que uma regressão de índice fique visível.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import text, func
+from extensions import db
+from models import Document, CashMovement, MovimentacaoEPI
+
+def _explain_prefix(dialect_name):
+    if dialect_name == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return "EXPLAIN "
+
+def _compile(query, dialect):
+    stmt = getattr(query, "statement", query)
+    return str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+def explained_queries(hoje=None):
+    """Lista (nome, query) de todas as consultas acompanhadas."""
+    from blueprints.dash.queries import count_queries, detail_query, _filtros, _janelas
+    from alerts import alert_queries
+    from blueprints.pdv.reports import movimentos_periodo
+
+    hoje = hoje or date.today()
+    agora = datetime.combine(hoje, datetime.now().time())
+    em_30 = hoje + timedelta(days=30)
+    inicio, fim = datetime.combine(hoje, datetime.min.time()), datetime.combine(hoje, datetime.max.time())
+
+    items = [(f"dash.dashboard [{nome}]", q) for nome, q in count_queries(hoje, agora).items()]
+    items += [(f"dash.dashboard_detalhes [{kind}]", detail_query(kind, hoje, agora))
+              for kind in _filtros(_janelas(hoje, agora))]
+    items += [(f"alerts.send_alerts [{titulo}]", q) for titulo, q in alert_queries(hoje)]
+    items += [
+        ("documents.export_pdf_vencidos", Document.query.filter(Document.data_vencimento < hoje).order_by(Document.data_vencimento.asc())),
+        ("documents.export_pdf_a_vencer", Document.query.filter(Document.data_vencimento >= hoje, Document.data_vencimento <= em_30).order_by(Document.data_vencimento.asc())),
+        ("pdv.relatorio_diario [linhas]", movimentos_periodo(hoje, hoje)),
+        ("pdv.relatorio_diario [totais]", db.session.query(CashMovement.tipo, CashMovement.pagamento, func.sum(CashMovement.valor)).filter(CashMovement.created_at >= inicio, CashMovement.created_at <= fim).group_by(CashMovement.tipo, CashMovement.pagamento)),
+        ("epi.relatorio_epi", MovimentacaoEPI.query.filter(MovimentacaoEPI.data_movimentacao >= inicio, MovimentacaoEPI.data_movimentacao <= fim).order_by(MovimentacaoEPI.data_movimentacao.asc())),
+    ]
+    return items
+
+def explain_all(hoje=None):
+    """Gera (nome, sql, linhas do plano) para cada consulta acompanhada."""
+    dialect = db.engine.dialect
+    prefix = _explain_prefix(dialect.name)
+    for nome, query in explained_queries(hoje):
+        sql = _compile(query, dialect)
+        rows = db.session.execute(text(prefix + sql)).fetchall()
+        yield nome, sql, [" | ".join(str(c) for c in row) for row in rows]
+
+def uses_full_scan(plan_lines):
+    """Heurística: há varredura completa de tabela (sem índice) no plano?"""
+    for line in plan_lines:
+        up = line.upper()
+        if ("SCAN " in up and "USING" not in up and "SCAN CONSTANT" not in up) or "SEQ SCAN" in up:
+            return True
+    return False
@@ -0,0 +1,144 @@
+# employee_index.py
+"""
+Índice em memória para ligar nomes de arquivo (ou texto de PDF) a Employee.
+
+Montado com uma única consulta por lote. O nome é normalizado (sem acento,
+sem caixa, espaços colapsados), o CPF é extraído do texto quando houver e,
+sem correspondência exata, os nomes parecidos são ranqueados (difflib).
+Usado pela distribuição de holerites; serve para qualquer importação em
+massa que precise achar o funcionário de um arquivo.
+"""
+import os
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from difflib import SequenceMatcher
+from models import Employee
+
+LIMIAR_FUZZY = 0.88   # similaridade mínima para aceitar um nome aproximado
+MARGEM_FUZZY = 0.05   # distância mínima para o segundo colocado
+
+Match = namedtuple("Match", "employee metodo score")
+
+_CPF_RE = re.compile(r"(?<!\d)(\d{3})\.?(\d{3})\.?(\d{3})-?(\d{2})(?!\d)")
+_SEPARADORES = re.compile(r"[\W_]+", re.UNICODE)
+_CONTADOR = re.compile(r"\s*\(\d+\)$")  # 'Nome (2)' de arquivos repetidos
+
+def normalizar(texto):
+    """'  José  da SILVA_' -> 'jose da silva'."""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(_SEPARADORES.sub(" ", texto.casefold()).split())
+
+def so_digitos(texto):
+    return re.sub(r"\D", "", texto or "")
+
+def cpf_valido(cpf):
+    cpf = so_digitos(cpf)
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return False
+    for n in (9, 10):
+        soma = sum(int(cpf[i]) * (n + 1 - i) for i in range(n))
+        if (soma * 10 % 11) % 10 != int(cpf[n]):
+            return False
+    return True
+
+def cpfs(texto):
+    """CPFs válidos (só dígitos) no texto, na ordem em que aparecem."""
+    for m in _CPF_RE.finditer(texto or ""):
+        cpf = "".join(m.groups())
+        if cpf_valido(cpf):
+            yield cpf
+
+def extrair_cpf(texto):
+    """Primeiro CPF válido encontrado no texto, ou None."""
+    return next(cpfs(texto), None)
+
+class EmployeeIndex:
+    def __init__(self, employees):
+        self.por_nome = defaultdict(list)
+        self.por_cpf = {}
+        self.por_token = defaultdict(set)
+        for e in employees:
+            chave = normalizar(e.nome)
+            self.por_nome[chave].append(e)
+            for token in chave.split():
+                if len(token) > 2:
+                    self.por_token[token].add(chave)
+            cpf = so_digitos(e.cpf)
+            if len(cpf) == 11:
+                self.por_cpf[cpf] = e
+
+    @classmethod
+    def build(cls, query=None):
+        """Índice de todos os funcionários (ou de `query`), com uma consulta."""
+        return cls((query or Employee.query).all())
+
+    @staticmethod
+    def _preferido(candidatos):
+        """Homônimos: fica o ativo, se for único."""
+        if len(candidatos) == 1:
+            return candidatos[0]
+        ativos = [e for e in candidatos if e.ativo]
+        return ativos[0] if len(ativos) == 1 else None
+
+    def ranking(self, texto, limite=3):
+        """[(score, chave)] dos nomes mais parecidos com `texto`."""
+        alvo = normalizar(texto)
+        if not alvo:
+            return []
+        chaves = set()
+        for token in alvo.split():
+            chaves |= self.por_token.get(token, set())
+        chaves = chaves or self.por_nome.keys()
+        notas = ((SequenceMatcher(None, alvo, chave).ratio(), chave) for chave in chaves)
+        return sorted(notas, reverse=True)[:limite]
+
+    def match(self, texto):
+        """Match(employee, metodo: 'cpf' | 'nome' | 'aproximado', score) ou None."""
+        cpf = extrair_cpf(texto)
+        if cpf and cpf in self.por_cpf:
+            return Match(self.por_cpf[cpf], "cpf", 1.0)
+
+        chave = normalizar(texto)
+        if chave in self.por_nome:
+            e = self._preferido(self.por_nome[chave])
+            return Match(e, "nome", 1.0) if e else None
+
+        ranking = self.ranking(texto, limite=2)
+        if not ranking:
+            return None
+        score, melhor = ranking[0]
+        segundo = ranking[1][0] if len(ranking) > 1 else 0.0
+        if score >= LIMIAR_FUZZY and score - segundo >= MARGEM_FUZZY:
+            e = self._preferido(self.por_nome[melhor])
+            return Match(e, "aproximado", score) if e else None
+        return None
+
+    def match_arquivo(self, nome_arquivo):
+        """Como match(), a partir de um nome de arquivo ('Jose_da_Silva.pdf')."""
+        base = os.path.splitext(os.path.basename(nome_arquivo))[0]
+        return self.match(_CONTADOR.sub("", base))
+
+    def match_texto(self, texto):
+        """
+        Funcionário citado num texto longo (ex.: página de holerite): o
+        primeiro CPF cadastrado que aparecer ou o nome completo contido no
+        texto (o mais longo, se mais de um couber).
+        """
+        for cpf in cpfs(texto):
+            if cpf in self.por_cpf:
+                return Match(self.por_cpf[cpf], "cpf", 1.0)
+        alvo = f" {normalizar(texto)} "
+        contidos = [chave for chave in self.por_nome if chave and f" {chave} " in alvo]
+        if not contidos:
+            return None
+        contidos.sort(key=len, reverse=True)
+        if len(contidos) > 1 and len(contidos[0]) == len(contidos[1]):
+            return None  # dois nomes diferentes do mesmo tamanho: ambíguo
+        e = self._preferido(self.por_nome[contidos[0]])
+        return Match(e, "nome", 1.0) if e else None
+
+    def sugestoes(self, texto, limite=3, minimo=0.6):
+        """Nomes mais parecidos, para mensagens de erro."""
+        return [self.por_nome[chave][0].nome for score, chave in self.ranking(texto, limite) if score >= minimo]
@@ -0,0 +1,101 @@
+# epi_stress.py
+"""
+Teste de concorrência do estoque de EPI (comando `flask epi-stress`).
+
+N balcões, cada um numa thread, fazem retiradas de 1 a 3 unidades de dois
+EPIs disputados (às vezes dos dois na mesma retirada) e, de vez em quando,
+uma entrada, tudo por blueprints.epi.stock, num banco SQLite temporário (o
+banco da aplicação não é tocado). Com o estoque inicial pequeno, boa parte
+das retiradas encontra o saldo zerado. No fim confere, para cada EPI:
+
+- estoque >= 0;
+- estoque = inicial + entradas - saídas registradas em movimentacao_epi;
+- cada retirada aceita tem sua EPISaida e uma movimentação por EPI;
+- o consolidado diário (epi_ledger) soma o mesmo que as movimentações.
+"""
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from db_bench import criar_app
+
+def _balcao(app, n, semente, contagem, lock):
+    from models import db
+    from blueprints.epi import stock
+    rnd = random.Random(semente)
+    with app.app_context():
+        for i in range(n):
+            try:
+                if i % 10 == 9:
+                    stock.dar_entrada(rnd.choice((1, 2)), rnd.randint(1, 3))
+                    chave = "entradas"
+                else:
+                    itens = [(1, rnd.randint(1, 3))]
+                    if rnd.random() < 0.3:
+                        itens.append((2, rnd.randint(1, 3)))
+                    rnd.shuffle(itens)
+                    saida, faltas = stock.retirar(itens, None, f"balcão {semente}")
+                    chave = "aceitas" if saida else "sem_saldo"
+            except OperationalError:
+                db.session.rollback()
+                chave = "erros"
+            with lock:
+                contagem[chave] += 1
+        db.session.remove()
+
+def _conferir(estoque):
+    """Lista de problemas encontrados (vazia = estoque consistente)."""
+    from models import db, EPI, EPILedger, EPISaida, MovimentacaoEPI
+    problemas = []
+    for epi in EPI.query.order_by(EPI.id):
+        somas = dict(db.session.query(MovimentacaoEPI.tipo, func.sum(MovimentacaoEPI.quantidade))
+                     .filter(MovimentacaoEPI.epi_id == epi.id).group_by(MovimentacaoEPI.tipo).all())
+        esperado = estoque + (somas.get("ENTRADA") or 0) - (somas.get("SAIDA") or 0)
+        if epi.estoque < 0:
+            problemas.append(f"{epi.nome}: estoque negativo ({epi.estoque})")
+        if epi.estoque != esperado:
+            problemas.append(f"{epi.nome}: estoque {epi.estoque}, movimentações dizem {esperado}")
+        consolidado = db.session.query(func.sum(EPILedger.entradas), func.sum(EPILedger.saidas)).filter(
+            EPILedger.epi_id == epi.id).one()
+        if tuple(v or 0 for v in consolidado) != (somas.get("ENTRADA") or 0, somas.get("SAIDA") or 0):
+            problemas.append(f"{epi.nome}: consolidado {consolidado}, movimentações {somas}")
+    sem_itens = EPISaida.query.filter(~EPISaida.items.any()).count()
+    if sem_itens:
+        problemas.append(f"{sem_itens} retirada(s) sem movimentação")
+    return problemas
+
+def rodar(balcoes, retiradas, estoque, perfil="otimizado"):
+    """Roda o teste; devolve dict com as contagens, segundos e problemas encontrados."""
+    from models import db, EPI, EPISaida
+    pasta = tempfile.mkdtemp(prefix="epi-stress-")
+    try:
+        app = criar_app(perfil, f"sqlite:///{os.path.join(pasta, 'stress.db')}")
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([EPI(nome="Luva", estoque=estoque), EPI(nome="Máscara", estoque=estoque)])
+            db.session.commit()
+        contagem = {"aceitas": 0, "sem_saldo": 0, "entradas": 0, "erros": 0}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=_balcao, args=(app, retiradas, b, contagem, lock)) for b in range(balcoes)]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        segundos = time.perf_counter() - inicio
+        with app.app_context():
+            problemas = _conferir(estoque)
+            if EPISaida.query.count() != contagem["aceitas"]:
+                problemas.append(f"{EPISaida.query.count()} retirada(s) gravada(s), {contagem['aceitas']} aceita(s)")
+            saldos = {e.nome: e.estoque for e in EPI.query.order_by(EPI.id)}
+            db.session.remove()
+            db.engine.dispose()
+        return dict(contagem, segundos=segundos, saldos=saldos, problemas=problemas)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
@@ -0,0 +1,102 @@
+# filters.py
+"""
+Filtros das telas de listagem traduzidos para SQL.
+
+Cada classe lê os parâmetros da querystring uma única vez e aplica os
+mesmos predicados em qualquer consulta, para que a lista e a exportação
+em PDF nunca divirjam.
+"""
+from datetime import date, datetime, timedelta
+from extensions import db
+from models import Document, Employee
+
+DIAS_A_VENCER = 30
+
+def month_of(column):
+    """Mês (1-12) de uma coluna de data, portátil.
+
+    No SQLite o SQLAlchemy compila para CAST(STRFTIME('%m', col) AS INTEGER);
+    no PostgreSQL para EXTRACT(month FROM col).
+    """
+    return db.extract("month", column)
+
+def parse_date(s):
+    try: return datetime.strptime(s, "%Y-%m-%d").date()
+    except (TypeError, ValueError): return None
+
+class DocumentFilters:
+    """company_id, tipo_id, status (vencido/a_vencer/vigente), q, venc_de, venc_ate."""
+
+    def __init__(self, company_id=None, tipo_id=None, status="", q="", venc_de=None, venc_ate=None):
+        self.company_id = company_id
+        self.tipo_id = tipo_id
+        self.status = status or ""
+        self.q = (q or "").strip()
+        self.venc_de = venc_de
+        self.venc_ate = venc_ate
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(
+            company_id=args.get("company_id", type=int),
+            tipo_id=args.get("tipo_id", type=int),
+            status=args.get("status", ""),
+            q=args.get("q", ""),
+            venc_de=args.get("venc_de"),
+            venc_ate=args.get("venc_ate"),
+        )
+
+    def apply(self, query, hoje=None):
+        if self.company_id: query = query.filter(Document.company_id == self.company_id)
+        if self.tipo_id: query = query.filter(Document.tipo_id == self.tipo_id)
+        if self.q:
+            like = f"%{self.q}%"
+            query = query.filter((Document.descricao.ilike(like)) | (Document.numero.ilike(like)) | (Document.orgao_emissor.ilike(like)) | (Document.responsavel.ilike(like)))
+
+        # Mesmas regras de Document.status
+        hoje = hoje or date.today()
+        em_30 = hoje + timedelta(days=DIAS_A_VENCER)
+        if self.status == "vencido": query = query.filter(Document.data_vencimento < hoje)
+        elif self.status == "a_vencer": query = query.filter(Document.data_vencimento >= hoje, Document.data_vencimento <= em_30)
+        elif self.status == "vigente": query = query.filter(Document.data_vencimento > em_30)
+
+        d1, d2 = parse_date(self.venc_de), parse_date(self.venc_ate)
+        if d1: query = query.filter(Document.data_vencimento >= d1)
+        if d2: query = query.filter(Document.data_vencimento <= d2)
+        return query
+
+    def template_args(self):
+        return dict(company_id=self.company_id, tipo_id=self.tipo_id, status=self.status,
+                    q=self.q, venc_de=self.venc_de, venc_ate=self.venc_ate)
+
+class EmployeeFilters:
+    """q (nome), ativo ('1'/'0') e mes (aniversariantes)."""
+
+    def __init__(self, q="", ativo="", mes=""):
+        self.q = (q or "").strip()
+        self.ativo = ativo or ""
+        self.mes = mes or ""
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(q=args.get("q", ""), ativo=args.get("ativo", ""), mes=args.get("mes", ""))
+
+    @property
+    def mes_int(self):
+        try:
+            m = int(self.mes)
+        except (TypeError, ValueError):
+            return None
+        return m if 1 <= m <= 12 else None
+
+    def apply(self, query):
+        if self.q:
+            query = query.filter(Employee.nome.ilike(f"%{self.q}%"))
+        if self.ativo in ("1", "0"):
+            query = query.filter(Employee.ativo == (self.ativo == "1"))
+        if self.mes_int:
+            query = query.filter(month_of(Employee.data_nascimento) == self.mes_int)
+        return query
+
+    def template_args(self):
+        return dict(q=self.q, ativo=self.ativo, mes=self.mes)
@@ -0,0 +1,17 @@
+# gunicorn.conf.py -- gunicorn -c gunicorn.conf.py wsgi:app
+# Processos x threads: cada processo tem seu pool de conexões (database.py)
+# e disputa a trava do agendador (jobs.py); só um executa as tarefas.
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_WORKERS", min(multiprocessing.cpu_count() * 2 + 1, 5)))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", "8"))
+timeout = 120          # geração de PDF / upload grande
+graceful_timeout = 30
+keepalive = 5
+max_requests = 2000    # recicla processos aos poucos (vazamentos de memória de libs de PDF)
+max_requests_jitter = 200
+accesslog = "-"
+raw_env = ["APP_ENV=production"]
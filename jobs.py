@@ -0,0 +1,206 @@
+# jobs.py
+"""
+Tarefas em segundo plano (APScheduler).
+
+- As tarefas ficam na tabela apscheduler_jobs do próprio banco, então um
+  alerta agendado ou uma tarefa enfileirada sobrevivem a um restart.
+- Com vários workers (gunicorn/waitress), só o que detém a trava
+  `job_lock` executa tarefas; os demais apenas enfileiram. A trava expira
+  se o líder morrer e outro worker assume.
+- `enqueue(func, ...)` tira trabalho lento da requisição. Sem o agendador
+  (JOBS_ENABLED=0 ou comandos `flask`), a função roda na hora.
+
+O agendador sobe na primeira requisição (ver init_app) ou com
+`flask jobs-run` num processo dedicado.
+"""
+import atexit
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytz
+from apscheduler.util import obj_to_ref, ref_to_obj
+from flask import current_app
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from extensions import db
+
+log = logging.getLogger(__name__)
+
+JOBS_TABLE = "apscheduler_jobs"
+LOCK_NAME = "scheduler"
+TIMEZONE = pytz.timezone("America/Sao_Paulo")
+
+_app = None
+_scheduler = None
+_leader = False
+_start_lock = threading.Lock()
+_owner = None  # definido em start(), depois de um eventual fork do servidor
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Para o Alembic ignorar a tabela que o próprio APScheduler cria."""
+    return not (type_ == "table" and name == JOBS_TABLE)
+
+def _now():
+    return datetime.now(TIMEZONE).replace(tzinfo=None)
+
+# --------------------------------------------------------------- trava do líder
+def _try_lock(ttl):
+    """Renova ou toma a trava do agendador. True se este processo é o líder."""
+    from models import JobLock
+    agora = _now()
+    try:
+        tomou = db.session.query(JobLock).filter(
+            JobLock.name == LOCK_NAME,
+            (JobLock.owner == _owner) | (JobLock.expires_at < agora),
+        ).update({"owner": _owner, "expires_at": agora + timedelta(seconds=ttl)}, synchronize_session=False)
+        if not tomou:
+            db.session.add(JobLock(name=LOCK_NAME, owner=_owner, expires_at=agora + timedelta(seconds=ttl)))
+            db.session.flush()
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()  # outro processo detém a trava
+        return False
+    except (OperationalError, ProgrammingError) as e:
+        db.session.rollback()  # banco ocupado ou migração ainda não aplicada
+        log.warning("jobs: não foi possível verificar a trava (%s)", e.__class__.__name__)
+        return False
+
+def _release_lock():
+    from models import JobLock
+    try:
+        JobLock.query.filter_by(name=LOCK_NAME, owner=_owner).delete()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+def _heartbeat(app, stop):
+    """Mantém a trava e acorda o agendador para ver tarefas enfileiradas por outros workers."""
+    global _leader
+    ttl = app.config["JOBS_LOCK_TTL"]
+    espera = 0
+    while not stop.wait(espera):
+        espera = ttl / 3
+        with app.app_context():
+            lider = _try_lock(ttl)
+            db.session.remove()
+        if lider and not _leader:
+            log.info("jobs: %s assumiu o agendador", _owner)
+            _register_schedules(app)
+            _scheduler.resume()
+        elif not lider and _leader:
+            log.info("jobs: %s perdeu a trava, pausando", _owner)
+            _scheduler.pause()
+        elif lider:
+            _scheduler.wakeup()
+        _leader = lider
+
+# --------------------------------------------------------------- execução
+def _run_in_app(func_ref, args=(), kwargs=None):
+    """Executa a tarefa dentro do contexto da aplicação."""
+    func = ref_to_obj(func_ref)
+    with _app.app_context():
+        try:
+            return func(*args, **(kwargs or {}))
+        except Exception:
+            db.session.rollback()
+            log.exception("jobs: falha em %s", func_ref)
+            raise
+        finally:
+            db.session.remove()
+
+def _ref(func):
+    return func if isinstance(func, str) else obj_to_ref(func)
+
+def enqueue(func, *args, **kwargs):
+    """
+    Agenda `func(*args, **kwargs)` para já. `func` deve ser uma função de
+    módulo (ou "modulo:funcao") e os argumentos, serializáveis com pickle.
+    Retorna o id da tarefa, ou None se ela rodou na hora.
+    """
+    if _scheduler is None:
+        func = func if callable(func) else ref_to_obj(func)
+        func(*args, **kwargs)
+        return None
+    job = _scheduler.add_job(
+        _run_in_app, trigger="date", run_date=datetime.now(TIMEZONE),
+        args=[_ref(func), list(args), kwargs], id=uuid.uuid4().hex,
+        name=_ref(func), misfire_grace_time=None,
+    )
+    return job.id
+
+def schedule(job_id, func, trigger, **trigger_args):
+    """Tarefa recorrente com id fixo (substitui a anterior de mesmo id)."""
+    _scheduler.add_job(
+        _run_in_app, trigger=trigger, args=[_ref(func)], id=job_id, name=job_id,
+        replace_existing=True, coalesce=True, max_instances=1, misfire_grace_time=3600,
+        **trigger_args,
+    )
+
+def _register_schedules(app):
+    """Tarefas fixas: varredura de alertas, conferência do livro-caixa e coleta de uploads."""
+    hora, _, minuto = app.config["ALERTS_AT"].partition(":")
+    schedule("alerts.send_alerts", "alerts:send_alerts", "cron", hour=int(hora), minute=int(minuto or 0))
+    schedule("pdv.reconcile", "blueprints.pdv.ledger:reconcile_job", "cron", hour=2, minute=30)
+    schedule("uploads.gc", "storage:coletar_job", "cron", hour=3, minute=0)
+
+# --------------------------------------------------------------- ciclo de vida
+def start(app, paused=True):
+    """Cria o agendador (pausado) e a thread que disputa a trava de líder."""
+    global _scheduler, _app, _owner
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    from apscheduler.executors.pool import ThreadPoolExecutor
+
+    with _start_lock:
+        if _scheduler is not None:
+            return _scheduler
+        _app = app
+        _owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        with app.app_context():
+            store = SQLAlchemyJobStore(engine=db.engine, tablename=JOBS_TABLE)
+        _scheduler = BackgroundScheduler(
+            jobstores={"default": store},
+            executors={"default": ThreadPoolExecutor(app.config["JOBS_WORKERS"])},
+            job_defaults={"coalesce": False, "max_instances": 3},
+            timezone=TIMEZONE,
+        )
+        _scheduler.start(paused=paused)
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(app, stop), name="jobs-heartbeat", daemon=True).start()
+        app.extensions["jobs"] = {"scheduler": _scheduler, "stop": stop}
+        atexit.register(shutdown)
+        return _scheduler
+
+def shutdown():
+    global _scheduler, _leader
+    if _scheduler is None:
+        return
+    _app.extensions["jobs"]["stop"].set()
+    _scheduler.shutdown(wait=False)
+    if _leader:
+        with _app.app_context():
+            _release_lock()
+    _scheduler, _leader = None, False
+
+def is_leader():
+    return _leader
+
+def init_app(app):
+    app.config.setdefault("JOBS_ENABLED", os.environ.get("JOBS_ENABLED", "1") == "1")
+    app.config.setdefault("JOBS_WORKERS", int(os.environ.get("JOBS_WORKERS", "4")))
+    app.config.setdefault("JOBS_LOCK_TTL", int(os.environ.get("JOBS_LOCK_TTL", "30")))
+    app.config.setdefault("ALERTS_AT", os.environ.get("ALERTS_AT", "07:00"))
+
+    if not app.config["JOBS_ENABLED"]:
+        return
+
+    # Só processos que atendem requisições sobem o agendador (não `flask db ...`)
+    @app.before_request
+    def _start_jobs():
+        if _scheduler is None:
+            start(current_app._get_current_object())
@@ -0,0 +1,120 @@
+# loadtest.py
+"""
+Cenário de carga: caixas do PDV e usuários do painel ao mesmo tempo.
+
+Suba o servidor (de preferência sobre uma cópia do banco) e rode, por ex.:
+
+    python loadtest.py --url http://127.0.0.1:5000 --usuario admin --senha 1234 --pdv 4 --dash 4
+
+Cada caixa abre o PDV, lança uma venda (só com --vendas, que GRAVA no
+banco) e abre a lista de movimentos; cada usuário do painel abre o painel
+(/) e o detalhe de um card. No fim mostra, por cenário, requisições/s e
+latências p50/p95/máx. Rode contra `flask run` e contra `python wsgi.py`
+(ou o gunicorn) para comparar; com --pdv 0 tem-se a linha de base do painel.
+"""
+import argparse
+import random
+import re
+import statistics
+import threading
+import time
+
+import requests
+
+CARDS = ["docs_venc", "docs_avencer", "aso_venc", "cnh_avencer", "agendamentos_proximos", "licenc_avencer"]
+_CSRF = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"|value="([^"]+)"[^>]*name="csrf_token"')
+
+def _csrf(html):
+    m = _CSRF.search(html)
+    return (m.group(1) or m.group(2)) if m else ""
+
+def login(url, usuario, senha):
+    s = requests.Session()
+    token = _csrf(s.get(f"{url}/auth/login").text)
+    r = s.post(f"{url}/auth/login", data={"csrf_token": token, "username": usuario, "password": senha}, allow_redirects=False)
+    if r.status_code != 302 or "/auth/login" in r.headers.get("Location", ""):
+        raise SystemExit("Login falhou: confira --usuario/--senha.")
+    return s
+
+class Medidas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tempos = {}
+        self.erros = {}
+
+    def registrar(self, cenario, segundos, ok):
+        with self.lock:
+            self.tempos.setdefault(cenario, []).append(segundos)
+            if not ok:
+                self.erros[cenario] = self.erros.get(cenario, 0) + 1
+
+def _get(s, medidas, cenario, url):
+    inicio = time.perf_counter()
+    try:
+        r = s.get(url, timeout=60)
+        ok = r.status_code == 200
+        return r if ok else None
+    except requests.RequestException:
+        ok = False
+        return None
+    finally:
+        medidas.registrar(cenario, time.perf_counter() - inicio, ok)
+
+def caixa(args, medidas, ate):
+    s = login(args.url, args.usuario, args.senha)
+    while time.monotonic() < ate:
+        r = _get(s, medidas, "pdv", f"{args.url}/pdv/")
+        if args.vendas and r is not None:
+            inicio = time.perf_counter()
+            dados = {"csrf_token": _csrf(r.text), "tipo": "VENDA", "customer_id": "0", "valor": "10.00",
+                     "pagamento": random.choice(["DINHEIRO", "PIX", "CARTAO"]), "descricao": "loadtest",
+                     "submit_no_print": "1"}
+            try:
+                ok = s.post(f"{args.url}/pdv/", data=dados, allow_redirects=False, timeout=60).status_code == 302
+            except requests.RequestException:
+                ok = False
+            medidas.registrar("pdv_venda", time.perf_counter() - inicio, ok)
+        _get(s, medidas, "pdv_movimentos", f"{args.url}/pdv/mov")
+
+def painel(args, medidas, ate):
+    s = login(args.url, args.usuario, args.senha)
+    while time.monotonic() < ate:
+        _get(s, medidas, "dash", f"{args.url}/")
+        _get(s, medidas, "dash_detalhe", f"{args.url}/dash/dash/detalhes/{random.choice(CARDS)}")
+
+def _pct(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:5000")
+    ap.add_argument("--usuario", default="admin")
+    ap.add_argument("--senha", required=True)
+    ap.add_argument("--pdv", type=int, default=4, help="caixas simultâneos")
+    ap.add_argument("--dash", type=int, default=4, help="usuários do painel simultâneos")
+    ap.add_argument("--segundos", type=int, default=30)
+    ap.add_argument("--vendas", action="store_true", help="lança vendas de R$ 10 (grava no banco)")
+    args = ap.parse_args()
+    args.url = args.url.rstrip("/")
+
+    medidas = Medidas()
+    ate = time.monotonic() + args.segundos
+    threads = [threading.Thread(target=caixa, args=(args, medidas, ate)) for _ in range(args.pdv)]
+    threads += [threading.Thread(target=painel, args=(args, medidas, ate)) for _ in range(args.dash)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - inicio
+
+    print(f"{args.pdv} caixa(s) + {args.dash} usuário(s) do painel por {total:.0f}s em {args.url}")
+    print(f"{'cenário':<16}{'req':>7}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'máx ms':>9}{'erros':>7}")
+    for cenario, tempos in sorted(medidas.tempos.items()):
+        print(f"{cenario:<16}{len(tempos):>7}{len(tempos) / total:>8.1f}"
+              f"{statistics.median(tempos) * 1000:>9.0f}{_pct(tempos, 0.95) * 1000:>9.0f}"
+              f"{max(tempos) * 1000:>9.0f}{medidas.erros.get(cenario, 0):>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Adiciona consolidado diario de EPI
+
+Revision ID: 1b0ac0d51fa6
+Revises: 41a36f9e14ee
+Create Date: 2026-10-18 16:05:12.482031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b0ac0d51fa6'
+down_revision = '41a36f9e14ee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('epi_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('epi_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('entradas', sa.Integer(), nullable=False),
+    sa.Column('saidas', sa.Integer(), nullable=False),
+    sa.Column('qtd', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['epi_id'], ['epi.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dia', 'epi_id', 'employee_id', name='uq_epi_ledger_dia_epi_employee')
+    )
+    with op.batch_alter_table('epi_ledger', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_epi_ledger_dia'), ['dia'], unique=False)
+        batch_op.create_index(batch_op.f('ix_epi_ledger_epi_id'), ['epi_id'], unique=False)
+
+    # Preenche o consolidado com o histórico de movimentações
+    dia = "date(m.data_movimentacao)" if op.get_bind().dialect.name == "sqlite" else "CAST(m.data_movimentacao AS DATE)"
+    funcionario = "COALESCE(m.employee_id, s.employee_id, 0)"
+    op.execute(f"""
+        INSERT INTO epi_ledger (dia, epi_id, employee_id, entradas, saidas, qtd)
+        SELECT {dia}, m.epi_id, {funcionario},
+               SUM(CASE WHEN m.tipo = 'ENTRADA' THEN m.quantidade ELSE 0 END),
+               SUM(CASE WHEN m.tipo = 'SAIDA' THEN m.quantidade ELSE 0 END),
+               COUNT(*)
+        FROM movimentacao_epi m LEFT JOIN epi_saida s ON s.id = m.saida_id
+        WHERE m.data_movimentacao IS NOT NULL
+        GROUP BY {dia}, m.epi_id, {funcionario}
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('epi_ledger', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_epi_ledger_epi_id'))
+        batch_op.drop_index(batch_op.f('ix_epi_ledger_dia'))
+
+    op.drop_table('epi_ledger')
@@ -0,0 +1,44 @@
+"""Adiciona reserva da geracao do comprovante de EPI
+
+Revision ID: 268a2bbb6488
+Revises: 1b0ac0d51fa6
+Create Date: 2026-10-18 18:40:27.913604
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '268a2bbb6488'
+down_revision = '1b0ac0d51fa6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('epi_saida', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('receipt_reservado_em', sa.DateTime(), nullable=True))
+
+    # Retiradas antigas: o comprovante foi gravado só nos documentos do funcionário
+    # (func_docs/comprovante_epi_<id>_<data>.pdf); a retirada passa a apontar para ele
+    bind = op.get_bind()
+    docs = bind.execute(sa.text(
+        "SELECT employee_id, arquivo_path FROM employee_document "
+        "WHERE tipo = 'Comprovante de EPI' AND arquivo_path LIKE '%comprovante!_epi!_%' ESCAPE '!' "
+        "ORDER BY id"
+    )).fetchall()
+    for employee_id, path in docs:
+        m = re.search(r"comprovante_epi_(\d+)_", path or "")
+        if m:
+            bind.execute(sa.text(
+                "UPDATE epi_saida SET receipt_pdf_path = :path "
+                "WHERE id = :id AND employee_id = :employee_id AND receipt_pdf_path IS NULL"
+            ), {"path": path, "id": int(m.group(1)), "employee_id": employee_id})
+
+
+def downgrade():
+    with op.batch_alter_table('epi_saida', schema=None) as batch_op:
+        batch_op.drop_column('receipt_reservado_em')
@@ -0,0 +1,43 @@
+"""Adiciona status de entrega de notificacoes
+
+Revision ID: 2886c8086ea8
+Revises: bbe1a26e64cd
+Create Date: 2026-10-18 12:47:31.205518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2886c8086ea8'
+down_revision = 'bbe1a26e64cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('canal', sa.String(length=20), nullable=False),
+    sa.Column('destino', sa.String(length=255), nullable=False),
+    sa.Column('assunto', sa.String(length=255), nullable=True),
+    sa.Column('referencia', sa.String(length=100), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('erro', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_notification_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_notification_referencia'), ['referencia'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_referencia'))
+        batch_op.drop_index(batch_op.f('ix_notification_created_at'))
+
+    op.drop_table('notification')
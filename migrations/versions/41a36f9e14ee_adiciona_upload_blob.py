@@ -0,0 +1,34 @@
+"""Adiciona armazenamento de uploads por conteudo
+
+Revision ID: 41a36f9e14ee
+Revises: a6794b032e25
+Create Date: 2026-10-18 15:02:41.118306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '41a36f9e14ee'
+down_revision = 'a6794b032e25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Os arquivos existentes continuam onde estão; `flask uploads-dedup` os migra.
+    op.create_table('upload_blob',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('path', sa.String(length=300), nullable=False),
+    sa.Column('tamanho', sa.BigInteger(), nullable=False),
+    sa.Column('refs', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('visto_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256'),
+    sa.UniqueConstraint('path')
+    )
+
+
+def downgrade():
+    op.drop_table('upload_blob')
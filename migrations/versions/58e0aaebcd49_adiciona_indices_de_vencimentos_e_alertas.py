@@ -0,0 +1,60 @@
+"""Adiciona indices de vencimentos e alertas
+
+Revision ID: 58e0aaebcd49
+Revises: ae8ea8e88659
+Create Date: 2026-10-18 10:41:07.902114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '58e0aaebcd49'
+down_revision = 'ae8ea8e88659'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_document_data_vencimento'), ['data_vencimento'], unique=False)
+
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.create_index('ix_employee_ativo_aso_validade', ['ativo', 'aso_validade'], unique=False)
+        batch_op.create_index('ix_employee_ativo_cnh_validade', ['ativo', 'cnh_validade'], unique=False)
+        batch_op.create_index('ix_employee_ativo_exame_toxico_validade', ['ativo', 'exame_toxico_validade'], unique=False)
+
+    with op.batch_alter_table('agendamento', schema=None) as batch_op:
+        batch_op.create_index('ix_agendamento_status_data_hora', ['status', 'data_hora'], unique=False)
+
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_vehicle_venc_licenciamento'), ['venc_licenciamento'], unique=False)
+
+    with op.batch_alter_table('cash_movement', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cash_movement_created_at'), ['created_at'], unique=False)
+
+    with op.batch_alter_table('movimentacao_epi', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_movimentacao_epi_data_movimentacao'), ['data_movimentacao'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('movimentacao_epi', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_movimentacao_epi_data_movimentacao'))
+
+    with op.batch_alter_table('cash_movement', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cash_movement_created_at'))
+
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_vehicle_venc_licenciamento'))
+
+    with op.batch_alter_table('agendamento', schema=None) as batch_op:
+        batch_op.drop_index('ix_agendamento_status_data_hora')
+
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.drop_index('ix_employee_ativo_exame_toxico_validade')
+        batch_op.drop_index('ix_employee_ativo_cnh_validade')
+        batch_op.drop_index('ix_employee_ativo_aso_validade')
+
+    with op.batch_alter_table('document', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_document_data_vencimento'))
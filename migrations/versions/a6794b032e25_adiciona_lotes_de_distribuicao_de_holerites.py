@@ -0,0 +1,52 @@
+"""Adiciona lotes de distribuicao de holerites
+
+Revision ID: a6794b032e25
+Revises: 2886c8086ea8
+Create Date: 2026-10-18 13:31:09.664802
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6794b032e25'
+down_revision = '2886c8086ea8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payslip_batch',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('processando_ate', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('payslip_item',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('batch_id', sa.Integer(), nullable=False),
+    sa.Column('arquivo', sa.String(length=255), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('erro', sa.String(length=500), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['batch_id'], ['payslip_batch.id'], ),
+    sa.ForeignKeyConstraint(['employee_id'], ['employee.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('batch_id', 'arquivo', name='uq_payslip_item_batch_arquivo')
+    )
+    with op.batch_alter_table('payslip_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_payslip_item_batch_id'), ['batch_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payslip_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payslip_item_batch_id'))
+
+    op.drop_table('payslip_item')
+    op.drop_table('payslip_batch')
@@ -0,0 +1,52 @@
+"""Adiciona projecao de ultima manutencao por veiculo
+
+Revision ID: ae8ea8e88659
+Revises: fd525efc3f70
+Create Date: 2026-10-18 09:12:40.518231
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ae8ea8e88659'
+down_revision = 'fd525efc3f70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ultima_manutencao_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('ultima_troca_oleo_id', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('maintenance_log', schema=None) as batch_op:
+        batch_op.create_index('ix_maintenance_log_vehicle_data', ['vehicle_id', 'data'], unique=False)
+
+    # Preenche a projeção com o histórico existente
+    op.execute("""
+        UPDATE vehicle SET ultima_manutencao_id = (
+            SELECT m.id FROM maintenance_log m
+            WHERE m.vehicle_id = vehicle.id
+            ORDER BY m.data DESC, m.id DESC LIMIT 1
+        )
+    """)
+    op.execute("""
+        UPDATE vehicle SET ultima_troca_oleo_id = (
+            SELECT m.id FROM maintenance_log m
+            WHERE m.vehicle_id = vehicle.id
+              AND (lower(m.tipo_servico) LIKE '%oleo%' OR m.tipo_servico LIKE '%óleo%'
+                   OR m.tipo_servico LIKE '%Óleo%' OR m.tipo_servico LIKE '%ÓLEO%')
+            ORDER BY m.data DESC, m.id DESC LIMIT 1
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_log_vehicle_data')
+
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.drop_column('ultima_troca_oleo_id')
+        batch_op.drop_column('ultima_manutencao_id')
@@ -0,0 +1,29 @@
+"""Adiciona trava do agendador de tarefas
+
+Revision ID: bbe1a26e64cd
+Revises: dca03c874cbb
+Create Date: 2026-10-18 12:02:16.480913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'bbe1a26e64cd'
+down_revision = 'dca03c874cbb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_lock',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('owner', sa.String(length=100), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('job_lock')
@@ -0,0 +1,51 @@
+"""Adiciona livro-caixa do PDV
+
+Revision ID: dca03c874cbb
+Revises: 58e0aaebcd49
+Create Date: 2026-10-18 11:20:53.114870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dca03c874cbb'
+down_revision = '58e0aaebcd49'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cash_ledger',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('pagamento', sa.String(length=20), nullable=False),
+    sa.Column('entradas', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('saidas', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('qtd', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dia', 'user_id', 'pagamento', name='uq_cash_ledger_dia_user_pagamento')
+    )
+    with op.batch_alter_table('cash_ledger', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_cash_ledger_dia'), ['dia'], unique=False)
+
+    # Preenche o livro com o histórico de movimentos
+    dia = "date(created_at)" if op.get_bind().dialect.name == "sqlite" else "CAST(created_at AS DATE)"
+    op.execute(f"""
+        INSERT INTO cash_ledger (dia, user_id, pagamento, entradas, saidas, qtd)
+        SELECT {dia}, COALESCE(user_id, 0), pagamento,
+               SUM(CASE WHEN tipo IN ('VENDA', 'PAGAMENTO') THEN valor ELSE 0 END),
+               SUM(CASE WHEN tipo IN ('SANGRIA', 'RETIRADA') THEN valor ELSE 0 END),
+               COUNT(*)
+        FROM cash_movement
+        GROUP BY {dia}, COALESCE(user_id, 0), pagamento
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('cash_ledger', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_cash_ledger_dia'))
+
+    op.drop_table('cash_ledger')
@@ -51,6 +51,11 @@ class Funcao(db.Model):
     nome = db.Column(db.String(120), nullable=False)
 
 class Employee(db.Model):
+    __table_args__ = (
+        db.Index('ix_employee_ativo_aso_validade', 'ativo', 'aso_validade'),
+        db.Index('ix_employee_ativo_cnh_validade', 'ativo', 'cnh_validade'),
+        db.Index('ix_employee_ativo_exame_toxico_validade', 'ativo', 'exame_toxico_validade'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     company_id = db.Column(db.Integer, db.ForeignKey("company.id"))
     funcao_id = db.Column(db.Integer, db.ForeignKey("funcao.id"))
@@ -110,7 +115,7 @@ class Document(db.Model):
     orgao_emissor = db.Column(db.String(120))
     responsavel = db.Column(db.String(120))
     data_expedicao = db.Column(db.Date)
-    data_vencimento = db.Column(db.Date)
+    data_vencimento = db.Column(db.Date, index=True)
     arquivo_path = db.Column(db.String(300))
     created_at = db.Column(db.DateTime, default=now_sao_paulo)
     company = db.relationship("Company")
@@ -132,6 +137,40 @@ class EmployeeDocument(db.Model):
     uploaded_at = db.Column(db.DateTime, default=now_sao_paulo)
     employee = db.relationship("Employee", backref="documentos")
 
+class UploadBlob(db.Model):
+    """Arquivo enviado, guardado uma vez por conteúdo (ver storage.py)."""
+    __tablename__ = "upload_blob"
+    sha256 = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(300), nullable=False, unique=True)  # relativo a uploads/: blobs/ab/<sha>.ext
+    tamanho = db.Column(db.BigInteger, nullable=False)
+    refs = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=now_sao_paulo, nullable=False)
+    visto_em = db.Column(db.DateTime, default=now_sao_paulo, nullable=False)  # último upload do mesmo conteúdo
+
+class PayslipBatch(db.Model):
+    """Lote de distribuição de holerites (ver blueprints/holerites/batch.py)."""
+    __tablename__ = "payslip_batch"
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default="em_andamento")  # em_andamento / concluido
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
+    created_at = db.Column(db.DateTime, default=now_sao_paulo, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    processando_ate = db.Column(db.DateTime)  # trava de quem está processando o lote
+    itens = db.relationship("PayslipItem", backref="batch", lazy="dynamic", cascade="all, delete-orphan")
+
+class PayslipItem(db.Model):
+    """Um arquivo do lote: pendente -> encontrado -> enviando -> enviado -> arquivado (ou falhou)."""
+    __tablename__ = "payslip_item"
+    __table_args__ = (db.UniqueConstraint("batch_id", "arquivo", name="uq_payslip_item_batch_arquivo"),)
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey("payslip_batch.id"), nullable=False, index=True)
+    arquivo = db.Column(db.String(255), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="pendente")
+    erro = db.Column(db.String(500))
+    updated_at = db.Column(db.DateTime, default=now_sao_paulo, onupdate=now_sao_paulo)
+    employee = db.relationship("Employee")
+
 class CashMovement(db.Model):
     __tablename__ = "cash_movement"
     id = db.Column(db.Integer, primary_key=True)
@@ -140,7 +179,7 @@ class CashMovement(db.Model):
     pagamento = db.Column(db.String(20), nullable=False)
     descricao = db.Column(db.String(255))
     ticket_ref = db.Column(db.String(50))
-    created_at = db.Column(db.DateTime, default=now_sao_paulo, nullable=False)
+    created_at = db.Column(db.DateTime, default=now_sao_paulo, nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
     placa = db.Column(db.String(10))
@@ -150,6 +189,39 @@ class CashMovement(db.Model):
     pagamento_id = db.Column(db.Integer, db.ForeignKey('cash_movement.id'), nullable=True)
     pagamentos_quitados = db.relationship('CashMovement', backref=db.backref('pagamento_de', remote_side=[id]))
 
+class Notification(db.Model):
+    """Status de entrega de cada e-mail / WhatsApp (ver notifications.py)."""
+    __tablename__ = "notification"
+    id = db.Column(db.Integer, primary_key=True)
+    canal = db.Column(db.String(20), nullable=False)  # email / whatsapp
+    destino = db.Column(db.String(255), nullable=False)
+    assunto = db.Column(db.String(255))
+    referencia = db.Column(db.String(100), index=True)  # ex.: alertas, holerite:<arquivo>
+    status = db.Column(db.String(20), nullable=False, default="pendente")  # pendente/enviando/enviado/falhou
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    erro = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=now_sao_paulo, nullable=False, index=True)
+    sent_at = db.Column(db.DateTime)
+
+class JobLock(db.Model):
+    """Trava de líder do agendador de tarefas (ver jobs.py)."""
+    __tablename__ = "job_lock"
+    name = db.Column(db.String(50), primary_key=True)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class CashLedger(db.Model):
+    """Saldo acumulado do caixa por dia, usuário e forma de pagamento (ver blueprints/pdv/ledger.py)."""
+    __tablename__ = "cash_ledger"
+    __table_args__ = (db.UniqueConstraint("dia", "user_id", "pagamento", name="uq_cash_ledger_dia_user_pagamento"),)
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = lançamento sem usuário
+    pagamento = db.Column(db.String(20), nullable=False)
+    entradas = db.Column(db.Numeric(12,2), nullable=False, default=0)  # VENDA / PAGAMENTO
+    saidas = db.Column(db.Numeric(12,2), nullable=False, default=0)    # SANGRIA / RETIRADA
+    qtd = db.Column(db.Integer, nullable=False, default=0)
+
 class Customer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tipo_pessoa = db.Column(db.String(2), default='PF')
@@ -189,9 +261,12 @@ class EPISaida(db.Model):
     retirado_por = db.Column(db.String(200), nullable=False)
     data_saida = db.Column(db.DateTime, default=now_sao_paulo)
     receipt_pdf_path = db.Column(db.String(300))
+    receipt_reservado_em = db.Column(db.DateTime)  # geração do comprovante em andamento (epi/receipts.py)
     
     employee = db.relationship('Employee')
-    items = db.relationship('MovimentacaoEPI', backref='saida', lazy='dynamic', cascade="all, delete-orphan")
+    # Lista comum (não 'dynamic') para aceitar selectinload nas listagens
+    items = db.relationship('MovimentacaoEPI', backref='saida', cascade="all, delete-orphan",
+                            order_by='MovimentacaoEPI.id')
 
 class MovimentacaoEPI(db.Model):
     __tablename__ = 'movimentacao_epi'
@@ -199,7 +274,7 @@ class MovimentacaoEPI(db.Model):
     epi_id = db.Column(db.Integer, db.ForeignKey('epi.id'), nullable=False)
     tipo = db.Column(db.String(20), nullable=False)
     quantidade = db.Column(db.Integer, nullable=False)
-    data_movimentacao = db.Column(db.DateTime, default=now_sao_paulo)
+    data_movimentacao = db.Column(db.DateTime, default=now_sao_paulo, index=True)
     retirado_por = db.Column(db.String(200)) 
     employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=True)
     saida_id = db.Column(db.Integer, db.ForeignKey('epi_saida.id'), nullable=True)
@@ -207,6 +282,18 @@ class MovimentacaoEPI(db.Model):
     epi = db.relationship('EPI', backref='movimentacoes')
     employee = db.relationship('Employee')
 
+class EPILedger(db.Model):
+    """Entradas e saídas de EPI por dia, EPI e funcionário (ver blueprints/epi/ledger.py)."""
+    __tablename__ = "epi_ledger"
+    __table_args__ = (db.UniqueConstraint("dia", "epi_id", "employee_id", name="uq_epi_ledger_dia_epi_employee"),)
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False, index=True)
+    epi_id = db.Column(db.Integer, db.ForeignKey('epi.id'), nullable=False, index=True)
+    employee_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = entrada ou retirada por terceiro
+    entradas = db.Column(db.Integer, nullable=False, default=0)
+    saidas = db.Column(db.Integer, nullable=False, default=0)
+    qtd = db.Column(db.Integer, nullable=False, default=0)
+
 class Servico(db.Model):
     __tablename__ = 'servico'
     id = db.Column(db.Integer, primary_key=True)
@@ -214,6 +301,7 @@ class Servico(db.Model):
 
 class Agendamento(db.Model):
     __tablename__ = 'agendamento'
+    __table_args__ = (db.Index('ix_agendamento_status_data_hora', 'status', 'data_hora'),)
     id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customer.id'), nullable=True)
     servico_id = db.Column(db.Integer, db.ForeignKey('servico.id'), nullable=False)
@@ -262,13 +350,19 @@ class Vehicle(db.Model):
     descricao = db.Column(db.String(300))
     placa = db.Column(db.String(10), unique=True, nullable=False)
     renavam = db.Column(db.String(20), unique=True)
-    venc_licenciamento = db.Column(db.Date)
+    venc_licenciamento = db.Column(db.Date, index=True)
+    # Projeção desnormalizada, mantida por blueprints/fleet/maintenance.py
+    ultima_manutencao_id = db.Column(db.Integer)
+    ultima_troca_oleo_id = db.Column(db.Integer)
     
+    ultima_manutencao = db.relationship('MaintenanceLog', primaryjoin='foreign(Vehicle.ultima_manutencao_id) == MaintenanceLog.id', viewonly=True)
+    ultima_troca_oleo = db.relationship('MaintenanceLog', primaryjoin='foreign(Vehicle.ultima_troca_oleo_id) == MaintenanceLog.id', viewonly=True)
     manutencoes = db.relationship('MaintenanceLog', backref='vehicle', lazy='dynamic', order_by="desc(MaintenanceLog.data)", cascade="all, delete-orphan")
     documentos = db.relationship('VehicleDocument', backref='vehicle', lazy='dynamic', cascade="all, delete-orphan")
 
 class MaintenanceLog(db.Model):
     __tablename__ = 'maintenance_log'
+    __table_args__ = (db.Index('ix_maintenance_log_vehicle_data', 'vehicle_id', 'data'),)
     id = db.Column(db.Integer, primary_key=True)
     vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicle.id'), nullable=False)
     data = db.Column(db.Date, nullable=False)
@@ -1,24 +1,175 @@
 # notifications.py
+"""
+Envio de e-mail (SMTP) e WhatsApp (Twilio).
 
-import os, smtplib
+- SMTP: conexões reaproveitadas de um pool (SMTP_POOL_SIZE), em vez de
+  conectar + STARTTLS + login a cada mensagem.
+- Twilio: requests.Session com keep-alive e timeout (TWILIO_TIMEOUT).
+- Falhas temporárias (4xx do SMTP, queda de conexão, 429/5xx do Twilio)
+  são repetidas com backoff exponencial (NOTIFY_RETRIES, NOTIFY_BACKOFF).
+- Cada envio vira uma linha em `notification` com o status da entrega.
+
+send_email/send_whatsapp enviam na hora e devolvem (ok, mensagem);
+dispatch_email/dispatch_whatsapp entregam a um pool de NOTIFY_WORKERS
+threads e devolvem um Future.
+"""
+import os, smtplib, threading, time, queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from email.message import EmailMessage
-import requests
+from flask import current_app, has_app_context
+from extensions import db
+from models import Notification, now_sao_paulo
+
+def _env_int(nome, padrao):
+    return int(os.getenv(nome, str(padrao)))
+
+# -------------------- POOL DE CONEXÕES SMTP --------------------
+class SMTPPool:
+    """Até `size` conexões SMTP autenticadas, reaproveitadas entre envios."""
+
+    IDLE_MAX = 60  # segundos; servidores costumam derrubar conexões ociosas
+
+    def __init__(self, size):
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        host = os.getenv("SMTP_HOST")
+        port = int(os.getenv("SMTP_PORT", "587"))
+        user = os.getenv("SMTP_USER")
+        s = smtplib.SMTP(host, port, timeout=_env_int("SMTP_TIMEOUT", 30))
+        if os.getenv("SMTP_STARTTLS", "1") == "1":
+            s.starttls()
+        if user: s.login(user, os.getenv("SMTP_PASS"))
+        return s
+
+    def _pegar_ociosa(self):
+        while True:
+            try:
+                desde, conn = self._idle.get_nowait()
+            except queue.Empty:
+                return None
+            if time.monotonic() - desde < self.IDLE_MAX:
+                try:
+                    if conn.noop()[0] == 250:
+                        return conn
+                except smtplib.SMTPException:
+                    pass
+            _fechar(conn)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._pegar_ociosa() or self._connect()
+            yield conn
+        except Exception:
+            _fechar(conn)  # estado da conexão desconhecido: descarta
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put((time.monotonic(), conn))
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                _, conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _fechar(conn)
+
+def _fechar(conn):
+    if conn is None: return
+    try: conn.quit()
+    except Exception:
+        try: conn.close()
+        except Exception: pass
+
+_lock = threading.Lock()
+_smtp_pool = None
+_http = None
+_executor = None
+_vagas = None
+
+def smtp_pool():
+    global _smtp_pool
+    with _lock:
+        if _smtp_pool is None:
+            _smtp_pool = SMTPPool(_env_int("SMTP_POOL_SIZE", 4))
+        return _smtp_pool
+
+def http_session():
+    """Sessão HTTP compartilhada (keep-alive) para o Twilio."""
+    global _http
+    with _lock:
+        if _http is None:
+            import requests  # só quem envia WhatsApp paga a importação
+            from requests.adapters import HTTPAdapter
+            _http = requests.Session()
+            tamanho = _env_int("NOTIFY_WORKERS", 4)
+            _http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=tamanho))
+        return _http
+
+# -------------------- STATUS DE ENTREGA --------------------
+# Gravado por uma conexão própria para não fazer commit da sessão de quem chamou
+def _novo_registro(canal, destino, assunto, referencia):
+    if not has_app_context(): return None
+    with db.engine.begin() as conn:
+        res = conn.execute(Notification.__table__.insert().values(
+            canal=canal, destino=destino[:255], assunto=(assunto or "")[:255], referencia=referencia,
+            status="pendente", tentativas=0, created_at=now_sao_paulo()))
+        return res.inserted_primary_key[0]
 
-# --- FUNÇÃO DE E-MAIL ATUALIZADA PARA ACEITAR ANEXOS ---
-def send_email(to_list, subject, body, attachment_path=None, attachment_filename=None):
-    host = os.getenv("SMTP_HOST")
-    if not host: 
+def _atualizar(nid, **valores):
+    if nid is None or not has_app_context(): return
+    with db.engine.begin() as conn:
+        conn.execute(Notification.__table__.update().where(Notification.id == nid).values(**valores))
+
+# -------------------- RETRY --------------------
+def _temporario(exc):
+    """A falha pode passar numa nova tentativa?"""
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPException):
+        return isinstance(exc, smtplib.SMTPServerDisconnected)
+    import requests
+    if isinstance(exc, requests.HTTPError):
+        status = exc.response.status_code if exc.response is not None else 0
+        return status == 429 or status >= 500
+    return isinstance(exc, (requests.ConnectionError, requests.Timeout, OSError))
+
+def _com_retry(envio, nid):
+    tentativas = max(1, _env_int("NOTIFY_RETRIES", 3))
+    espera = float(os.getenv("NOTIFY_BACKOFF", "1"))
+    for n in range(1, tentativas + 1):
+        _atualizar(nid, status="enviando", tentativas=n)
+        try:
+            envio()
+        except Exception as e:
+            if n < tentativas and _temporario(e):
+                time.sleep(espera * 2 ** (n - 1))
+                continue
+            _atualizar(nid, status="falhou", erro=str(e)[:1000])
+            return False, f"Falha no envio: {e}"
+        _atualizar(nid, status="enviado", erro=None, sent_at=now_sao_paulo())
+        return True, None
+
+# -------------------- E-MAIL --------------------
+def _montar_email(to_list, subject, body, attachment_path=None, attachment_filename=None):
+    """(EmailMessage, None) ou (None, erro)."""
+    if not os.getenv("SMTP_HOST"):
         print("ERRO: SMTP_HOST não configurado no .env")
-        return False, "SMTP_HOST não configurado"
-    
-    port = int(os.getenv("SMTP_PORT","587"))
-    user = os.getenv("SMTP_USER")
-    pwd  = os.getenv("SMTP_PASS")
-    from_addr = os.getenv("SMTP_FROM", user)
-    
+        return None, "SMTP_HOST não configurado"
+
     msg = EmailMessage()
     msg["Subject"] = subject
-    msg["From"] = from_addr
+    msg["From"] = os.getenv("SMTP_FROM", os.getenv("SMTP_USER"))
     msg["To"] = ", ".join([t.strip() for t in to_list if t.strip()])
     msg.set_content(body)
 
@@ -30,23 +181,83 @@ def send_email(to_list, subject, body, attachment_path=None, attachment_filename
             msg.add_attachment(file_data, maintype='application', subtype='octet-stream', filename=attachment_filename)
         except FileNotFoundError:
             print(f"ERRO: Arquivo de anexo não encontrado em {attachment_path}")
-            return False, "Arquivo de anexo não encontrado"
+            return None, "Arquivo de anexo não encontrado"
+    return msg, None
 
-    try:
-        with smtplib.SMTP(host, port) as s:
-            s.starttls()
-            if user: s.login(user, pwd)
+def _enviar_email(nid, msg):
+    def envio():
+        with smtp_pool().connection() as s:
             s.send_message(msg)
-        return True, "E-mail enviado com sucesso."
-    except Exception as e:
-        print(f"ERRO ao enviar e-mail: {e}")
-        return False, f"Falha no envio: {e}"
-
-# --- FUNÇÃO DE WHATSAPP (SEM ALTERAÇÃO) ---
-def send_whatsapp(to_number, body):
-    if os.getenv("WHATSAPP_PROVIDER") != "twilio": return
+    ok, erro = _com_retry(envio, nid)
+    if not ok:
+        print(f"ERRO ao enviar e-mail: {erro}")
+        return False, erro
+    return True, "E-mail enviado com sucesso."
+
+def send_email(to_list, subject, body, attachment_path=None, attachment_filename=None, referencia=None):
+    msg, erro = _montar_email(to_list, subject, body, attachment_path, attachment_filename)
+    if msg is None:
+        return False, erro
+    return _enviar_email(_novo_registro("email", msg["To"], subject, referencia), msg)
+
+def dispatch_email(to_list, subject, body, attachment_path=None, attachment_filename=None, referencia=None):
+    """Como send_email, mas em segundo plano. O Future devolve (ok, mensagem)."""
+    msg, erro = _montar_email(to_list, subject, body, attachment_path, attachment_filename)
+    if msg is None:
+        return _pronto((False, erro))
+    return _submit(_enviar_email, _novo_registro("email", msg["To"], subject, referencia), msg)
+
+# -------------------- WHATSAPP --------------------
+def _twilio():
+    if os.getenv("WHATSAPP_PROVIDER") != "twilio": return None
     sid = os.getenv("TWILIO_SID"); token = os.getenv("TWILIO_TOKEN"); from_ = os.getenv("TWILIO_FROM")
-    if not sid or not token or not from_: return
-    url = f"https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
+    if not sid or not token or not from_: return None
+    return sid, token, from_
+
+def _enviar_whatsapp(nid, cfg, to_number, body):
+    sid, token, from_ = cfg
+    url = os.getenv("TWILIO_API_URL", "https://api.twilio.com/2010-04-01") + f"/Accounts/{sid}/Messages.json"
     data = {"To": f"whatsapp:{to_number}", "From": from_, "Body": body}
-    requests.post(url, data=data, auth=(sid, token))
\ No newline at end of file
+    timeout = (5, float(os.getenv("TWILIO_TIMEOUT", "10")))
+    def envio():
+        http_session().post(url, data=data, auth=(sid, token), timeout=timeout).raise_for_status()
+    ok, erro = _com_retry(envio, nid)
+    return (True, "WhatsApp enviado.") if ok else (False, erro)
+
+def send_whatsapp(to_number, body, referencia=None):
+    cfg = _twilio()
+    if not cfg: return False, "WhatsApp não configurado"
+    return _enviar_whatsapp(_novo_registro("whatsapp", to_number, None, referencia), cfg, to_number, body)
+
+def dispatch_whatsapp(to_number, body, referencia=None):
+    cfg = _twilio()
+    if not cfg: return _pronto((False, "WhatsApp não configurado"))
+    return _submit(_enviar_whatsapp, _novo_registro("whatsapp", to_number, None, referencia), cfg, to_number, body)
+
+# -------------------- POOL DE ENVIO --------------------
+def _pool():
+    global _executor, _vagas
+    with _lock:
+        if _executor is None:
+            workers = _env_int("NOTIFY_WORKERS", 4)
+            _executor = ThreadPoolExecutor(workers, thread_name_prefix="notify")
+            # Fila limitada: quem enfileira espera se já houver muito trabalho pendente
+            _vagas = threading.BoundedSemaphore(workers * _env_int("NOTIFY_QUEUE_PER_WORKER", 25))
+        return _executor
+
+def _submit(func, *args):
+    app = current_app._get_current_object()
+    executor = _pool()
+    _vagas.acquire()
+    def run():
+        try:
+            with app.app_context():
+                return func(*args)
+        finally:
+            _vagas.release()
+    return executor.submit(run)
+
+def _pronto(resultado):
+    f = Future()
+    f.set_result(resultado)
+    return f
@@ -0,0 +1,202 @@
+# notify_check.py
+"""
+Conferência do envio de notificações (comando `flask notify-check`).
+
+Sobe, no próprio processo, um servidor SMTP e uma API "Twilio" de mentira
+em 127.0.0.1 e envia por notifications.py, com um banco SQLite temporário
+(o banco da aplicação e os servidores reais não são tocados). Confere:
+
+- o pool SMTP: vários e-mails (em sequência e em paralelo) com no máximo
+  SMTP_POOL_SIZE logins;
+- retry: 451 do SMTP e 429/503 da API são repetidos, com espera crescente
+  (NOTIFY_BACKOFF, 2x a cada tentativa); 550 e 400 falham na primeira;
+- a linha de cada envio em `notification` termina com o status e o número
+  de tentativas certos.
+"""
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from db_bench import criar_app
+
+POOL = 2
+BACKOFF = 0.2
+
+# -------------------- servidor SMTP de mentira --------------------
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def _responder(self, linha):
+        self.wfile.write((linha + "\r\n").encode())
+
+    def _dados(self):
+        linhas = []
+        while True:
+            linha = self.rfile.readline()
+            if not linha or linha in (b".\r\n", b".\n"):
+                return linhas
+            linhas.append(linha.decode(errors="replace"))
+
+    def handle(self):
+        srv = self.server
+        with srv.lock:
+            srv.conexoes += 1
+        self._responder("220 stub")
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            verbo = linha.decode(errors="replace").strip().split(" ", 1)[0].upper()
+            if verbo in ("EHLO", "HELO"):
+                self._responder("250-stub")
+                self._responder("250 AUTH PLAIN LOGIN")
+            elif verbo == "AUTH":
+                with srv.lock:
+                    srv.logins += 1
+                self._responder("235 autenticado")
+            elif verbo == "DATA":
+                self._responder("354 termine com .")
+                assunto = next((l[8:].strip() for l in self._dados() if l.lower().startswith("subject:")), "")
+                with srv.lock:
+                    fila = srv.falhas.get(assunto)
+                    codigo = fila.pop(0) if fila else 250
+                    if codigo == 250:
+                        srv.recebidos.append(assunto)
+                self._responder(f"{codigo} {'ok' if codigo == 250 else 'falha simulada'}")
+            elif verbo == "QUIT":
+                self._responder("221 tchau")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self._responder("250 ok")
+
+class _SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.lock = threading.Lock()
+        self.conexoes = 0
+        self.logins = 0
+        self.recebidos = []
+        self.falhas = {}  # assunto: [códigos a responder no DATA, em ordem]
+
+# -------------------- API Twilio de mentira --------------------
+class _TwilioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como a API real
+
+    def do_POST(self):
+        srv = self.server
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        para = parse_qs(corpo).get("To", [""])[0].removeprefix("whatsapp:")
+        with srv.lock:
+            srv.pedidos[para].append(time.monotonic())
+            fila = srv.respostas.get(para)
+            status = fila.pop(0) if fila else 201
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+class _TwilioStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _TwilioHandler)
+        self.lock = threading.Lock()
+        self.pedidos = defaultdict(list)  # número: [hora de cada POST]
+        self.respostas = {}  # número: [status a responder, em ordem]
+
+# -------------------- conferência --------------------
+def _ambiente(smtp, twilio):
+    return {
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(smtp.server_address[1]), "SMTP_STARTTLS": "0",
+        "SMTP_USER": "stub", "SMTP_PASS": "stub", "SMTP_FROM": "stub@localhost", "SMTP_POOL_SIZE": str(POOL),
+        "NOTIFY_RETRIES": "3", "NOTIFY_BACKOFF": str(BACKOFF),
+        "WHATSAPP_PROVIDER": "twilio", "TWILIO_SID": "AC0", "TWILIO_TOKEN": "stub", "TWILIO_FROM": "whatsapp:+550000",
+        "TWILIO_API_URL": f"http://127.0.0.1:{twilio.server_address[1]}",
+    }
+
+def _registro(referencia):
+    from models import Notification
+    n = Notification.query.filter_by(referencia=referencia).one()
+    return n.status, n.tentativas
+
+def _esperas(horas):
+    return [b - a for a, b in zip(horas, horas[1:])]
+
+def _conferir(smtp, twilio):
+    """[(verificação, ok, detalhe)]."""
+    import notifications
+    r = []
+
+    # Pool: 6 em sequência + 6 em paralelo, no máximo POOL logins
+    oks = [notifications.send_email(["a@x"], f"seq {i}", "corpo", referencia=f"seq{i}")[0] for i in range(6)]
+    futuros = [notifications.dispatch_email(["a@x"], f"par {i}", "corpo", referencia=f"par{i}") for i in range(6)]
+    oks += [f.result()[0] for f in futuros]
+    r.append(("12 e-mails aceitos pelo SMTP", all(oks) and len(smtp.recebidos) == 12, f"{len(smtp.recebidos)} recebido(s)"))
+    r.append((f"login SMTP reaproveitado (até {POOL})", smtp.logins <= POOL, f"{smtp.logins} login(s), {smtp.conexoes} conexão(ões)"))
+    estados = {_registro(f"{p}{i}") for p in ("seq", "par") for i in range(6)}
+    r.append(("linhas dos 12 e-mails: enviado, 1 tentativa", estados == {("enviado", 1)}, str(sorted(estados))))
+
+    # SMTP: 451 repete, 550 não
+    smtp.falhas.update({"temporaria": [451], "permanente": [550]})
+    notifications.send_email(["a@x"], "temporaria", "corpo", referencia="smtp451")
+    notifications.send_email(["a@x"], "permanente", "corpo", referencia="smtp550")
+    r.append(("SMTP 451 repetido e entregue", _registro("smtp451") == ("enviado", 2), str(_registro("smtp451"))))
+    r.append(("SMTP 550 sem nova tentativa", _registro("smtp550") == ("falhou", 1), str(_registro("smtp550"))))
+
+    # API: 429 e 503 repetem com espera crescente, 400 não
+    twilio.respostas.update({"+55429": [429], "+55503": [503, 503], "+55400": [400]})
+    for numero in ("+55429", "+55503", "+55400"):
+        notifications.send_whatsapp(numero, "corpo", referencia=f"wa{numero[3:]}")
+    r.append(("HTTP 429 repetido e entregue", _registro("wa429") == ("enviado", 2), str(_registro("wa429"))))
+    r.append(("HTTP 503 (2x) repetido e entregue", _registro("wa503") == ("enviado", 3), str(_registro("wa503"))))
+    esperas = _esperas(twilio.pedidos["+55503"])
+    r.append((f"backoff {BACKOFF}s, depois {2 * BACKOFF}s",
+              len(esperas) == 2 and esperas[0] >= BACKOFF * 0.9 and esperas[1] >= 2 * BACKOFF * 0.9,
+              ", ".join(f"{e:.2f}s" for e in esperas)))
+    r.append(("HTTP 400 sem nova tentativa", _registro("wa400") == ("falhou", 1) and len(twilio.pedidos["+55400"]) == 1,
+              f"{_registro('wa400')}, {len(twilio.pedidos['+55400'])} pedido(s)"))
+    return r
+
+def rodar():
+    """Sobe os servidores, envia e confere; devolve [(verificação, ok, detalhe)]."""
+    import notifications
+    from models import db
+    smtp, twilio = _SMTPStub(), _TwilioStub()
+    for srv in (smtp, twilio):
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    env = _ambiente(smtp, twilio)
+    antes = {k: os.environ.get(k) for k in env}
+    pasta = tempfile.mkdtemp(prefix="notify-check-")
+    os.environ.update(env)
+    notifications._smtp_pool = None  # pool novo, com o tamanho e o servidor acima
+    try:
+        app = criar_app("otimizado", f"sqlite:///{os.path.join(pasta, 'notify.db')}")
+        with app.app_context():
+            db.create_all()
+            try:
+                return _conferir(smtp, twilio)
+            finally:
+                notifications.smtp_pool().close_all()
+                notifications._smtp_pool = None
+                db.session.remove()
+                db.engine.dispose()
+    finally:
+        for k, v in antes.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        for srv in (smtp, twilio):
+            srv.shutdown()
+            srv.server_close()
+        shutil.rmtree(pasta, ignore_errors=True)
@@ -0,0 +1,179 @@
+# pagination.py
+"""
+Paginação por cursor (keyset) para as telas de listagem.
+
+Em vez de OFFSET, cada página continua a partir dos valores de ordenação do
+último item exibido (ex.: Employee.nome + Employee.id), então o custo de uma
+página não cresce com o tamanho da tabela. O total é uma estimativa: a
+contagem para em LIST_COUNT_CAP linhas.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import date, datetime
+
+from flask import current_app, request, url_for
+from sqlalchemy import and_, or_, false, case, func
+from extensions import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+DEFAULT_COUNT_CAP = 10000
+
+# Chave de ordenação: coluna, decrescente?, aceita NULL? (NULLs sempre por último)
+Key = namedtuple("Key", "column desc nullable")
+Key.__new__.__defaults__ = (False, False)
+
+def _encode_value(v):
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, date):
+        return {"d": v.isoformat()}
+    return v
+
+def _decode_value(v):
+    if isinstance(v, dict):
+        if "dt" in v:
+            return datetime.fromisoformat(v["dt"])
+        if "d" in v:
+            return date.fromisoformat(v["d"])
+    return v
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token):
+    """Valores do cursor ou None se o token for inválido."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        return [_decode_value(v) for v in values] if isinstance(values, list) else None
+    except Exception:
+        return None
+
+def _components(keys, values, reverse):
+    """Expande as chaves em (expressão, desc, valor), com a flag de NULL quando precisa."""
+    comps = []
+    for key, value in zip(keys, values):
+        if key.nullable:
+            flag = case((key.column.is_(None), 1), else_=0)
+            comps.append((flag, reverse, 1 if value is None else 0))
+        comps.append((key.column, key.desc != reverse, value))
+    return comps
+
+def _keyset_filter(comps):
+    """(c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... respeitando a direção."""
+    clauses = []
+    iguais = []
+    for expr, desc, value in comps:
+        if value is None:
+            maior = false()
+            igual = expr.is_(None)
+        else:
+            maior = expr < value if desc else expr > value
+            igual = expr == value
+        clauses.append(and_(*iguais, maior))
+        iguais.append(igual)
+    return or_(*clauses)
+
+def _ordering(comps):
+    return [expr.desc() if desc else expr.asc() for expr, desc, _ in comps]
+
+def page_size(default=None):
+    """Tamanho da página pedido em ?per_page=, limitado a LIST_PAGE_SIZE_MAX."""
+    default = default or current_app.config.get("LIST_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+    maximo = current_app.config.get("LIST_PAGE_SIZE_MAX", MAX_PAGE_SIZE)
+    per_page = request.args.get("per_page", default, type=int) or default
+    return max(1, min(per_page, maximo))
+
+def count_estimate(query, cap=None):
+    """(total, capped): conta no máximo `cap` linhas da consulta."""
+    cap = cap or current_app.config.get("LIST_COUNT_CAP", DEFAULT_COUNT_CAP)
+    sub = query.order_by(None).limit(cap).subquery()
+    total = db.session.query(func.count()).select_from(sub).scalar() or 0
+    return total, total >= cap
+
+class Page:
+    def __init__(self, items, per_page, total, total_capped, next_cursor, prev_cursor, prefix):
+        self.items = items
+        self.per_page = per_page
+        self.total = total
+        self.total_capped = total_capped
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.prefix = prefix
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def _url(self, **cursor):
+        args = request.args.to_dict()
+        args.pop(f"{self.prefix}after", None)
+        args.pop(f"{self.prefix}before", None)
+        args.update({f"{self.prefix}{k}": v for k, v in cursor.items()})
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def first_url(self):
+        return self._url()
+
+    @property
+    def next_url(self):
+        return self._url(after=self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self._url(before=self.prev_cursor) if self.has_prev else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+def paginate(query, keys, per_page=None, prefix="", with_total=True):
+    """
+    Pagina `query` pelas chaves `keys` (a última deve ser única, ex.: id).
+    Lê ?after=/?before= (com `prefix`, para mais de uma lista na mesma tela).
+    """
+    keys = [k if isinstance(k, Key) else Key(k) for k in keys]
+    per_page = per_page or page_size()
+    after = decode_cursor(request.args.get(f"{prefix}after"))
+    before = None if after else decode_cursor(request.args.get(f"{prefix}before"))
+    cursor = after or before
+    reverse = before is not None
+
+    total, capped = count_estimate(query) if with_total else (None, False)
+
+    q = query.order_by(None)
+    if cursor and len(cursor) == len(keys):
+        q = q.filter(_keyset_filter(_components(keys, cursor, reverse)))
+    else:
+        cursor, reverse = None, False
+    comps = _components(keys, [None] * len(keys), reverse)
+    rows = q.order_by(*_ordering(comps)).limit(per_page + 1).all()
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+
+    def _cursor_of(item):
+        return encode_cursor([getattr(item, k.column.key) for k in keys])
+
+    has_next = has_more if not reverse else True
+    has_prev = (cursor is not None) if not reverse else has_more
+    return Page(
+        rows, per_page, total, capped,
+        _cursor_of(rows[-1]) if rows and has_next else None,
+        _cursor_of(rows[0]) if rows and has_prev else None,
+        prefix,
+    )
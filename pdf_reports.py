@@ -5,11 +5,13 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Tabl
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.lib import colors
-from reportlab.lib.utils import ImageReader
 from datetime import date as _date, date
+import io
 import os
+import threading
 from decimal import Decimal
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from PIL import Image as PILImage
 
 styles = getSampleStyleSheet()
 H1 = ParagraphStyle('H1', parent=styles['Heading1'], fontSize=16, spaceAfter=8, alignment=1) # Centralizado
@@ -18,6 +20,8 @@ N = styles['Normal']
 BodyRight = ParagraphStyle('BodyRight', parent=styles['Normal'], alignment=2) # 2 = RIGHT
 Centered = ParagraphStyle('Centered', parent=styles['Normal'], alignment=1) # 1 = CENTER
 
+TABLE_CHUNK_ROWS = 40  # ~ uma página A4 de linhas simples
+
 def _s(v):
     return "" if v is None else str(v)
 
@@ -30,6 +34,82 @@ def format_date(d):
         return d.strftime('%d/%m/%Y')
     return ""
 
+# -------------------- CACHE DE IMAGENS (logo / fotos) --------------------
+ASSET_CACHE_SIZE = int(os.getenv("PDF_ASSET_CACHE_SIZE", "64"))
+LOGO_MAX_PX = 800    # ~6 cm a 300 dpi
+PHOTO_MAX_PX = 600   # foto 3x4 a 300 dpi com folga
+
+class _AssetCache:
+    """
+    LRU de imagens já decodificadas e reduzidas, por (caminho, mtime, tamanho,
+    max_px). Fotos saem como JPEG, que o ReportLab embute sem decodificar;
+    imagens com transparência (logo) ficam PNG.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load(path, max_px):
+        with PILImage.open(path) as img:
+            img.thumbnail((max_px, max_px))
+            out = io.BytesIO()
+            if img.mode in ("RGBA", "LA", "P"):
+                img.save(out, format="PNG", optimize=True)
+            else:
+                img.convert("RGB").save(out, format="JPEG", quality=90)
+            return out.getvalue(), img.size
+
+    def get(self, path, max_px):
+        """(bytes, (largura, altura)) ou None se o arquivo não existir / não for imagem."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (path, st.st_mtime_ns, st.st_size, max_px)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        try:
+            entry = self._load(path, max_px)
+        except Exception:
+            return None
+        with self._lock:
+            self._items[key] = entry
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return entry
+
+    def invalidate(self, path=None):
+        with self._lock:
+            if path is None:
+                self._items.clear()
+            else:
+                for key in [k for k in self._items if k[0] == path]:
+                    del self._items[key]
+
+_assets = _AssetCache(ASSET_CACHE_SIZE)
+
+def invalidate_assets(path=None):
+    """Descarta do cache a imagem `path` (ou todas). Chamado ao trocar o logo."""
+    _assets.invalidate(os.path.abspath(path) if path else None)
+
+def cached_image(path, width, height=None, max_px=LOGO_MAX_PX, **kwargs):
+    """Image (flowable) a partir do cache; sem `height`, mantém a proporção. None se não houver arquivo."""
+    entry = _assets.get(os.path.abspath(path), max_px)
+    if entry is None:
+        return None
+    data, (w, h) = entry
+    if height is None:
+        height = width * h / float(w)
+    return Image(io.BytesIO(data), width=width, height=height, **kwargs)
+
+def logo_path(app):
+    return os.path.join(app.root_path, "static", "img", "logo.png")
+
 def _abs_upload_path(app, rel):
     """Resolve caminho absoluto de algo salvo em uploads/..."""
     if not rel:
@@ -52,8 +132,8 @@ def employee_pdf(buffer, app, e):
     if getattr(e, 'foto_path', None):
         try:
             photo_abs = _abs_upload_path(app, e.foto_path)
-            if photo_abs and os.path.exists(photo_abs):
-                photo_flow = Image(photo_abs, width=3.0*cm, height=4.0*cm)
+            if photo_abs:
+                photo_flow = cached_image(photo_abs, width=3.0*cm, height=4.0*cm, max_px=PHOTO_MAX_PX)
         except Exception:
             photo_flow = None
 
@@ -162,14 +242,8 @@ def epi_saida_pdf(buffer, app, saida):
     )
     elems = []
 
-    logo_path = os.path.join(app.root_path, "static", "img", "logo.png")
-    if os.path.exists(logo_path):
-        img_reader = ImageReader(logo_path)
-        img_width, img_height = img_reader.getSize()
-        aspect = img_height / float(img_width)
-        display_width = 6*cm 
-        display_height = display_width * aspect
-        logo = Image(logo_path, width=display_width, height=display_height, hAlign='CENTER')
+    logo = cached_image(logo_path(app), width=6*cm, hAlign='CENTER')
+    if logo:
         elems.append(logo)
         elems.append(Spacer(1, 0.8*cm))
 
@@ -231,29 +305,91 @@ def epi_saida_pdf(buffer, app, saida):
 
 
 # -------------------- RELATÓRIO DIÁRIO DE CAIXA (A4) --------------------
-def pdv_summary_pdf(buffer, app, movements, start_date, end_date):
+def chunked_tables(header, rows, col_widths, style, chunk=None):
+    """
+    Quebra uma tabela longa em várias Tables de `chunk` linhas (com o
+    cabeçalho repetido). O ReportLab divide tabelas enormes de forma
+    quadrática; blocos do tamanho de uma página mantêm o custo linear.
+    `rows` pode ser um gerador.
+    """
+    chunk = chunk or TABLE_CHUNK_ROWS
+    bloco = []
+    for row in rows:
+        bloco.append(row)
+        if len(bloco) >= chunk:
+            yield _table_chunk(header, bloco, col_widths, style)
+            bloco = []
+    if bloco:
+        yield _table_chunk(header, bloco, col_widths, style)
+
+def _table_chunk(header, rows, col_widths, style):
+    table = Table([header] + rows, colWidths=col_widths, repeatRows=1)
+    table.setStyle(style)
+    return table
+
+class FlowablesSobDemanda(list):
+    """
+    Lista de flowables que o doc.build consome enquanto pagina: os itens saem
+    de `fonte` (um gerador) e só `adiante` ficam montados de cada vez, em vez
+    do relatório inteiro na memória antes do build. O build só usa len(),
+    índices e del/insert na frente da lista.
+    """
+    def __init__(self, fonte, adiante=4):
+        super().__init__()
+        self._fonte = iter(fonte)
+        self._adiante = adiante
+
+    def _encher(self):
+        while self._fonte is not None and list.__len__(self) < self._adiante:
+            try:
+                self.append(next(self._fonte))
+            except StopIteration:
+                self._fonte = None
+
+    def __len__(self):
+        self._encher()
+        return list.__len__(self)
+
+    def __getitem__(self, i):
+        self._encher()
+        return list.__getitem__(self, i)
+
+def pdv_summary_pdf(buffer, app, movements, start_date, end_date, totals=None):
+    """
+    `movements` pode ser um iterável lido em blocos do banco; `totals`
+    ({pagamento ou tipo de saída: valor}) vem do GROUP BY em
+    blueprints/pdv/reports.py. Sem `totals`, soma os movimentos aqui.
+    As tabelas de detalhe são montadas durante o build (FlowablesSobDemanda):
+    a memória não cresce com o número de movimentos.
+    """
     doc=SimpleDocTemplate(buffer,pagesize=A4,leftMargin=1.5*cm,rightMargin=1.5*cm,topMargin=1.5*cm,bottomMargin=1.5*cm)
-    elems=[]
     if start_date==end_date:periodo_str=f"Data: {start_date.strftime('%d/%m/%Y')}"
     else:periodo_str=f"Período: {start_date.strftime('%d/%m/%Y')} a {end_date.strftime('%d/%m/%Y')}"
-    elems.append(Paragraph(f"Relatório de Movimentação de Caixa",H1))
-    elems.append(Paragraph(periodo_str,H2))
-    elems.append(Spacer(1,0.8*cm))
-    table_data=[[P('<b>Hora</b>'),P('<b>Tipo</b>'),P('<b>Descrição/Cliente</b>'),P('<b>Pagamento</b>'),P('<b>Valor (R$)</b>')]]
-    totals=defaultdict(Decimal)
-    for mov in movements:
-        valor=mov.valor or Decimal(0)
-        valor_str=f"{valor:.2f}".replace('.',',')
-        if mov.tipo in['VENDA','PAGAMENTO']:totals[mov.pagamento]+=valor
-        elif mov.tipo in['SANGRIA','RETIRADA']:
-            totals[mov.tipo]+=valor
-            valor_str=f"-{valor_str}"
-        descricao=mov.customer.nome_razao_social if mov.customer else(mov.descricao or'-')
-        table_data.append([mov.created_at.strftime('%H:%M:%S'),mov.tipo,descricao,mov.pagamento,Paragraph(valor_str,BodyRight)])
-    table=Table(table_data,colWidths=[2*cm,2.5*cm,8*cm,2.5*cm,3*cm])
-    table.setStyle(TableStyle([('GRID',(0,0),(-1,-1),0.5,colors.grey),('BACKGROUND',(0,0),(-1,0),colors.lightgrey),('FONTNAME',(0,0),(-1,0),'Helvetica-Bold'),('VALIGN',(0,0),(-1,-1),'MIDDLE'),('ALIGN',(0,0),(-1,-1),'LEFT'),('ALIGN',(4,1),(4,-1),'RIGHT'),]))
-    elems.append(table)
-    elems.append(Spacer(1,1*cm))
+    header=[P('<b>Hora</b>'),P('<b>Tipo</b>'),P('<b>Descrição/Cliente</b>'),P('<b>Pagamento</b>'),P('<b>Valor (R$)</b>')]
+    somar=totals is None
+    totals=defaultdict(Decimal,totals or {})
+    def rows():
+        for mov in movements:
+            valor=mov.valor or Decimal(0)
+            valor_str=f"{valor:.2f}".replace('.',',')
+            if mov.tipo in['VENDA','PAGAMENTO']:
+                if somar:totals[mov.pagamento]+=valor
+            elif mov.tipo in['SANGRIA','RETIRADA']:
+                if somar:totals[mov.tipo]+=valor
+                valor_str=f"-{valor_str}"
+            descricao=mov.customer.nome_razao_social if mov.customer else(mov.descricao or'-')
+            yield [mov.created_at.strftime('%H:%M:%S'),mov.tipo,descricao,mov.pagamento,Paragraph(valor_str,BodyRight)]
+    style=TableStyle([('GRID',(0,0),(-1,-1),0.5,colors.grey),('BACKGROUND',(0,0),(-1,0),colors.lightgrey),('FONTNAME',(0,0),(-1,0),'Helvetica-Bold'),('VALIGN',(0,0),(-1,-1),'MIDDLE'),('ALIGN',(0,0),(-1,-1),'LEFT'),('ALIGN',(4,1),(4,-1),'RIGHT'),])
+    def elems():
+        yield Paragraph(f"Relatório de Movimentação de Caixa",H1)
+        yield Paragraph(periodo_str,H2)
+        yield Spacer(1,0.8*cm)
+        yield from chunked_tables(header,rows(),[2*cm,2.5*cm,8*cm,2.5*cm,3*cm],style)
+        yield Spacer(1,1*cm)
+        yield _pdv_summary_table(totals)  # depois das linhas: sem `totals`, a soma termina nelas
+    doc.build(FlowablesSobDemanda(elems()))
+
+def _pdv_summary_table(totals):
     summary_data=[[P('<b>Resumo do Período</b>'),'']]
     total_entradas=Decimal(0)
     for metodo in['DINHEIRO','PIX','CARTAO','BAIXA']:
@@ -273,11 +409,11 @@ def pdv_summary_pdf(buffer, app, movements, start_date, end_date):
     summary_data.append([P('<b>SALDO FINAL:</b>'),Paragraph(f"<b>R$ {saldo_final:.2f}</b>".replace('.',','),BodyRight)])
     summary_table=Table(summary_data,colWidths=[6*cm,4*cm])
     summary_table.setStyle(TableStyle([('ALIGN',(0,0),(-1,-1),'RIGHT'),('SPAN',(0,0),(1,0)),('ALIGN',(0,0),(0,0),'CENTER'),('FONTNAME',(0,0),(-1,-1),'Helvetica'),('FONTNAME',(0,2),(1,2),'Helvetica-Bold'),('FONTNAME',(0,5),(1,5),'Helvetica-Bold'),('FONTNAME',(0,7),(1,7),'Helvetica-Bold'),('BOX',(0,0),(-1,-1),1,colors.black),('INNERGRID',(0,0),(-1,-1),0.5,colors.grey),]))
-    elems.append(summary_table)
-    doc.build(elems)
+    return summary_table
 
 # -------------------- RELATÓRIO DE EPI (A4) --------------------
-def epi_summary_pdf(buffer, app, movements, start_date, end_date):
+def epi_summary_pdf(buffer, app, movements, start_date, end_date, resumo=None):
+    """`resumo`: linhas (EPI, inicial, entradas, saídas, final) do consolidado (epi/ledger.resumo_periodo)."""
     doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=1.5*cm, rightMargin=1.5*cm, topMargin=1.5*cm, bottomMargin=1.5*cm)
     elems = []
     
@@ -290,6 +426,20 @@ def epi_summary_pdf(buffer, app, movements, start_date, end_date):
     elems.append(Paragraph(periodo_str, H2))
     elems.append(Spacer(1, 0.8*cm))
 
+    linhas = [r for r in (resumo or []) if any(r[1:])]
+    if linhas:
+        resumo_data = [[P('<b>EPI</b>'), P('<b>Estoque inicial</b>'), P('<b>Entradas</b>'), P('<b>Saídas</b>'), P('<b>Estoque final</b>')]]
+        resumo_data += [[P(nome), str(inicial), str(entradas), str(saidas), str(final)] for nome, inicial, entradas, saidas, final in linhas]
+        resumo_table = Table(resumo_data, colWidths=[7*cm, 2.75*cm, 2.5*cm, 2.5*cm, 2.75*cm])
+        resumo_table.setStyle(TableStyle([
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('ALIGN', (1,1), (-1,-1), 'CENTER'),
+        ]))
+        elems.append(resumo_table)
+        elems.append(Spacer(1, 0.8*cm))
+
     table_data = [[P('<b>Data/Hora</b>'), P('<b>EPI</b>'), P('<b>Tipo</b>'), P('<b>Qtd</b>'), P('<b>Recebido por</b>')]]
     
     for mov in movements:
@@ -298,7 +448,8 @@ def epi_summary_pdf(buffer, app, movements, start_date, end_date):
             P(mov.epi.nome),
             P(mov.tipo),
             P(str(mov.quantidade)),
-            P(mov.retirado_por)
+            # As saídas guardam quem retirou na EPISaida
+            P(mov.retirado_por or (mov.saida.retirado_por if mov.saida else ""))
         ])
 
     table = Table(table_data, colWidths=[3.5*cm, 6.5*cm, 2*cm, 1.5*cm, 4.5*cm])
@@ -319,9 +470,8 @@ def proposal_pdf(buffer, app, proposal):
     elems = []
     
     company = proposal.issuing_company
-    logo_path = os.path.join(app.root_path, "static", "img", "logo.png")
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=5*cm, height=2.5*cm, hAlign='LEFT')
+    logo = cached_image(logo_path(app), width=5*cm, height=2.5*cm, hAlign='LEFT')
+    if logo:
         elems.append(logo)
         elems.append(Spacer(1, 0.5*cm))
 
@@ -0,0 +1,64 @@
+# pdf_split.py
+"""
+Divide um PDF em um arquivo por página, em paralelo.
+
+As páginas são repartidas em faixas contíguas entre processos (cada um abre
+o próprio PdfReader sobre o arquivo em disco) e cada página volta com o
+texto extraído, para quem chamou decidir o nome do arquivo. Este módulo só
+depende do PyPDF2, para que os processos filhos subam rápido. Com spawn,
+cada filho reexecuta também o script principal (como __mp_main__): por
+isso o wsgi.py só importa o app em main() ou quando o gunicorn pede
+`wsgi:app`, e não no nível do módulo.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PyPDF2 import PdfReader, PdfWriter
+
+PAGINAS_SEM_POOL = 200  # abaixo disso, subir processos (~1s com spawn) não compensa
+FAIXAS_POR_WORKER = 4
+
+def _dividir_faixa(caminho, inicio, fim, destino, prefixo, limite_texto):
+    """Grava as páginas [inicio, fim) como prefixo_pagina_N.pdf; devolve [(n, arquivo, texto)]."""
+    reader = PdfReader(caminho)
+    saida = []
+    for i in range(inicio, fim):
+        page = reader.pages[i]
+        writer = PdfWriter()
+        writer.add_page(page)
+        nome = f"{prefixo}_pagina_{i + 1}.pdf"
+        with open(os.path.join(destino, nome), "wb") as f:
+            writer.write(f)
+        try:
+            texto = (page.extract_text() or "")[:limite_texto]
+        except Exception:
+            texto = ""
+        saida.append((i + 1, nome, texto))
+    return saida
+
+def _faixas(total, partes):
+    passo = max(1, -(-total // partes))
+    return [(i, min(i + passo, total)) for i in range(0, total, passo)]
+
+def dividir(caminho, destino, prefixo="holerite", workers=None, limite_texto=4000):
+    """
+    Divide `caminho` em `destino`. Retorna (paginas, segundos), onde
+    paginas = [(numero, arquivo, texto)] em ordem.
+    """
+    inicio = time.perf_counter()
+    total = len(PdfReader(caminho).pages)
+    workers = workers or min(os.cpu_count() or 1, 8)
+
+    if total <= PAGINAS_SEM_POOL or workers <= 1:
+        paginas = _dividir_faixa(caminho, 0, total, destino, prefixo, limite_texto)
+    else:
+        paginas = []
+        # spawn: o processo web tem threads (agendador, pool de envio), fork não é seguro
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+            futuros = [executor.submit(_dividir_faixa, caminho, a, b, destino, prefixo, limite_texto)
+                       for a, b in _faixas(total, workers * FAIXAS_POR_WORKER)]
+            for futuro in futuros:
+                paginas.extend(futuro.result())
+    return paginas, time.perf_counter() - inicio
@@ -0,0 +1,70 @@
+# query_budget.py
+"""
+Orçamento de consultas por página (comando `flask query-budget`).
+
+Num banco SQLite temporário (o banco da aplicação não é tocado), grava
+EPIs, entradas e retiradas de vários itens e abre as telas com o cliente de
+teste do Flask, logado, contando o SQL enviado ao banco
+(database.contar_consultas). Cada tela tem um limite fixo: se alguém tirar
+o joinedload/selectinload, ou um template voltar a carregar relação linha
+a linha, o número de consultas passa a crescer com as linhas e estoura o
+limite. O comando sai com erro (código 1) nesse caso.
+"""
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from database import contar_consultas
+from db_bench import criar_app
+
+# (nome, url, máximo de consultas); as listas rodam com 50 linhas por página
+PAGINAS = [
+    ("histórico de EPI", "/epi/movimentacoes?per_page=50", 8),
+    ("histórico de EPI (tudo)", "/epi/movimentacoes?per_page=50&periodo=todos", 8),
+    ("relatório de EPI (PDF)", "/epi/movimentacoes/relatorio?data_inicio={inicio}&data_fim={fim}", 8),
+]
+
+def _popular(retiradas):
+    """Admin, 5 EPIs, funcionários, `retiradas` retiradas de 3 itens e algumas entradas; devolve o id do admin."""
+    from models import db, User, Employee, EPI
+    from blueprints.epi import stock
+    admin = User(username="admin", password="-", role="admin")
+    db.session.add(admin)
+    db.session.add_all(EPI(nome=f"EPI {i}", estoque=10 * retiradas) for i in range(1, 6))
+    db.session.add_all(Employee(nome=f"Funcionário {i}") for i in range(1, 6))
+    db.session.commit()
+    for i in range(retiradas):
+        itens = [(1 + (i + k) % 5, 1 + k) for k in range(3)]
+        stock.retirar(itens, 1 + i % 5 if i % 4 else None, f"Retirada {i}")
+        if i % 2:
+            stock.dar_entrada(1 + i % 5, 5)
+    return admin.id
+
+def rodar(retiradas=60):
+    """Abre cada página de PAGINAS; devolve [(nome, status, consultas, limite)]."""
+    from models import db
+    pasta = tempfile.mkdtemp(prefix="query-budget-")
+    try:
+        app = criar_app("otimizado", f"sqlite:///{os.path.join(pasta, 'budget.db')}")
+        app.config.update(WTF_CSRF_ENABLED=False, UPLOAD_FOLDER=os.path.join(pasta, "uploads"))
+        with app.app_context():
+            db.create_all()
+            user_id = _popular(retiradas)
+            engine = db.engine
+        hoje = date.today()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess["_user_id"] = str(user_id)
+            sess["_fresh"] = True
+        resultado = []
+        for nome, url, limite in PAGINAS:
+            url = url.format(inicio=hoje.replace(day=1).isoformat(), fim=hoje.isoformat())
+            with contar_consultas(engine) as sql:
+                resp = client.get(url)
+            resultado.append((nome, resp.status_code, len(sql), limite))
+        with app.app_context():
+            db.engine.dispose()
+        return resultado
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
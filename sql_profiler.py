@@ -0,0 +1,147 @@
+# sql_profiler.py
+"""
+Perfil de SQL por requisição (opcional: SQL_PROFILER=1).
+
+Com o perfil ligado, os eventos before/after_cursor_execute do engine
+contam, em cada requisição, as consultas, o tempo gasto no banco e quantas
+vezes o mesmo SQL se repetiu (a "impressão" do SQL, com literais e listas
+IN trocados por ?). Um SQL repetido muitas vezes na mesma página é o sinal
+de N+1: um template acessando relação linha a linha (d.company, mov.epi...).
+
+- Toda resposta leva X-DB-Queries e Server-Timing (tempo no banco e
+  total, visível na aba Rede do navegador).
+- /admin/perf mostra, por rota, as médias e máximos desde a subida do
+  processo, e as últimas requisições que passaram dos limites.
+- Passar dos limites também vai para o log (logger "sql_profiler"):
+  SQL_PROFILER_MAX_QUERIES consultas (30), SQL_PROFILER_SLOW_MS no total
+  (500) ou o mesmo SQL SQL_PROFILER_REPEAT vezes (5).
+
+Os números ficam na memória de cada processo: com vários workers
+(gunicorn), cada um mostra só as requisições que atendeu.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+from extensions import db
+
+log = logging.getLogger(__name__)
+
+_ESPACOS = re.compile(r"\s+")
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+_lock = threading.Lock()
+_rotas = {}
+_sinalizadas = deque(maxlen=100)
+_desde = None
+
+def impressao(sql):
+    """SQL sem espaços extras, literais e listas de parâmetros: iguais para a mesma consulta."""
+    sql = _LITERAIS.sub("?", _ESPACOS.sub(" ", sql).strip())
+    return _LISTAS.sub("(...)", sql)
+
+def ativo(app):
+    return app.config.get("SQL_PROFILER", False)
+
+def init_app(app):
+    global _desde
+    app.config.setdefault("SQL_PROFILER", os.environ.get("SQL_PROFILER", "0") == "1")
+    app.config.setdefault("SQL_PROFILER_MAX_QUERIES", int(os.environ.get("SQL_PROFILER_MAX_QUERIES", 30)))
+    app.config.setdefault("SQL_PROFILER_SLOW_MS", float(os.environ.get("SQL_PROFILER_SLOW_MS", 500)))
+    app.config.setdefault("SQL_PROFILER_REPEAT", int(os.environ.get("SQL_PROFILER_REPEAT", 5)))
+    if not ativo(app):
+        return
+    _desde = _desde or datetime.now()
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", _antes)
+        event.listen(db.engine, "after_cursor_execute", _depois)
+    app.before_request(_inicio)
+    app.after_request(_fim)
+
+# -------------------- eventos do engine --------------------
+def _antes(_conn, _cursor, _statement, _params, context, _executemany):
+    if context is not None:
+        context._sql_profiler_inicio = time.perf_counter()
+
+def _depois(_conn, _cursor, statement, _params, context, _executemany):
+    perfil = g.get("sql_perfil") if has_request_context() else None
+    inicio = getattr(context, "_sql_profiler_inicio", None)
+    if perfil is None or inicio is None:
+        return  # tarefa em segundo plano, comando `flask` ou fora do perfil
+    perfil["consultas"] += 1
+    perfil["ms_db"] += (time.perf_counter() - inicio) * 1000
+    perfil["sql"][impressao(statement)] += 1
+
+# -------------------- requisição --------------------
+def _inicio():
+    g.sql_perfil = {"inicio": time.perf_counter(), "consultas": 0, "ms_db": 0.0, "sql": Counter()}
+
+def _fim(response):
+    perfil = g.pop("sql_perfil", None)
+    if perfil is None:
+        return response
+    ms_total = (time.perf_counter() - perfil["inicio"]) * 1000
+    response.headers["X-DB-Queries"] = str(perfil["consultas"])
+    response.headers["Server-Timing"] = (f'db;dur={perfil["ms_db"]:.1f};desc="{perfil["consultas"]} consultas", '
+                                         f'app;dur={ms_total:.1f}')
+    if request.endpoint and request.endpoint != "static":
+        _registrar(current_app.config, perfil, ms_total, response.status_code)
+    return response
+
+def _registrar(config, perfil, ms_total, status):
+    repetidas = [(sql, n) for sql, n in perfil["sql"].most_common(3) if n >= config["SQL_PROFILER_REPEAT"]]
+    motivos = []
+    if perfil["consultas"] > config["SQL_PROFILER_MAX_QUERIES"]:
+        motivos.append(f"{perfil['consultas']} consultas")
+    if ms_total > config["SQL_PROFILER_SLOW_MS"]:
+        motivos.append(f"{ms_total:.0f} ms")
+    if repetidas:
+        motivos.append(f"mesmo SQL {repetidas[0][1]}x")
+
+    with _lock:
+        r = _rotas.setdefault(request.endpoint, {"requisicoes": 0, "consultas": 0, "max_consultas": 0,
+                                                 "ms_db": 0.0, "ms_total": 0.0, "max_ms": 0.0, "sinalizadas": 0})
+        r["requisicoes"] += 1
+        r["consultas"] += perfil["consultas"]
+        r["max_consultas"] = max(r["max_consultas"], perfil["consultas"])
+        r["ms_db"] += perfil["ms_db"]
+        r["ms_total"] += ms_total
+        r["max_ms"] = max(r["max_ms"], ms_total)
+        if motivos:
+            r["sinalizadas"] += 1
+            _sinalizadas.appendleft({
+                "quando": datetime.now(), "metodo": request.method, "url": request.full_path.rstrip("?"),
+                "rota": request.endpoint, "status": status, "consultas": perfil["consultas"],
+                "ms_db": perfil["ms_db"], "ms_total": ms_total, "motivos": motivos, "repetidas": repetidas,
+            })
+    if motivos:
+        log.warning("%s %s (%s): %s; %d consultas, %.0f ms no banco, %.0f ms no total%s",
+                    request.method, request.full_path.rstrip("?"), request.endpoint, ", ".join(motivos),
+                    perfil["consultas"], perfil["ms_db"], ms_total,
+                    f"; repetido: {repetidas[0][0][:200]}" if repetidas else "")
+
+# -------------------- consulta (/admin/perf) --------------------
+def resumo():
+    """(desde, rotas, sinalizadas): rotas = [(endpoint, médias e máximos)] do maior tempo no banco para o menor."""
+    with _lock:
+        rotas = [(nome, dict(r, media_consultas=r["consultas"] / r["requisicoes"],
+                             media_ms_db=r["ms_db"] / r["requisicoes"], media_ms=r["ms_total"] / r["requisicoes"]))
+                 for nome, r in _rotas.items()]
+        sinalizadas = list(_sinalizadas)
+    rotas.sort(key=lambda i: i[1]["ms_db"], reverse=True)
+    return _desde, rotas, sinalizadas
+
+def limpar():
+    global _desde
+    with _lock:
+        _rotas.clear()
+        _sinalizadas.clear()
+        _desde = datetime.now()
@@ -32,20 +32,23 @@ if exist "%VENV_PY%" (
 
 set FLASK_APP=%FLASK_APP%
 echo [i] Usando Python: %PYTHON%
-echo [i] Iniciando Flask em http://0.0.0.0:%PORT%  (acesse via http://SEU_IP:%PORT% na LAN)
+echo [i] Iniciando servidor (waitress) em http://0.0.0.0:%PORT%  (acesse via http://SEU_IP:%PORT% na LAN)
 
 call "%PYTHON%" -V
 call "%PYTHON%" -m flask --version
 
 REM === Executa e mantem janela aberta para ver erros ===
-call "%PYTHON%" -m flask run --host=%HOST% --port=%PORT%
+REM Servidor de producao (wsgi.py); "flask run" e so para desenvolvimento
+set HOST=%HOST%
+set PORT=%PORT%
+call "%PYTHON%" wsgi.py
 set ERR=%ERRORLEVEL%
 
 echo.
 if %ERR% NEQ 0 (
-  echo [x] Flask encerrou com erro (codigo %ERR%). Veja as mensagens acima.
+  echo [x] Servidor encerrou com erro (codigo %ERR%). Veja as mensagens acima.
 ) else (
-  echo [i] Flask finalizado.
+  echo [i] Servidor finalizado.
 )
 echo.
 pause
@@ -0,0 +1,50 @@
+# startup_profile.py
+"""
+Tempo de subida do app (comando `flask startup-profile`).
+
+Roda `python -X importtime` em processos novos (o processo do comando já tem
+tudo importado) importando app.py como o servidor (wsgi.py) faz, ou seja,
+create_app() sem o Flask-Migrate dos comandos `flask`, e devolve o
+tempo total, os pacotes que mais pesaram e quais bibliotecas de PESADAS
+subiram junto. Essas devem ser importadas só no primeiro uso (dentro da
+rota/função que gera o PDF, lê o PDF, chama a API etc.); se alguma aparecer,
+algum import no topo de módulo voltou.
+"""
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+PESADAS = ("reportlab", "PyPDF2", "PIL.Image", "requests", "openpyxl", "alembic")
+
+_SCRIPT = f"""
+import sys, time
+inicio = time.perf_counter()
+import app
+print("@total", time.perf_counter() - inicio)
+print("@carregadas", *[m for m in {PESADAS!r} if m in sys.modules])
+"""
+
+def _rodar():
+    env = dict(os.environ, JOBS_ENABLED="0")  # o agendador não entra na conta
+    p = subprocess.run([sys.executable, "-X", "importtime", "-c", _SCRIPT], env=env,
+                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                       capture_output=True, text=True, check=True)
+    total, carregadas = 0.0, []
+    for linha in p.stdout.splitlines():
+        if linha.startswith("@total"):
+            total = float(linha.split()[1])
+        elif linha.startswith("@carregadas"):
+            carregadas = linha.split()[1:]
+    por_pacote = defaultdict(float)
+    for linha in p.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        proprio, _, nome = linha[len("import time:"):].split("|")
+        if proprio.strip().isdigit():
+            por_pacote[nome.strip().split(".")[0]] += int(proprio) / 1e6
+    return total, dict(por_pacote), carregadas
+
+def medir(rodadas=3):
+    """A melhor de `rodadas` subidas: (segundos, {pacote: segundos de import}, [PESADAS carregadas])."""
+    return min((_rodar() for _ in range(max(1, rodadas))), key=lambda r: r[0])
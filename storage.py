@@ -0,0 +1,290 @@
+# storage.py
+"""
+Armazenamento dos uploads por conteúdo (SHA-256).
+
+`guardar` copia o stream em blocos para um temporário calculando o hash no
+caminho (o arquivo nunca é lido inteiro para a memória) e o guarda em
+uploads/blobs/ab/<sha256>.<ext>. Um conteúdo que já existe não é gravado de
+novo: o mesmo 3x4 ou a mesma CNH enviada várias vezes ocupa um só arquivo.
+
+A tabela upload_blob conta quantas linhas apontam para cada blob
+(Document, EmployeeDocument, VehicleDocument, Employee.foto_path e
+EPISaida.receipt_pdf_path); a contagem acompanha cada flush da sessão.
+Blobs sem referência há mais de UPLOADS_GC_HORAS são apagados por
+`coletar` (flask uploads-gc e, toda madrugada, o agendador), junto com
+as miniaturas deles.
+`flask uploads-dedup` migra os arquivos antigos (uploads/fotos,
+uploads/func_docs, ...) para cá.
+"""
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+
+from flask import current_app
+from sqlalchemy import event, inspect, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from models import db, Document, EmployeeDocument, VehicleDocument, Employee, EPISaida, UploadBlob, now_sao_paulo
+
+BLOBS_DIR = "blobs"
+CHUNK = 1024 * 1024
+
+# Colunas com caminho de upload que contam como referência a um blob
+REFERENCIAS = (
+    (Document, "arquivo_path"),
+    (EmployeeDocument, "arquivo_path"),
+    (VehicleDocument, "arquivo_path"),
+    (Employee, "foto_path"),
+    (EPISaida, "receipt_pdf_path"),
+)
+_COLUNA = dict(REFERENCIAS)
+
+log = logging.getLogger(__name__)
+
+def _agora():
+    return now_sao_paulo().replace(tzinfo=None)
+
+def upload_root():
+    return os.path.join(current_app.root_path, current_app.config.get("UPLOAD_FOLDER", "uploads"))
+
+def normalizar(path):
+    """Caminho como gravado no banco -> relativo a uploads/ ('func_docs/x.pdf')."""
+    rel = str(path or "").replace("\\", "/").lstrip("/")
+    return rel[len("uploads/"):] if rel.startswith("uploads/") else rel
+
+def is_blob(path):
+    return normalizar(path).startswith(BLOBS_DIR + "/")
+
+# -------------------- gravação --------------------
+def _copiar_com_hash(origem, destino):
+    """Copia o stream `origem` para `destino` em blocos; devolve (sha256, bytes)."""
+    h = hashlib.sha256()
+    total = 0
+    while True:
+        bloco = origem.read(CHUNK)
+        if not bloco:
+            break
+        h.update(bloco)
+        destino.write(bloco)
+        total += len(bloco)
+    return h.hexdigest(), total
+
+def _tocar(sha, agora):
+    """Atualiza visto_em do blob; devolve o caminho dele, ou None se a linha não existe (mais)."""
+    t = UploadBlob.__table__
+    res = db.session.execute(t.update().where(t.c.sha256 == sha).values(visto_em=agora))
+    if not res.rowcount:
+        return None
+    return db.session.execute(select(t.c.path).where(t.c.sha256 == sha)).scalar_one()
+
+def _registrar(sha, rel, tamanho):
+    """Garante a linha do blob; devolve (caminho do blob, novo?)."""
+    agora = _agora()
+    # UPDATE direto, e não pelo ORM: afasta a coleta até a nova referência
+    # ser gravada e, se a coleta apagou a linha antes, não acha nada e o blob
+    # é gravado de novo abaixo (em vez de um StaleDataError no flush)
+    path = _tocar(sha, agora)
+    if path:
+        return path, False
+    try:
+        with db.session.begin_nested():
+            db.session.add(UploadBlob(sha256=sha, path=rel, tamanho=tamanho, created_at=agora, visto_em=agora))
+        return rel, True
+    except IntegrityError:
+        # O mesmo conteúdo chegou por outro upload ao mesmo tempo
+        return _tocar(sha, agora), False
+
+def _guardar(stream, nome):
+    ext = os.path.splitext(secure_filename(nome or ""))[1].lower()
+    root = upload_root()
+    tmp_dir = os.path.join(root, BLOBS_DIR, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            sha, tamanho = _copiar_com_hash(stream, f)
+        rel, novo = _registrar(sha, f"{BLOBS_DIR}/{sha[:2]}/{sha}{ext}", tamanho)
+        destino = os.path.join(root, rel)
+        if novo or not os.path.exists(destino):
+            # Linha nova: grava mesmo se o arquivo existe (a coleta pode estar apagando o antigo)
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(tmp, destino)
+        return rel, novo, tamanho
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def guardar(stream, nome):
+    """Grava o conteúdo de `stream` (arquivo binário); devolve o caminho relativo a uploads/."""
+    return _guardar(stream, nome)[0]
+
+def descartar(path):
+    """
+    Apaga o arquivo de um registro excluído. Arquivos antigos (fora de
+    blobs/) saem na hora; um blob pode ter outras referências e fica para a
+    coleta.
+    """
+    if not path or is_blob(path):
+        return
+    full = os.path.join(upload_root(), normalizar(path))
+    if os.path.isfile(full):
+        os.remove(full)
+
+# -------------------- contagem de referências --------------------
+def _deltas(session):
+    delta = Counter()
+    for obj in session.new:
+        attr = _COLUNA.get(type(obj))
+        if attr:
+            delta[getattr(obj, attr)] += 1
+    for obj in session.dirty:
+        attr = _COLUNA.get(type(obj))
+        if attr:
+            hist = inspect(obj).attrs[attr].history
+            for p in hist.added:
+                delta[p] += 1
+            for p in hist.deleted:
+                delta[p] -= 1
+    for obj in session.deleted:
+        attr = _COLUNA.get(type(obj))
+        if attr:
+            delta[inspect(obj).dict.get(attr)] -= 1
+    por_blob = Counter()
+    for p, d in delta.items():
+        if p and is_blob(p):
+            por_blob[normalizar(p)] += d
+    return {p: d for p, d in por_blob.items() if d}
+
+@event.listens_for(db.session, "after_flush")
+def _contar_referencias(session, flush_context):
+    deltas = _deltas(session)
+    if not deltas:
+        return
+    t = UploadBlob.__table__
+    conn = session.connection()
+    for path, d in deltas.items():
+        conn.execute(t.update().where(t.c.path == path).values(refs=t.c.refs + d))
+
+def recontar():
+    """Recalcula upload_blob.refs a partir das tabelas; devolve quantos blobs estavam errados."""
+    contagem = Counter()
+    for modelo, attr in REFERENCIAS:
+        col = getattr(modelo, attr)
+        for (p,) in db.session.query(col).filter(col.isnot(None)):
+            if is_blob(p):
+                contagem[normalizar(p)] += 1
+    errados = 0
+    for blob in UploadBlob.query:
+        if blob.refs != contagem[blob.path]:
+            blob.refs = contagem[blob.path]
+            errados += 1
+    db.session.commit()
+    return errados
+
+# -------------------- coleta --------------------
+def _apagar_miniaturas(root, sha):
+    """Apaga as miniaturas (thumbs/v*/*/<sha>.jpg) do blob apagado."""
+    from thumbnails import THUMBS_DIR
+    for full in glob.glob(os.path.join(root, THUMBS_DIR, "v*", "*", f"{sha}.jpg")):
+        try:
+            os.remove(full)
+        except FileNotFoundError:
+            pass
+
+def coletar(horas=None):
+    """Apaga blobs sem referência há mais de `horas` e temporários esquecidos; devolve (arquivos, bytes)."""
+    horas = float(os.getenv("UPLOADS_GC_HORAS", "24")) if horas is None else horas
+    limite = _agora() - timedelta(hours=horas)
+    root = upload_root()
+    t = UploadBlob.__table__
+    apagados = liberados = 0
+
+    candidatos = db.session.query(UploadBlob.sha256, UploadBlob.path, UploadBlob.tamanho).filter(
+        UploadBlob.refs <= 0, UploadBlob.visto_em < limite).all()
+    for sha, path, tamanho in candidatos:
+        # Condicional: um upload do mesmo conteúdo pode ter acabado de reaproveitar o blob
+        res = db.session.execute(t.delete().where(t.c.sha256 == sha, t.c.refs <= 0, t.c.visto_em < limite))
+        db.session.commit()
+        if res.rowcount:
+            try:
+                os.remove(os.path.join(root, path))
+            except FileNotFoundError:
+                pass
+            _apagar_miniaturas(root, sha)
+            apagados += 1
+            liberados += tamanho
+
+    # Arquivos sem linha (upload de uma requisição que deu rollback) e temporários
+    conhecidos = {sha for (sha,) in db.session.query(UploadBlob.sha256)}
+    corte = time.time() - horas * 3600
+    for pasta, _, arquivos in os.walk(os.path.join(root, BLOBS_DIR)):
+        for nome in arquivos:
+            full = os.path.join(pasta, nome)
+            if os.path.splitext(nome)[0] in conhecidos or os.path.getmtime(full) >= corte:
+                continue
+            liberados += os.path.getsize(full)
+            os.remove(full)
+            _apagar_miniaturas(root, os.path.splitext(nome)[0])
+            apagados += 1
+    return apagados, liberados
+
+def coletar_job():
+    """Tarefa agendada (jobs.py)."""
+    apagados, liberados = coletar()
+    if apagados:
+        log.info("uploads: %s arquivo(s) sem referência apagado(s), %.1f MB liberados", apagados, liberados / 2**20)
+
+# -------------------- migração dos uploads antigos --------------------
+def _sha_arquivo(full):
+    h = hashlib.sha256()
+    with open(full, "rb") as f:
+        for bloco in iter(lambda: f.read(CHUNK), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def migrar(dry_run=False):
+    """
+    Passa os uploads antigos para o armazenamento por conteúdo: cada arquivo
+    referenciado é guardado pelo hash, a linha passa a apontar para o blob e
+    o original é apagado. Com dry_run só calcula o que seria economizado.
+    """
+    root = upload_root()
+    resumo = Counter()
+    vistos = {sha for (sha,) in db.session.query(UploadBlob.sha256)}
+    originais = set()
+    for modelo, attr in REFERENCIAS:
+        col = getattr(modelo, attr)
+        for obj in modelo.query.filter(col.isnot(None), col != "").all():
+            antigo = getattr(obj, attr)
+            if is_blob(antigo):
+                continue
+            full = os.path.join(root, normalizar(antigo))
+            if not os.path.isfile(full):
+                resumo["ausentes"] += 1
+                continue
+            resumo["arquivos"] += 1
+            if dry_run:
+                sha, tamanho = _sha_arquivo(full), os.path.getsize(full)
+                novo = sha not in vistos
+                vistos.add(sha)
+            else:
+                with open(full, "rb") as f:
+                    rel, novo, tamanho = _guardar(f, full)
+                setattr(obj, attr, rel)
+                originais.add(full)
+            if not novo:
+                resumo["duplicados"] += 1
+                resumo["bytes_economizados"] += tamanho
+        db.session.commit()
+
+    for full in originais:
+        os.remove(full)  # só depois do commit: as linhas já apontam para os blobs
+    if not dry_run:
+        resumo["refs_corrigidas"] = recontar()
+    return resumo
@@ -0,0 +1,189 @@
+# thumbnails.py
+"""
+Miniaturas de fotos e documentos (uploads/thumbs).
+
+save_file agenda (jobs.enqueue) a geração das miniaturas de cada upload; as
+telas só apontam para o arquivo pronto e, enquanto ele não existe, mostram
+o link de sempre. Cada miniatura é nomeada pelo conteúdo de origem (o
+SHA-256 dos blobs; caminho + mtime dos arquivos antigos) e pela versão do
+pipeline, então a URL muda junto com o arquivo e o navegador pode guardá-la.
+
+PDF: a prévia é a primeira página renderizada pelo pdftoppm (poppler), se
+estiver instalado; sem ele, a maior imagem embutida na primeira página (o
+caso das digitalizações). `flask thumbs-backfill` gera as miniaturas dos
+uploads que já existiam.
+"""
+import hashlib
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from flask import url_for
+from sqlalchemy import event
+
+import jobs
+import storage
+from extensions import db
+
+VERSAO = 1                      # mude ao alterar tamanhos/qualidade: gera URLs novas
+TAMANHOS = {"p": 64, "m": 320}  # lado maior, em px
+IMAGENS = {".jpg", ".jpeg", ".png"}
+THUMBS_DIR = "thumbs"
+MAIOR = max(TAMANHOS.values())
+
+log = logging.getLogger(__name__)
+
+def suportado(rel):
+    return os.path.splitext(rel)[1].lower() in IMAGENS | {".pdf"}
+
+def _chave(rel):
+    """Identifica o conteúdo de origem; None se o arquivo não existir."""
+    if storage.is_blob(rel):
+        return os.path.splitext(os.path.basename(rel))[0]
+    try:
+        st = os.stat(os.path.join(storage.upload_root(), rel))
+    except OSError:
+        return None
+    return hashlib.sha1(f"{rel}|{st.st_mtime_ns}|{st.st_size}".encode()).hexdigest()
+
+def caminho(rel, tamanho):
+    """Caminho (relativo a uploads/) da miniatura de `rel`, exista ou não."""
+    chave = _chave(rel)
+    return chave and f"{THUMBS_DIR}/v{VERSAO}/{tamanho}/{chave}.jpg"
+
+def url(path, tamanho="m"):
+    """URL da miniatura pronta, ou None. Filtro de template: {{ e.foto_path|thumb('p') }}."""
+    if not path:
+        return None
+    rel = storage.normalizar(path)
+    if not suportado(rel):
+        return None
+    thumb = caminho(rel, tamanho)
+    if not thumb or not os.path.exists(os.path.join(storage.upload_root(), thumb)):
+        return None
+    return url_for("uploads.serve_upload", filename=thumb)
+
+# -------------------- geração --------------------
+def _pagina_pdf(full):
+    """Primeira página do PDF como imagem, ou None."""
+    from PIL import Image
+    exe = shutil.which("pdftoppm")
+    if exe:
+        with tempfile.TemporaryDirectory() as tmp:
+            subprocess.run([exe, "-f", "1", "-l", "1", "-png", "-scale-to", str(MAIOR), full, os.path.join(tmp, "p")],
+                           check=True, capture_output=True, timeout=60)
+            for nome in os.listdir(tmp):
+                img = Image.open(os.path.join(tmp, nome))
+                img.load()
+                return img
+    from PyPDF2 import PdfReader
+    imagens = PdfReader(full).pages[0].images
+    if not imagens:
+        return None
+    return Image.open(io.BytesIO(max(imagens, key=lambda i: len(i.data)).data))
+
+def _abrir(full):
+    from PIL import Image
+    if full.lower().endswith(".pdf"):
+        return _pagina_pdf(full)
+    img = Image.open(full)
+    img.draft("RGB", (MAIOR, MAIOR))  # JPEG: o decodificador já entrega a imagem reduzida
+    return img
+
+def _rgb(img):
+    from PIL import Image, ImageOps
+    img = ImageOps.exif_transpose(img)  # fotos de celular vêm deitadas
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        fundo = Image.new("RGB", img.size, "white")
+        fundo.paste(img, mask=img.getchannel("A"))
+        return fundo
+    return img.convert("RGB")
+
+def gerar(path):
+    """Tarefa: grava as miniaturas que faltam de `path`; devolve quantas gravou."""
+    rel = storage.normalizar(path)
+    if not suportado(rel):
+        return 0
+    root = storage.upload_root()
+    faltando = {}
+    for tamanho in TAMANHOS:
+        thumb = caminho(rel, tamanho)
+        if thumb and not os.path.exists(os.path.join(root, thumb)):
+            faltando[tamanho] = thumb
+    if not faltando:
+        return 0
+    try:
+        img = _abrir(os.path.join(root, rel))
+        if img is None:
+            return 0
+        img = _rgb(img)
+    except Exception as e:
+        log.warning("thumbs: não foi possível abrir %s: %s", rel, e)
+        return 0
+    # Do maior para o menor, reduzindo a mesma imagem
+    for tamanho in sorted(faltando, key=TAMANHOS.get, reverse=True):
+        img.thumbnail((TAMANHOS[tamanho], TAMANHOS[tamanho]))
+        destino = os.path.join(root, faltando[tamanho])
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                img.save(f, "JPEG", quality=82, optimize=True)
+            os.replace(tmp, destino)
+        finally:
+            if os.path.exists(tmp):  # o save falhou: não deixa o .tmp em thumbs/
+                os.remove(tmp)
+    return len(faltando)
+
+def agendar(path):
+    """
+    Gera as miniaturas em segundo plano (chamado por save_file). A tarefa só
+    é enfileirada depois do commit: no SQLite, gravar na fila com a
+    transação da requisição aberta esperaria pela própria trava.
+    """
+    if path and suportado(path):
+        db.session.info.setdefault("thumbs_pendentes", set()).add(path)
+
+@event.listens_for(db.session, "after_commit")
+def _enfileirar(session):
+    for path in session.info.pop("thumbs_pendentes", ()):
+        jobs.enqueue(gerar, path)
+
+@event.listens_for(db.session, "after_rollback")
+def _descartar(session):
+    session.info.pop("thumbs_pendentes", None)
+
+# -------------------- uploads existentes --------------------
+def backfill():
+    """
+    Gera as miniaturas de todos os uploads referenciados no banco e apaga as
+    que não correspondem a mais nada (arquivo trocado ou versão antiga).
+    Devolve (arquivos, miniaturas gravadas, miniaturas apagadas).
+    """
+    arquivos = set()
+    for modelo, attr in storage.REFERENCIAS:
+        col = getattr(modelo, attr)
+        for (p,) in modelo.query.with_entities(col).filter(col.isnot(None), col != ""):
+            rel = storage.normalizar(p)
+            if suportado(rel):
+                arquivos.add(rel)
+
+    gravadas = 0
+    esperadas = set()
+    for rel in sorted(arquivos):
+        gravadas += gerar(rel)
+        esperadas.update(caminho(rel, t) for t in TAMANHOS)
+
+    apagadas = 0
+    root = storage.upload_root()
+    for pasta, _, nomes in os.walk(os.path.join(root, THUMBS_DIR)):
+        for nome in nomes:
+            full = os.path.join(pasta, nome)
+            if os.path.relpath(full, root).replace(os.sep, "/") not in esperadas:
+                os.remove(full)
+                apagadas += 1
+    return len(arquivos), gravadas, apagadas
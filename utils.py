@@ -1,10 +1,10 @@
 import os
-import uuid
 from functools import wraps
 
-from flask import current_app, abort, redirect, url_for, flash
+from flask import abort, redirect, url_for, flash
 from flask_login import current_user, login_required
-from werkzeug.utils import secure_filename
+import storage
+import thumbnails
 
 # Extensões permitidas p/ upload
 ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
@@ -13,27 +13,19 @@ def _allowed(filename: str) -> bool:
     ext = os.path.splitext(filename)[1].lower()
     return ext in ALLOWED_EXTENSIONS or ext == ""
 
-def save_file(storage, subdir: str):
+def save_file(file, subdir: str):
     """
-    Salva o arquivo em <root>/uploads/<subdir>/<arquivo>
-    Retorna o caminho relativo a /uploads: ex.: 'func_docs/xxxx_arquivo.pdf'
+    Salva o arquivo no armazenamento por conteúdo (ver storage.py): o mesmo
+    arquivo enviado de novo reaproveita o que já está gravado. As
+    miniaturas (thumbnails.py) são geradas em segundo plano após o commit.
+    Retorna o caminho relativo a /uploads: ex.: 'blobs/3f/3fa4...e1.pdf'
+    `subdir` fica só por compatibilidade com as chamadas antigas.
     """
-    if not storage or not storage.filename:
+    if not file or not file.filename:
         return None
-
-    safe = secure_filename(storage.filename)
-    prefix = uuid.uuid4().hex[:8]
-    name, ext = os.path.splitext(safe)
-    filename = f"{prefix}_{name}{ext}"
-
-    abs_dir = os.path.join(current_app.root_path, "uploads", subdir)
-    os.makedirs(abs_dir, exist_ok=True)
-
-    abs_path = os.path.join(abs_dir, filename)
-    storage.save(abs_path)
-
-    # caminho que sua rota /uploads/<path> entende
-    return f"{subdir}/{filename}".replace("\\", "/")
+    rel = storage.guardar(file.stream, file.filename)
+    thumbnails.agendar(rel)
+    return rel
 
 def admin_required(fn):
     """
@@ -0,0 +1,40 @@
+# wsgi.py
+"""
+Ponto de entrada de produção (o `flask run` / app.run é só para desenvolvimento).
+
+Windows ou Linux, waitress com WEB_THREADS threads (start_flask_network.bat):
+    python wsgi.py
+
+Linux, gunicorn com vários processos (ver gunicorn.conf.py):
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Variáveis: HOST (0.0.0.0), PORT (5000), WEB_THREADS (8). O pool de
+conexões do banco acompanha WEB_THREADS (ver database.py).
+"""
+import os
+
+os.environ.setdefault("APP_ENV", "production")
+
+def __getattr__(nome):
+    # O app só é importado aqui (`wsgi:app` do gunicorn) ou em main(): os
+    # processos filhos com spawn (pdf_split) reexecutam este arquivo como
+    # __mp_main__ e, assim, não sobem o create_app inteiro
+    if nome == "app":
+        from app import app
+        return app
+    raise AttributeError(nome)
+
+def main():
+    from waitress import serve
+    from app import app
+    serve(
+        app,
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "5000")),
+        threads=int(os.environ.get("WEB_THREADS", "8")),
+        channel_timeout=120,  # upload/geração de PDF grandes
+        ident="projeto6",
+    )
+
+if __name__ == "__main__":
+    main()